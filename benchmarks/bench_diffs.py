@@ -0,0 +1,218 @@
+"""
+Times the diff engines on synthetic pairs of E+ outputs, so that changes to the regression tool itself can be checked
+for performance regressions.  Runs offline: a base and a modified eplusout.csv, eplustbl.htm, eplusout.eio and
+eplusout_hourly.json are generated to a temporary directory, each pair is diffed, and the timings and peak memory are
+written to a JSON results file:
+
+    python -m benchmarks.bench_diffs --rows 8760 --columns 50 --tables 200 --diff-density 0.01
+"""
+
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+from platform import platform, python_version
+import random
+import tempfile
+import time
+import tracemalloc
+
+from energyplus_regressions.diffs import table_diff
+from energyplus_regressions.diffs.thresh_dict import ThreshDict
+from energyplus_regressions.runtests import SuiteRunner
+from energyplus_regressions.structures import MathDiffEngine
+
+THRESH_DICT_FILE = Path(__file__).resolve().parent.parent / 'energyplus_regressions' / 'diffs' / 'math_diff.config'
+VARIABLES = [
+    ('Zone Air Temperature', 'C'),
+    ('Zone Air System Sensible Heating Rate', 'W'),
+    ('Zone Air Relative Humidity', '%'),
+    ('Zone Mean Air Humidity Ratio', 'kgWater/kgDryAir'),
+]
+
+
+def time_stamps(num_rows):
+    """hourly E+ time stamps, wrapping around the year as often as needed"""
+    for r in range(num_rows):
+        day = (r // 24) % 365
+        yield '%02d/%02d  %02d:00:00' % (day // 28 % 12 + 1, day % 28 + 1, r % 24 + 1)
+
+
+def column_names(num_columns):
+    return ['ZONE %s:%s [%s](Hourly)' % (c // len(VARIABLES) + 1, *VARIABLES[c % len(VARIABLES)])
+            for c in range(num_columns)]
+
+
+def perturbed(value, rand, diff_density):
+    """the value, changed by a few percent in a diff_density fraction of the calls"""
+    if rand.random() < diff_density:
+        return value * (1.0 + rand.uniform(0.01, 0.1)) + 1.0
+    return value
+
+
+def write_csv_pair(out_dir, num_rows, num_columns, diff_density, rand):
+    headers = column_names(num_columns)
+    with (out_dir / 'base.csv').open('w') as f_base, (out_dir / 'mod.csv').open('w') as f_mod:
+        for f in (f_base, f_mod):
+            f.write('Date/Time,' + ','.join(headers) + '\n')
+        for stamp in time_stamps(num_rows):
+            values = [rand.uniform(0, 5000) for _ in range(num_columns)]
+            f_base.write(' %s,%s\n' % (stamp, ','.join('%.4f' % v for v in values)))
+            f_mod.write(' %s,%s\n' % (stamp, ','.join('%.4f' % perturbed(v, rand, diff_density) for v in values)))
+
+
+def table_html(tables):
+    """an eplustbl.htm from (name, header, rows) tables, laid out the way E+ writes them"""
+    lines = [
+        '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN""http://www.w3.org/TR/html4/loose.dtd">',
+        '<html>', '<head>', '<title> Bldg SYNTHETIC - EnergyPlus</title>', '</head>',
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8">', '<body>',
+    ]
+    for name, header, rows in tables:
+        lines.append('<b>%s</b><br><br>' % name.rsplit('_', 1)[-1])
+        lines.append('<!-- FullName:%s-->' % name)
+        lines.append('<table border="1" cellpadding="4" cellspacing="0">')
+        lines.append('  <tr><td></td>')
+        lines.extend('    <td align="right">%s</td>' % cell for cell in header)
+        lines.append('  </tr>')
+        for row in rows:
+            lines.append('  <tr>')
+            lines.extend('    <td align="right">%s</td>' % cell for cell in row)
+            lines.append('  </tr>')
+        lines.append('</table>')
+        lines.append('<br><br>')
+    lines.extend(['</body>', '</html>'])
+    return '\n'.join(lines) + '\n'
+
+
+def write_table_pair(out_dir, num_tables, num_rows, num_columns, diff_density, rand):
+    base_tables = []
+    mod_tables = []
+    header = ['Value %s [W]' % c for c in range(num_columns)]
+    for t in range(num_tables):
+        name = 'Component Sizing Summary_Entire Facility_Table %s' % t
+        base_rows = []
+        mod_rows = []
+        for r in range(num_rows):
+            values = [rand.uniform(0, 5000) for _ in range(num_columns)]
+            base_rows.append(['COMPONENT %s' % r] + ['%12.2f' % v for v in values])
+            mod_rows.append(['COMPONENT %s' % r] + ['%12.2f' % perturbed(v, rand, diff_density) for v in values])
+        base_tables.append((name, header, base_rows))
+        mod_tables.append((name, header, mod_rows))
+    (out_dir / 'base.htm').write_text(table_html(base_tables))
+    (out_dir / 'mod.htm').write_text(table_html(mod_tables))
+
+
+def write_eio_pair(out_dir, num_lines, diff_density, rand):
+    with (out_dir / 'base.eio').open('w') as f_base, (out_dir / 'mod.eio').open('w') as f_mod:
+        for f in (f_base, f_mod):
+            f.write('Program Version,EnergyPlus, Version 24.1.0-%s, YMD=2024.03.28 10:%02d\n' % (
+                'base' if f is f_base else 'mod', rand.randint(0, 59)
+            ))
+            f.write('! <Zone Information>, Zone Name, North Axis {deg}, Origin X-Coordinate {m}, Volume {m3}\n')
+        for i in range(num_lines):
+            volume = rand.uniform(10, 1000)
+            line = ' Zone Information, ZONE %s,0.00,%.2f,%.2f\n'
+            f_base.write(line % (i, i * 0.5, volume))
+            f_mod.write(line % (i, i * 0.5, perturbed(volume, rand, diff_density)))
+
+
+def write_json_pair(out_dir, num_rows, num_columns, diff_density, rand):
+    columns = [{'Variable': name.split(' [')[0], 'Units': name.split('[')[1].split(']')[0]}
+               for name in column_names(num_columns)]
+    base_rows = []
+    mod_rows = []
+    for stamp in time_stamps(num_rows):
+        values = [round(rand.uniform(0, 5000), 4) for _ in range(num_columns)]
+        base_rows.append({stamp: values})
+        mod_rows.append({stamp: [round(perturbed(v, rand, diff_density), 4) for v in values]})
+    for file_name, rows in [('base.json', base_rows), ('mod.json', mod_rows)]:
+        with (out_dir / file_name).open('w') as f:
+            json.dump({'Cols': columns, 'ReportFrequency': 'Hourly', 'Rows': rows}, f)
+
+
+def measure(func, repeat, track_memory):
+    """the best wall time of a number of calls of func, and the peak Python memory of one more traced call"""
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        wall_times.append(time.perf_counter() - start)
+    peak_bytes = None
+    if track_memory:
+        # tracing allocations slows everything down, so the memory is measured on a separate, untimed, call
+        tracemalloc.start()
+        try:
+            func()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'wall_seconds': min(wall_times), 'all_wall_seconds': wall_times, 'peak_python_bytes': peak_bytes}
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=8760, help='rows of the csv and json, lines of the eio')
+    parser.add_argument('--columns', type=int, default=40, help='columns of the csv, json and tables')
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--table-rows', type=int, default=20)
+    parser.add_argument('--diff-density', type=float, default=0.01, help='fraction of values changed in the mod files')
+    parser.add_argument('--engine', default=MathDiffEngine.PYTHON.value,
+                        choices=[engine.value for engine in MathDiffEngine])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="don't measure peak memory")
+    parser.add_argument('--output', default='bench_diffs_results.json', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    rand = random.Random(args.seed)
+    out_dir = Path(tempfile.mkdtemp())
+    write_csv_pair(out_dir, args.rows, args.columns, args.diff_density, rand)
+    write_table_pair(out_dir, args.tables, args.table_rows, args.columns, args.diff_density, rand)
+    write_eio_pair(out_dir, args.rows, args.diff_density, rand)
+    write_json_pair(out_dir, args.rows, args.columns, args.diff_density, rand)
+
+    thresh_dict = ThreshDict(str(THRESH_DICT_FILE))
+    math_diff = SuiteRunner.math_diff_function(MathDiffEngine(args.engine))
+    benchmarks = {
+        'math_diff': ('csv', lambda: math_diff(
+            thresh_dict, str(out_dir / 'base.csv'), str(out_dir / 'mod.csv'), str(out_dir / 'csv.absdiff.csv'),
+            str(out_dir / 'csv.percdiff.csv'), str(out_dir / 'csv.diffsummary.csv'), str(out_dir / 'summary.csv')
+        )),
+        'table_diff': ('htm', lambda: table_diff.table_diff(
+            thresh_dict, str(out_dir / 'base.htm'), str(out_dir / 'mod.htm'), str(out_dir / 'tbl.absdiff.htm'),
+            str(out_dir / 'tbl.percdiff.htm'), str(out_dir / 'tbl.summarydiff.htm'), str(out_dir / 'summary.csv')
+        )),
+        'diff_text_files': ('eio', lambda: SuiteRunner.diff_text_files(
+            out_dir / 'base.eio', out_dir / 'mod.eio', out_dir / 'eio.diff'
+        )),
+        'diff_json_time_series': ('json', lambda: SuiteRunner.diff_json_time_series(
+            out_dir / 'base.json', out_dir / 'mod.json', out_dir / 'json.diff'
+        )),
+    }
+    results = []
+    for name, (extension, func) in benchmarks.items():
+        result = {
+            'benchmark': name,
+            'input_bytes': (out_dir / ('base.' + extension)).stat().st_size,
+            'diff_response': repr(func()),
+        }
+        result.update(measure(func, args.repeat, not args.no_memory))
+        results.append(result)
+        peak = result['peak_python_bytes']
+        print('%-22s %10.3f s  %10s MB peak  %8.1f MB input' % (
+            name, result['wall_seconds'], '-' if peak is None else '%.1f' % (peak / 1e6), result['input_bytes'] / 1e6
+        ))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': python_version(),
+            'platform': platform(),
+            'config': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print('Results written to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Times the overhead of launching the tools of a simulation, the way they used to be launched, a command line string
+through a shell, against the way they are now, the argument list executed directly, both with subprocess and with
+asyncio.  The tool is a no-op so only the cost of starting and waiting on each process is measured:
+
+    python -m benchmarks.bench_launch --cases 200 --tools-per-case 4
+
+A plain input file runs four tools (ExpandObjects, EnergyPlus and ReadVarsESO twice), a macro with ground heat
+transfer up to eight.  The overhead per case, and what a suite of A/B cases would spend on it, is reported per method.
+"""
+
+from argparse import ArgumentParser
+import asyncio
+import json
+import os
+from pathlib import Path
+from platform import platform, python_version
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from energyplus_regressions.energyplus import ToolInvocation, run_tool, run_tool_async
+
+
+def default_tool():
+    """a native no-op executable, or failing that (on Windows) the Python interpreter doing nothing"""
+    true = shutil.which('true')
+    return [true] if true else [sys.executable, '-c', 'pass']
+
+
+def shell_launch(argv, run_dir: Path, env):
+    # how every tool was launched before, a command line string through the shell
+    process = subprocess.Popen(
+        ' '.join(argv), shell=True, cwd=run_dir, env=env,
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    process.communicate()
+
+
+async def shell_launch_async(argv, run_dir: Path, env):
+    process = await asyncio.create_subprocess_shell(
+        ' '.join(argv), cwd=run_dir, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    await process.communicate()
+
+
+def time_launches(launch, num_launches: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num_launches):
+        launch()
+    return time.perf_counter() - start
+
+
+def time_launches_async(launch, num_launches: int) -> float:
+    async def launches():
+        for _ in range(num_launches):
+            await launch()
+    start = time.perf_counter()
+    asyncio.run(launches())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cases', type=int, default=100, help='number of simulated cases to launch the tools of')
+    parser.add_argument('--tools-per-case', type=int, default=4, help='tools launched for each case')
+    parser.add_argument('--suite-cases', type=int, default=1400, help='cases (A and B) to scale the overhead up to')
+    parser.add_argument('--output', default='bench_launch_results.json', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    argv = default_tool()
+    run_dir = Path(tempfile.mkdtemp())
+    env = dict(os.environ)
+    tool = ToolInvocation('no-op', argv, env)
+    num_launches = args.cases * args.tools_per_case
+    methods = {
+        'shell': lambda: time_launches(lambda: shell_launch(argv, run_dir, env), num_launches),
+        'argv': lambda: time_launches(lambda: run_tool(tool, run_dir), num_launches),
+        'asyncio shell': lambda: time_launches_async(lambda: shell_launch_async(argv, run_dir, env), num_launches),
+        'asyncio argv': lambda: time_launches_async(lambda: run_tool_async(tool, run_dir), num_launches),
+    }
+    results = []
+    try:
+        for name, measure in methods.items():
+            wall_seconds = measure()
+            per_case = wall_seconds / args.cases
+            results.append({
+                'method': name,
+                'launches': num_launches,
+                'wall_seconds': wall_seconds,
+                'seconds_per_launch': wall_seconds / num_launches,
+                'seconds_per_case': per_case,
+                'suite_seconds': per_case * args.suite_cases,
+            })
+            print('%-14s %8.2f ms per launch  %8.2f ms per case  %7.1f s per %d-case suite' % (
+                name, wall_seconds / num_launches * 1e3, per_case * 1e3, per_case * args.suite_cases, args.suite_cases
+            ))
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': python_version(),
+            'platform': platform(),
+            'tool': argv,
+            'config': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print('Results written to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Times whole suite runs, simulations and diffs of both builds, on fake build trees whose tools are the dummy E+ scripts
+from the test resources, so changes to the orchestration layer (preparing run directories, scheduling, handing
+results back) can be measured without E+.  Each run is repeated with a number of worker counts:
+
+    python -m benchmarks.bench_suite --files 200 --sim-seconds 0.2 --output-rows 2000 --threads 1 2 4 8
+
+With ``--execution-backend Asyncio`` the simulations are run from the suite process instead, keeping
+``--max-simulations`` of them going at once, and the worker counts only apply to the diffs.
+
+For every worker count it reports the cases per second, the worker time per case that was not spent running a job
+(scheduler overhead and idle workers), the time jobs spent getting to and back from a worker, and the parallel
+efficiency relative to the first worker count.
+"""
+
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+from platform import platform, python_version, system
+import shutil
+import tempfile
+import time
+
+from energyplus_regressions.builds.makefile import CMakeCacheMakeFileBuildDirectory
+from energyplus_regressions.runtests import SuiteRunner, TestRunConfiguration
+from energyplus_regressions.structures import ExecutionBackend, ForceRunType, ReportingFreq, TestEntry
+
+RESOURCES = Path(__file__).resolve().parent.parent / 'energyplus_regressions' / 'tests' / 'resources'
+
+
+def make_build_tree(root: Path, file_names, idf_config) -> CMakeCacheMakeFileBuildDirectory:
+    """a source and build directory pair with the dummy tools in place of E+ and an input file per name"""
+    source_dir = root / 'source'
+    build_dir = root / 'build'
+    products_dir = build_dir / 'Products'
+    products_dir.mkdir(parents=True)
+    with (build_dir / 'CMakeCache.txt').open('w') as f:
+        f.write('CMAKE_HOME_DIRECTORY:INTERNAL=%s\n' % source_dir)
+    if system() == 'Windows':  # pragma: no cover -- the dummy tools have to be built with pyinstaller first
+        tools = {'energyplus.exe': 'energyplus.exe', 'readvars.exe': 'ReadVarsESO.exe'}
+        for source, target in tools.items():
+            shutil.copy(RESOURCES / 'dist' / source, products_dir / target)
+    else:
+        shutil.copy(RESOURCES / 'dummy.energyplus.py', products_dir / 'energyplus')
+        shutil.copy(RESOURCES / 'dummy.readvars.py', products_dir / 'ReadVarsESO')
+    shutil.copy(RESOURCES / 'dummy.Energy+.idd', products_dir / 'Energy+.idd')
+    testfiles_dir = source_dir / 'testfiles'
+    testfiles_dir.mkdir(parents=True)
+    json_text = json.dumps(idf_config)
+    for file_name in file_names:
+        (testfiles_dir / file_name).write_text(json_text)
+    weather_dir = source_dir / 'weather'
+    weather_dir.mkdir()
+    shutil.copy(RESOURCES / 'dummy.in.epw', weather_dir / 'USA_IL_Chicago-OHare.Intl.AP.725300_TMY3.epw')
+    (source_dir / 'datasets').mkdir()
+    build = CMakeCacheMakeFileBuildDirectory()
+    build.set_build_directory(build_dir)
+    return build
+
+
+def run_suite(
+        work_dir: Path, num_files: int, num_threads: int, sim_seconds: float, output_rows: int, diffs: bool,
+        backend: ExecutionBackend = ExecutionBackend.PROCESSES, max_simulations: int = None
+):
+    file_names = ['case_%04d.idf' % i for i in range(num_files)]
+    config = {'end_state': 'success', 'eso_results': 'base', 'txt_results': 'base',
+              'sleep_seconds': sim_seconds, 'output_rows': output_rows}
+    build_a = make_build_tree(work_dir / 'a', file_names, {'config': config})
+    mod_config = dict(config, eso_results='bigdiffs', txt_results='diffs') if diffs else config
+    build_b = make_build_tree(work_dir / 'b', file_names, {'config': mod_config})
+    run_config = TestRunConfiguration(
+        force_run_type=ForceRunType.NONE, single_test_run=False, num_threads=num_threads,
+        report_freq=ReportingFreq.HOURLY, build_a=build_a, build_b=build_b, execution_backend=backend,
+        max_concurrent_simulations=max_simulations
+    )
+    runner = SuiteRunner(run_config, [TestEntry(file_name, None) for file_name in file_names])
+    runner.add_callbacks(*([lambda *args, **kwargs: None] * 7))
+    start = time.perf_counter()
+    runner.run_test_suite()
+    wall_seconds = time.perf_counter() - start
+
+    jobs = [job for job in runner.finished_jobs if job.started_at is not None]
+    busy_seconds = sum(job.finished_at - job.started_at for job in jobs)
+    # the time spent getting each job to a free worker and its result back to the scheduling thread
+    dispatch_seconds = sum((job.started_at - job.submitted_at) + (job.completed_at - job.finished_at) for job in jobs)
+    workers = runner.number_of_threads
+    if backend == ExecutionBackend.ASYNCIO:  # the simulations each count as a worker while they run
+        workers += runner.max_concurrent_simulations
+    return {
+        'backend': backend.value,
+        'threads': runner.number_of_threads,
+        'workers': workers,
+        'cases': num_files,
+        'jobs': len(runner.finished_jobs),
+        'failed_jobs': len(runner.finished_jobs) - len(jobs),
+        'wall_seconds': wall_seconds,
+        'cases_per_second': num_files / wall_seconds,
+        'busy_seconds': busy_seconds,
+        'not_busy_seconds_per_case': (workers * wall_seconds - busy_seconds) / num_files,
+        'dispatch_seconds_per_job': dispatch_seconds / len(jobs) if jobs else None,
+        'utilization': busy_seconds / (workers * wall_seconds),
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50, help='number of test files in each build')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sim-seconds', type=float, default=0.1, help='how long each dummy simulation sleeps')
+    parser.add_argument('--output-rows', type=int, default=0, help='rows of time series output of each simulation')
+    parser.add_argument('--diffs', action='store_true', help='make the second build differ, so the diffs do work')
+    parser.add_argument(
+        '--execution-backend', choices=[e.value for e in ExecutionBackend], default=ExecutionBackend.PROCESSES.value
+    )
+    parser.add_argument(
+        '--max-simulations', type=int, default=None, help='how many simulations the Asyncio backend runs at once'
+    )
+    parser.add_argument('--output', default='bench_suite_results.json', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    results = []
+    for num_threads in args.threads:
+        work_dir = Path(tempfile.mkdtemp())
+        try:
+            result = run_suite(
+                work_dir, args.files, num_threads, args.sim_seconds, args.output_rows, args.diffs,
+                ExecutionBackend(args.execution_backend), args.max_simulations
+            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        baseline = results[0] if results else result
+        result['parallel_efficiency'] = (
+            (result['cases_per_second'] / baseline['cases_per_second']) / (result['workers'] / baseline['workers'])
+        )
+        results.append(result)
+        print('%3d workers: %8.2f cases/s  %7.3f s not busy per case  %7.4f s dispatch per job  '
+              '%5.1f%% utilized  %5.1f%% efficiency' % (
+                  result['workers'], result['cases_per_second'], result['not_busy_seconds_per_case'],
+                  result['dispatch_seconds_per_job'] or 0.0, result['utilization'] * 100,
+                  result['parallel_efficiency'] * 100
+              ))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': python_version(),
+            'platform': platform(),
+            'config': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print('Results written to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Times table2hdict_horder matching up the rows of a large reordered table, such as a big Component Sizing or equipment
+summary table, against the quadratic search it used to do.  Runs offline on a synthetic table:
+
+    python -m benchmarks.bench_table_reorder --rows 10000
+"""
+
+from argparse import ArgumentParser
+import random
+import time
+
+from energyplus_regressions.diffs.table_diff import table2hdict_horder
+from energyplus_regressions.diffs.table_parser import ParsedTable
+
+
+def synthetic_table(num_rows, num_columns, blank_every):
+    """an E+ looking table: a blank heading cell, a name column and numeric columns, with a blank spacing row now and
+    then, which gives the duplicate row keys"""
+    header = [None, 'Type'] + ['Value %s [W]' % c for c in range(num_columns)]
+    rows = []
+    for r in range(num_rows):
+        if blank_every and r % blank_every == blank_every - 1:
+            rows.append([None] * len(header))
+        else:
+            rows.append(['COMPONENT %s' % r, 'Coil:Cooling'] + ['%.2f' % (r * c * 0.37) for c in range(num_columns)])
+    return [header] + rows
+
+
+def quadratic_search_rows(table, table_a):
+    """the row matching table2hdict_horder used to do, for comparison"""
+    table_a_row_order = [["" if tcol is None else tcol for tcol in trow] for trow in table_a.rows[1:]]
+    found_table_b_row_order = [["" if tcol is None else tcol for tcol in trow] for trow in table.rows[1:]]
+    search_rows = []
+    for to_find_val in table_a_row_order:
+        for search_row_index, trow in enumerate(table.rows[1:]):
+            if found_table_b_row_order[search_row_index] == to_find_val:
+                search_rows.append(trow)
+                break
+    return search_rows
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--blank-every', type=int, default=20, help='a blank spacing row every n rows, 0 for none')
+    parser.add_argument('--skip-quadratic', action='store_true', help="don't time the old quadratic search")
+    args = parser.parse_args()
+
+    rows = synthetic_table(args.rows, args.columns, args.blank_every)
+    shuffled = rows[1:]
+    random.Random(0).shuffle(shuffled)
+    table_a = ParsedTable('FullName:Synthetic', rows, sum(len(row) for row in rows))
+    table_b = ParsedTable('FullName:Synthetic', [rows[0]] + shuffled, table_a.num_cells)
+
+    start = time.perf_counter()
+    hdict, horder = table2hdict_horder(table_b, table_a)
+    indexed = time.perf_counter() - start
+    print('%s rows x %s columns, indexed match: %.3f s' % (args.rows, len(rows[0]), indexed))
+
+    if not args.skip_quadratic:
+        start = time.perf_counter()
+        search_rows = quadratic_search_rows(table_b, table_a)
+        quadratic = time.perf_counter() - start
+        expected = {h: ['' if row[i] is None else row[i] for row in search_rows] for i, h in enumerate(rows[0])}
+        expected['DummyPlaceholder'] = expected.pop(None)
+        print('quadratic search: %.3f s, %.0fx slower, same rows: %s' % (
+            quadratic, quadratic / indexed, expected == hdict
+        ))
+
+
+if __name__ == '__main__':
+    main()
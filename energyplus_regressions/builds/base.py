@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import Optional, Set
 
+from energyplus_regressions.builds.idf_index import idf_index
+
 
 class KnownBuildTypes:
     Makefile = "makefile"
@@ -58,34 +60,7 @@ class BaseBuildDirectoryStructure(object):
 
     @staticmethod
     def get_idfs_in_dir(idf_dir: Path) -> Set[Path]:
-        idf_path = Path(idf_dir)
-        all_idfs_absolute_path = list(idf_path.rglob('*.idf'))
-        all_idfs_absolute_path.extend(list(idf_path.rglob('*.imf')))
-        all_idfs_absolute_path.extend(list(idf_path.rglob('*.epJSON')))
-        all_idfs_relative_path = set([idf.relative_to(idf_path) for idf in all_idfs_absolute_path])
-        known_ignore_list = [
-            # these files are for running EnergyPlus _as an FMU_ and we aren't doing that
-            '_ExternalInterface-actuator.idf',
-            '_ExternalInterface-schedule.idf',
-            '_ExternalInterface-variable.idf',
-            # these files are macro resource files, imported by AbsorptionChiller_Macro.imf
-            'HVAC3ZoneGeometry.imf',
-            'HVAC3ZoneMat-Const.imf',
-            'HVAC3ZoneChillerSpec.imf',
-            'HVAC3Zone-IntGains-Def.imf',
-        ]
-
-        def should_keep(file_path: Path):
-            for i in known_ignore_list:
-                if i in str(file_path):
-                    return False
-                if 'API' in file_path.parts:
-                    # the testfiles/API directory is for Python API calls, we aren't doing that here, yet.
-                    return False
-            return True
-
-        filtered_list = filter(should_keep, all_idfs_relative_path)
-        return set(filtered_list)
+        return idf_index.idfs_in_dir(idf_dir)
 
     def set_build_directory(self, build_directory: Path) -> None:
         raise NotImplementedError('Must implement set_build_directory(str) in derived classes')
@@ -0,0 +1,161 @@
+"""
+Finds the input files in a test files directory with a single walk of the tree, remembering what was in each
+directory along with its modification time, so that later listings of the same tree only read the directories that
+have changed since.  The index can be kept in a JSON file to carry it from one run to the next:
+
+    python -m energyplus_regressions.builds.idf_index /path/to/build_a /path/to/build_b files_to_run.json
+
+writes the input files common to both builds, with the weather file for each, in the form runtests expects.
+"""
+
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+import time
+from typing import Dict, List, Optional, Set
+
+INPUT_FILE_EXTENSIONS = ('.idf', '.imf', '.epJSON')
+
+IGNORED_FILE_NAMES = [
+    # these files are for running EnergyPlus _as an FMU_ and we aren't doing that
+    '_ExternalInterface-actuator.idf',
+    '_ExternalInterface-schedule.idf',
+    '_ExternalInterface-variable.idf',
+    # these files are macro resource files, imported by AbsorptionChiller_Macro.imf
+    'HVAC3ZoneGeometry.imf',
+    'HVAC3ZoneMat-Const.imf',
+    'HVAC3ZoneChillerSpec.imf',
+    'HVAC3Zone-IntGains-Def.imf',
+]
+
+# the testfiles/API directory is for Python API calls, we aren't doing that here, yet.
+IGNORED_DIRECTORY_NAMES = ['API']
+
+INDEX_VERSION = 1
+
+# a directory changed this recently may change again within the resolution of its modification time, so it is listed
+# again next time rather than trusting its time
+RECENT_CHANGE_NANOSECONDS = 2 * 10 ** 9
+
+
+def is_input_file(file_name: str) -> bool:
+    # match the extension the way the file system would, so case-insensitively on Windows
+    file_name = os.path.normcase(file_name)
+    if not any(file_name.endswith(os.path.normcase(extension)) for extension in INPUT_FILE_EXTENSIONS):
+        return False
+    return not any(os.path.normcase(ignored) in file_name for ignored in IGNORED_FILE_NAMES)
+
+
+class IdfIndex:
+    """The input files in each directory of one or more trees, keyed on the modification time of the directory.
+
+    A directory's modification time changes when an entry directly inside it is added, removed or renamed, so each
+    directory is still checked, but only those whose time has changed are listed again.
+    """
+
+    def __init__(self, index_file: Optional[Path] = None):
+        self.index_file = index_file
+        # root directory -> directory relative to the root -> [modification time, input file names, subdirectory names]
+        self.trees: Dict[str, Dict[str, list]] = {}
+        self.directories_listed = 0
+        if index_file is not None:
+            self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):  # no index yet, or a broken one, either way start over
+            return
+        if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+            self.trees = data.get('trees', {})
+
+    def save(self) -> None:
+        temporary_file = Path(str(self.index_file) + '.tmp')
+        try:
+            with open(temporary_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'trees': self.trees}, f)
+            os.replace(temporary_file, self.index_file)
+        except OSError:  # it is only there to save time, so carry on without it
+            pass
+
+    def idfs_in_dir(self, idf_dir: Path) -> Set[Path]:
+        """The input files anywhere under idf_dir, relative to it"""
+        root = os.path.abspath(idf_dir)
+        cached = self.trees.get(root, {})
+        fresh: Dict[str, list] = {}
+        found = set()
+        recent = time.time_ns() - RECENT_CHANGE_NANOSECONDS
+        to_visit = ['']
+        while to_visit:
+            relative_dir = to_visit.pop()
+            directory = os.path.join(root, relative_dir)
+            try:
+                modified = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            entry = cached.get(relative_dir)
+            if entry is None or entry[0] is None or entry[0] != modified:
+                entry = [modified if modified < recent else None] + self.list_directory(directory)
+            fresh[relative_dir] = entry
+            found.update(Path(relative_dir, file_name) for file_name in entry[1])
+            to_visit.extend(os.path.join(relative_dir, subdirectory) for subdirectory in entry[2])
+        self.trees[root] = fresh
+        if self.index_file is not None:
+            self.save()
+        return found
+
+    def list_directory(self, directory: str) -> List[List[str]]:
+        self.directories_listed += 1
+        file_names = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRECTORY_NAMES:
+                            subdirectories.append(entry.name)
+                    elif is_input_file(entry.name) and entry.is_file():
+                        file_names.append(entry.name)
+        except OSError:  # gone, or not readable, since it was found
+            pass
+        return [file_names, subdirectories]
+
+
+# shared by everything listing input files in this process
+idf_index = IdfIndex()
+
+
+def main():
+    from energyplus_regressions.builds.makefile import CMakeCacheMakeFileBuildDirectory
+    from energyplus_regressions.epw_map import get_epws_for_idfs
+
+    parser = ArgumentParser(description='Write the list of input files common to two builds for runtests to run')
+    parser.add_argument('a_build', type=Path, help='Path to case a\'s build directory')
+    parser.add_argument('b_build', type=Path, help='Path to case b\'s build directory')
+    parser.add_argument('idf_list_file', type=Path, help='Path to write the list of input files to')
+    parser.add_argument(
+        '--index-file', type=Path, default=None,
+        help='JSON file to keep the index of the test files directories in, so later listings are faster'
+    )
+    args = parser.parse_args()
+
+    index = IdfIndex(args.index_file)
+    builds = []
+    for build_dir in (args.a_build, args.b_build):
+        build = CMakeCacheMakeFileBuildDirectory()
+        build.set_build_directory(build_dir)
+        builds.append(build)
+    common_idfs = index.idfs_in_dir(builds[0].get_idf_directory()) & index.idfs_in_dir(builds[1].get_idf_directory())
+    idfs = [idf.as_posix() for idf in sorted(common_idfs)]
+    # using build a as the basis for getting a weather file, like the GUI
+    epws = get_epws_for_idfs(builds[0].source_directory, idfs)
+    files_to_run = [{'file': idf, 'epw': epws[idf]} if epws[idf] else {'file': idf} for idf in idfs]
+    with args.idf_list_file.open('w', encoding='utf-8') as f:
+        json.dump({'files_to_run': files_to_run}, f, indent=2)
+    print(f"Wrote {len(files_to_run)} input files to {args.idf_list_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+The table of what an input file needs brought into its run directory, and how its text has to change to find it
+there, keyed on the text (or the name) of the input file.
+
+Each rule is a dict, in the same form whether it is one of the defaults below or read from a JSON rules file:
+
+    {
+      "name": "Window5",  -- a rule from a file replaces a default rule of the same name
+      "match": ["Window5DataFile.dat"],  -- fires if any of these appear in the input file text
+      "match_name": ["HybridModel"],  -- or if any of these appear in the case name
+      "stage": [  -- files to put in the run directory
+        {"from": "datasets", "path": "Window5DataFile.dat", "to": "datasets"}
+      ],
+      "rewrite": [["..\\datasets\\Window5DataFile.dat", "datasets/Window5DataFile.dat"]],
+      "flags": ["parametric"]  -- marks the run as needing something done differently when it is simulated
+    }
+
+``from`` is ``datasets`` or ``testfiles``, the directory of the build the file comes out of.  If ``path`` is a
+directory, each file directly inside it is staged.  ``to`` is the directory, relative to the run directory, to stage
+into, created if needed.  In a rewrite, ``{sep}`` in the replacement is the path separator of this OS.  Rewrites are
+applied in rule order, but every rule is matched against the original text, and each rewrite is only done if its rule
+fired.
+"""
+
+import json
+import os
+from pathlib import Path
+import re
+from typing import Dict, List, Optional, Set
+
+from energyplus_regressions.builds.base import BuildTree
+from energyplus_regressions.staging import StagingStats, stage_directory_files, stage_file
+from energyplus_regressions.structures import StagingMode
+
+PARAMETRIC = 'parametric'
+
+# Python's substring search is fast enough that checking for a short list of triggers one at a time beats one pass of
+# a regular expression of all of them, which only pays off once there are around this many triggers
+COMPILED_MATCH_MIN_TRIGGERS = 48
+
+DEFAULT_RULES = [
+    {
+        'name': 'Window5',
+        'match': ['Window5DataFile.dat'],
+        'stage': [{'from': 'datasets', 'path': 'Window5DataFile.dat', 'to': 'datasets'}],
+        'rewrite': [['..\\datasets\\Window5DataFile.dat', 'datasets/Window5DataFile.dat']],
+    },
+    {
+        'name': 'TDV',
+        'match': ['DataSets\\TDV', 'DataSets\\\\TDV'],
+        'stage': [{'from': 'datasets', 'path': 'TDV', 'to': 'datasets/TDV'}],
+        'rewrite': [['..\\datasets\\TDV\\TDV_2008_kBtu_CTZ06.csv', 'datasets{sep}TDV{sep}TDV_2008_kBtu_CTZ06.csv']],
+    },
+    {
+        'name': 'HybridModel',
+        'match_name': ['HybridModel'],
+        'stage': [
+            {'from': 'testfiles', 'path': 'HybridModel_Measurements_with_HVAC.csv'},
+            {'from': 'testfiles', 'path': 'HybridModel_Measurements_no_HVAC.csv'},
+        ],
+    },
+] + [
+    # several checks that just bring a single file from the test files dir based on the filename as a keyword
+    {'name': file_name, 'match': [file_name], 'stage': [{'from': 'testfiles', 'path': file_name}]}
+    for file_name in [
+        'HybridZoneModel_TemperatureData.csv',
+        'LookupTable.csv',
+        'SolarShadingTest_Shading_Data.csv',
+        'LocalEnvData.csv',
+        'SurfacePropGndSurfs.csv',
+    ]
+] + [
+    {
+        'name': 'ReportVariableDictionary',
+        'match': ['report variable dictionary'],
+        'rewrite': [['report variable dictionary', '']],
+    },
+    {
+        'name': 'Parametric',
+        'match': ['Parametric:'],
+        'flags': [PARAMETRIC],
+    },
+    {
+        'name': 'FMUs',
+        'match': ['ExternalInterface:'],
+        'stage': [{'from': 'datasets', 'path': 'FMUs', 'to': 'datasets/FMUs'}],
+        'rewrite': [['..\\datasets', 'datasets']],
+    },
+    {
+        'name': 'ASHRAE205',
+        'match': [':ASHRAE205'],
+        'stage': [
+            {'from': 'testfiles', 'path': 'CoolSys1-Chiller.RS0001.a205.cbor'},
+            {'from': 'testfiles', 'path': 'A205ExampleChiller.RS0001.a205.cbor'},
+            {'from': 'testfiles', 'path': 'CoolSys1-Chiller-Detailed.RS0001.a205.cbor'},
+        ],
+    },
+]
+
+
+class DependencyRuleError(Exception):
+    pass
+
+
+class Dependencies:
+    """What the rules that fired for one input file add up to"""
+
+    def __init__(self, rules: List[Dict]):
+        self.rules = rules
+        self.flags: Set[str] = {flag for rule in rules for flag in rule.get('flags', [])}
+
+    @property
+    def names(self) -> List[str]:
+        return [rule['name'] for rule in self.rules]
+
+    def rewrite(self, text: str) -> str:
+        for rule in self.rules:
+            for old, new in rule.get('rewrite', []):
+                text = text.replace(old, new.replace('{sep}', os.sep))
+        return text
+
+    def stage(
+            self, build_tree: BuildTree, run_dir: Path, mode: StagingMode = StagingMode.COPY,
+            stats: Optional[StagingStats] = None
+    ) -> None:
+        roots = {'datasets': build_tree.data_sets_dir, 'testfiles': build_tree.test_files_dir}
+        for rule in self.rules:
+            for file_spec in rule.get('stage', []):
+                source = roots[file_spec['from']] / file_spec['path']
+                destination_dir = run_dir / file_spec.get('to', '')
+                destination_dir.mkdir(parents=True, exist_ok=True)
+                if source.is_dir():
+                    stage_directory_files(source, destination_dir, mode, stats)
+                else:
+                    stage_file(source, destination_dir / source.name, mode, stats)
+
+
+class DependencyRules:
+    """The rules, indexed by the text that triggers them, so an input file is checked for each trigger just once"""
+
+    def __init__(self, rules: Optional[List[Dict]] = None):
+        self.rules = [validated(rule) for rule in (DEFAULT_RULES if rules is None else rules)]
+        self.rules_by_trigger: Dict[str, List[int]] = {}
+        for index, rule in enumerate(self.rules):
+            for trigger in rule.get('match', []):
+                self.rules_by_trigger.setdefault(trigger, []).append(index)
+        self.pattern = None
+        if len(self.rules_by_trigger) >= COMPILED_MATCH_MIN_TRIGGERS:
+            # longest first, so that where one trigger starts with another the longer one is what the pattern finds
+            triggers = sorted(self.rules_by_trigger, key=len, reverse=True)
+            self.pattern = re.compile('|'.join(re.escape(trigger) for trigger in triggers))
+
+    @classmethod
+    def from_file(cls, rules_file: Optional[Path]) -> 'DependencyRules':
+        """The default rules, extended by (or with same-named ones replaced by) those in a JSON rules file"""
+        if rules_file is None:
+            return cls()
+        try:
+            with open(rules_file, encoding='utf-8') as f:
+                extra_rules = json.load(f)['rules']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise DependencyRuleError(f"Could not read dependency rules from {rules_file}: {e}") from e
+        rules_by_name = {rule['name']: rule for rule in DEFAULT_RULES}
+        for rule in extra_rules:
+            rules_by_name[validated(rule)['name']] = rule
+        return cls(list(rules_by_name.values()))
+
+    def triggers_in(self, text: str) -> Set[str]:
+        """Every trigger that appears anywhere in the text, even where two of them overlap"""
+        if self.pattern is None:
+            return {trigger for trigger in self.rules_by_trigger if trigger in text}
+        found = set()
+        position = 0
+        while True:
+            match = self.pattern.search(text, position)
+            if match is None:
+                return found
+            start = match.start()
+            # the pattern only reports one trigger at each position, so look for any others starting here too
+            found.update(trigger for trigger in self.rules_by_trigger if text.startswith(trigger, start))
+            position = start + 1
+
+    def dependencies(self, text: str, case_name: str = '') -> Dependencies:
+        fired = {index for trigger in self.triggers_in(text) for index in self.rules_by_trigger[trigger]}
+        for index, rule in enumerate(self.rules):
+            if any(part in case_name for part in rule.get('match_name', [])):
+                fired.add(index)
+        return Dependencies([self.rules[index] for index in sorted(fired)])
+
+
+def validated(rule: Dict) -> Dict:
+    if not isinstance(rule, dict) or not isinstance(rule.get('name'), str):
+        raise DependencyRuleError(f"Dependency rule needs a name: {rule}")
+    for file_spec in rule.get('stage', []):
+        if file_spec.get('from') not in ('datasets', 'testfiles') or 'path' not in file_spec:
+            raise DependencyRuleError(f"Dependency rule {rule['name']} stages from datasets or testfiles: {file_spec}")
+    for rewrite in rule.get('rewrite', []):
+        if len(rewrite) != 2:
+            raise DependencyRuleError(f"Dependency rule {rule['name']} rewrites need an old and new text: {rewrite}")
+    return rule
@@ -104,6 +104,15 @@ def matrix2hdict(mat):
     return this_dict
 
 
+def check_duplicate_headers(header):
+    """raise the same DuplicateHeaderException as matrix2hdict without building the header dictionary"""
+    seen = set()
+    for h in header:
+        if h in seen:
+            raise DuplicateHeaderException("There are two columns with the same header name " + str(h))
+        seen.add(h)
+
+
 def hdict2matrix(order, this_dict):
     """convert the header dictionary (as created by matrix2hdict) to a csv matrix held in mat.
     'order' is the order of the headers in the matrix. (order is needed because keys in a dict have no sort order)"""
@@ -146,37 +155,43 @@ def make_summary_dict(tdict, hdict):
                     break  # get out of this inner loop
         if column_error:  # pragma: no cover - I don't know how to get here
             continue  # go to next step in this outer loop
-
-        sdict[key]['count'] = len(column)
-        sdict[key]['sum'] = sum(column)
-        sdict[key]['max'] = max(column)
-        sdict[key]['min'] = min(column)
-        sdict[key]['average'] = sdict[key]['sum'] / sdict[key]['count']
-        sdict[key]['time_of_max'] = times[column.index(sdict[key]['max'])]
-        sdict[key]['time_of_min'] = times[column.index(sdict[key]['min'])]
-
-        nz_items = [item for item in column if item != 0]
-        if not nz_items:
-            sdict[key]['nz_count'] = 0
-            sdict[key]['nz_sum'] = 0.0
-            sdict[key]['nz_max'] = 0.0
-            sdict[key]['nz_min'] = 0.0
-            sdict[key]['nz_average'] = 0.0
-            sdict[key]['nz_time_of_max'] = 0.0
-            sdict[key]['nz_time_of_min'] = 0.0
-        else:
-            sdict[key]['nz_count'] = len(nz_items)
-            sdict[key]['nz_sum'] = max(nz_items)
-            sdict[key]['nz_max'] = max(nz_items)
-            sdict[key]['nz_min'] = min(nz_items)
-            sdict[key]['nz_average'] = sdict[key]['nz_sum'] / sdict[key]['nz_count']
-            sdict[key]['nz_time_of_max'] = times[column.index(sdict[key]['nz_max'])]
-            sdict[key]['nz_time_of_min'] = times[column.index(sdict[key]['nz_min'])]
+        sdict[key] = summarize_column(column, times)
 
     sdict[list(tdict.keys())[0]] = [label + ':' for label in summary_labels]
     return sdict
 
 
+def summarize_column(column, times):
+    """generate the summary of a single column that has already been converted to numbers"""
+    summary = {}
+    summary['count'] = len(column)
+    summary['sum'] = sum(column)
+    summary['max'] = max(column)
+    summary['min'] = min(column)
+    summary['average'] = summary['sum'] / summary['count']
+    summary['time_of_max'] = times[column.index(summary['max'])]
+    summary['time_of_min'] = times[column.index(summary['min'])]
+
+    nz_items = [item for item in column if item != 0]
+    if not nz_items:
+        summary['nz_count'] = 0
+        summary['nz_sum'] = 0.0
+        summary['nz_max'] = 0.0
+        summary['nz_min'] = 0.0
+        summary['nz_average'] = 0.0
+        summary['nz_time_of_max'] = 0.0
+        summary['nz_time_of_min'] = 0.0
+    else:
+        summary['nz_count'] = len(nz_items)
+        summary['nz_sum'] = max(nz_items)
+        summary['nz_max'] = max(nz_items)
+        summary['nz_min'] = min(nz_items)
+        summary['nz_average'] = summary['nz_sum'] / summary['nz_count']
+        summary['nz_time_of_max'] = times[column.index(summary['nz_max'])]
+        summary['nz_time_of_min'] = times[column.index(summary['nz_min'])]
+    return summary
+
+
 def dict_of_dicts2dict_of_lists(dict_of_dicts, key_order, list_labels):
     dict_of_lists = {}
     for key in key_order:
@@ -218,30 +233,34 @@ def info(line, logfile=None):
     # print >> sys.stderr, line
 
 
-def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv):
+def read_comparable_matrices(input_file_1, input_file_2, err_file):
+    """read both csv files and line them up for comparison.
+    Returns (problem, None) if the files can't be compared, where problem is the final math_diff response, otherwise
+    returns (None, (time1, mat1, mat2, h_order)) with the time columns split out of the data matrices, and the order of
+    the fields found in both files"""
     # Test for existence of input files
     if not os.path.exists(input_file_1):
         info('unable to open file <%s>' % input_file_1, err_file)
-        return 'unable to open file <%s>' % input_file_1, 0, 0, 0
+        return ('unable to open file <%s>' % input_file_1, 0, 0, 0), None
     if not os.path.exists(input_file_2):
         info('unable to open file <%s>' % input_file_2, err_file)
-        return 'unable to open file <%s>' % input_file_2, 0, 0, 0
+        return ('unable to open file <%s>' % input_file_2, 0, 0, 0), None
 
     # read data out of files
     try:
         mat1 = mycsv.getlist(input_file_1)
     except IndexError:
-        return 'malformed or empty csv file: <%s>' % input_file_1, 0, 0, 0
+        return ('malformed or empty csv file: <%s>' % input_file_1, 0, 0, 0), None
     if len(mat1) < 2:
         info('<%s> has no data' % input_file_1, err_file)
-        return '<%s> has no data' % input_file_1, 0, 0, 0
+        return ('<%s> has no data' % input_file_1, 0, 0, 0), None
     try:
         mat2 = mycsv.getlist(input_file_2)
     except IndexError:
-        return 'malformed or empty csv file: <%s>' % input_file_2, 0, 0, 0
+        return ('malformed or empty csv file: <%s>' % input_file_2, 0, 0, 0), None
     if len(mat2) < 2:
         info('<%s> has no data' % input_file_2, err_file)
-        return '<%s> has no data' % input_file_2, 0, 0, 0
+        return ('<%s> has no data' % input_file_2, 0, 0, 0), None
 
     # clean up the files
     matrix1 = fill_matrix_holes(mat1)
@@ -253,18 +272,28 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
     # Not going to compare two files with different time series
     if time1 != time2:
         info('Time series in <%s> and <%s> do not match' % (input_file_1, input_file_2), err_file)
-        return 'Time series do not match', 0, 0, 0
+        return ('Time series do not match', 0, 0, 0), None
+
+    h_order = common_field_order(mat1[0], mat2[0], input_file_1, input_file_2, err_file)
+    if h_order is None:
+        return ('No common fields', 0, 0, 0), None
+
+    return None, (time1, mat1, mat2, h_order)
+
 
+def common_field_order(header_1, header_2, input_file_1, input_file_2, err_file):
+    """the fields found in both header rows, in the order they appear in the first, or None if there are none.
+    Also warns about the fields that will not be compared"""
     # Only going to compare fields that are found in both files
-    h_set_1 = set(mat1[0])
-    h_set_2 = set(mat2[0])
+    h_set_1 = set(header_1)
+    h_set_2 = set(header_2)
     h_set = h_set_1.intersection(h_set_2)
     if len(h_set) == 0:
         info('Input files <%s> and <%s> have no common fields' % (input_file_1, input_file_2), err_file)
-        return 'No common fields', 0, 0, 0
+        return None
 
     # Order will be order in which intersection fields appear in first file
-    h_order = [h for h in mat1[0] if h in h_set]
+    h_order = [h for h in header_1 if h in h_set]
 
     # Warn about fields that will not be compared
     h_set_s_diff = h_set_1.symmetric_difference(h_set_2)
@@ -296,6 +325,56 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
                 'a'
             )
 
+    return h_order
+
+
+def column_errors(abs_diff_column, rel_diff_column, times, abs_thresh, rel_thresh):
+    """generate the error dict entries for one field from its absolute and relative difference columns"""
+    errors = {}
+
+    max_abs_diff = max(abs_diff_column)
+    index_max_abs_diff = abs_diff_column.index(max_abs_diff)
+    errors['abs_thresh'] = abs_thresh
+    errors['max_abs_diff'] = max_abs_diff
+    errors['rel_diff_of_max_abs_diff'] = rel_diff_column[index_max_abs_diff]
+    errors['time_of_max_abs_diff'] = times[index_max_abs_diff]
+    errors['count_of_small_abs_diff'] = sum(1 for x in abs_diff_column if 0.0 < x <= abs_thresh)
+    errors['count_of_big_abs_diff'] = sum(1 for x in abs_diff_column if x > abs_thresh)
+
+    max_rel_diff = max(rel_diff_column)
+    index_max_rel_diff = rel_diff_column.index(max_rel_diff)
+
+    errors['rel_thresh'] = rel_thresh
+    errors['max_rel_diff'] = max_rel_diff
+    errors['abs_diff_of_max_rel_diff'] = abs_diff_column[index_max_rel_diff]
+    errors['time_of_max_rel_diff'] = times[index_max_rel_diff]
+    if rel_thresh > 0:
+        errors['count_of_small_rel_diff'] = sum(1 for x in rel_diff_column if 0.0 < x <= rel_thresh)
+        errors['count_of_big_rel_diff'] = sum(1 for x in rel_diff_column if x > rel_thresh)
+    else:
+        errors['count_of_small_rel_diff'] = 0
+        errors['count_of_big_rel_diff'] = 0
+
+    if rel_thresh > 0:
+        errors['count_of_small_abs_rel_diff'] = sum(
+            1 for x, y in zip(abs_diff_column, rel_diff_column) if 0 < x <= abs_thresh or 0 < y <= rel_thresh
+        )
+        errors['count_of_big_abs_rel_diff'] = sum(
+            1 for x, y in zip(abs_diff_column, rel_diff_column) if x > abs_thresh and y > rel_thresh
+        )
+    else:
+        errors['count_of_small_abs_rel_diff'] = errors['count_of_small_abs_diff']
+        errors['count_of_big_abs_rel_diff'] = errors['count_of_big_abs_diff']
+
+    return errors
+
+
+def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv):
+    problem, matrices = read_comparable_matrices(input_file_1, input_file_2, err_file)
+    if problem:
+        return problem
+    time1, mat1, mat2, h_order = matrices
+
     # convert time matrix to dictionary (both time matrices should be identical here)
     t_dict = matrix2hdict(time1)
     t_key = list(t_dict.keys())[0]
@@ -313,43 +392,39 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
 
     err_dict = {}
     for key in h_order:
-        err_dict[key] = {}
-
         (abs_thresh, rel_thresh) = thresh_dict.lookup(key)
+        err_dict[key] = column_errors(abs_diffs[key], rel_diffs[key], t_dict[t_key], abs_thresh, rel_thresh)
 
-        max_abs_diff = max(abs_diffs[key])
-        index_max_abs_diff = abs_diffs[key].index(max_abs_diff)
-        err_dict[key]['abs_thresh'] = abs_thresh
-        err_dict[key]['max_abs_diff'] = max_abs_diff
-        err_dict[key]['rel_diff_of_max_abs_diff'] = rel_diffs[key][index_max_abs_diff]
-        err_dict[key]['time_of_max_abs_diff'] = t_dict[t_key][index_max_abs_diff]
-        err_dict[key]['count_of_small_abs_diff'] = sum(1 for x in abs_diffs[key] if 0.0 < x <= abs_thresh)
-        err_dict[key]['count_of_big_abs_diff'] = sum(1 for x in abs_diffs[key] if x > abs_thresh)
-
-        max_rel_diff = max(rel_diffs[key])
-        index_max_rel_diff = rel_diffs[key].index(max_rel_diff)
-
-        err_dict[key]['rel_thresh'] = rel_thresh
-        err_dict[key]['max_rel_diff'] = max_rel_diff
-        err_dict[key]['abs_diff_of_max_rel_diff'] = abs_diffs[key][index_max_rel_diff]
-        err_dict[key]['time_of_max_rel_diff'] = t_dict[t_key][index_max_rel_diff]
-        if rel_thresh > 0:
-            err_dict[key]['count_of_small_rel_diff'] = sum(1 for x in rel_diffs[key] if 0.0 < x <= rel_thresh)
-            err_dict[key]['count_of_big_rel_diff'] = sum(1 for x in rel_diffs[key] if x > rel_thresh)
-        else:
-            err_dict[key]['count_of_small_rel_diff'] = 0
-            err_dict[key]['count_of_big_rel_diff'] = 0
+    def write_diff_files(dh_order):
+        write_diff_columns(abs_diff_file, rel_diff_file, t_dict, dh_order, abs_diffs, rel_diffs)
 
-        if rel_thresh > 0:
-            err_dict[key]['count_of_small_abs_rel_diff'] = sum(
-                1 for x, y in zip(abs_diffs[key], rel_diffs[key]) if 0 < x <= abs_thresh or 0 < y <= rel_thresh
-            )
-            err_dict[key]['count_of_big_abs_rel_diff'] = sum(
-                1 for x, y in zip(abs_diffs[key], rel_diffs[key]) if x > abs_thresh and y > rel_thresh
-            )
-        else:
-            err_dict[key]['count_of_small_abs_rel_diff'] = err_dict[key]['count_of_small_abs_diff']
-            err_dict[key]['count_of_big_abs_rel_diff'] = err_dict[key]['count_of_big_abs_diff']
+    return report_math_diff(
+        input_file_1, input_file_2, err_file, summary_csv, t_key, len(t_dict[t_key]), h_order, err_dict,
+        write_diff_files, lambda: (make_summary_dict(t_dict, hdict1), make_summary_dict(t_dict, hdict2))
+    )
+
+
+def write_diff_columns(abs_diff_file, rel_diff_file, t_dict, dh_order, abs_diffs, rel_diffs):
+    """write the absolute and relative difference header dicts out for the fields in dh_order"""
+    t_key = list(t_dict.keys())[0]
+    # put the time column back
+    abs_diffs[t_key] = t_dict[t_key]
+    rel_diffs[t_key] = t_dict[t_key]
+    tdh_order = [t_key] + dh_order
+
+    # Convert the absolute and relative diff dictionaries to matrices and write them to files
+    abs_diff_mat = hdict2matrix(tdh_order, abs_diffs)
+    mycsv.writecsv(abs_diff_mat, abs_diff_file)
+    rel_diff_mat = hdict2matrix(tdh_order, rel_diffs)
+    mycsv.writecsv(rel_diff_mat, rel_diff_file)
+
+
+def report_math_diff(input_file_1, input_file_2, err_file, summary_csv, t_key, num_records, h_order, err_dict,
+                     write_diff_files, get_summaries):
+    """tally up the error dict and write out the summary, diff and error files.
+    The difference columns and the input summaries are only needed when there are diffs, so the absolute and relative
+    diff files are written by write_diff_files(dh_order), and get_summaries() returns the make_summary_dict results for
+    both input files"""
 
     num_small = sum(err_dict[key]['count_of_small_abs_rel_diff'] for key in h_order)
     num_big = sum(err_dict[key]['count_of_big_abs_rel_diff'] for key in h_order)
@@ -360,8 +435,6 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
     elif num_small > 0:
         diff_type = 'Small Diffs'
 
-    num_records = len(t_dict[t_key])
-
     input_file_path_tokens = input_file_1.split(os.sep)
 
     # if it's the first pass, create the file with the header;
@@ -398,13 +471,8 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
     abs_diff_of_max_max_rel_diff = err_dict[key_of_max_max_rel_diff]['abs_diff_of_max_rel_diff']
     time_of_max_max_rel_diff = err_dict[key_of_max_max_rel_diff]['time_of_max_rel_diff']
 
-    # put the time column back
-    abs_diffs[t_key] = t_dict[t_key]
-    rel_diffs[t_key] = t_dict[t_key]
-
     # Summarize the input files
-    summary_dict1 = make_summary_dict(t_dict, hdict1)
-    summary_dict2 = make_summary_dict(t_dict, hdict2)
+    summary_dict1, summary_dict2 = get_summaries()
 
     # Flatten summaries out to dictionaries of lists rather than dictionaries of dictionaries
     summary_dict12 = dict_of_dicts2dict_of_lists(summary_dict1, h_order, list(summary_labels))
@@ -424,12 +492,7 @@ def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_f
     th_order = [t_key] + h_order
     tdh_order = [t_key] + dh_order
 
-    # Convert the absolute and relative diff dictionaries to matrices and write them to files
-    abs_diff_mat = hdict2matrix(tdh_order, abs_diffs)
-    # print("Trying to write to %s " % abs_diff_file)
-    mycsv.writecsv(abs_diff_mat, abs_diff_file)
-    rel_diff_mat = hdict2matrix(tdh_order, rel_diffs)
-    mycsv.writecsv(rel_diff_mat, rel_diff_file)
+    write_diff_files(dh_order)
 
     # Write the error file header
     mycsv.writecsv(
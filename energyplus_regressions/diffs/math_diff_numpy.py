@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+A NumPy engine for math_diff, with the same arguments, results and output files as math_diff.math_diff.
+
+Only the cells that differ as strings between the two files are parsed to work out the differences, and the
+threshold counts and maxima of every column are computed on float arrays.  The reference abs_diff and rel_diff return
+int flags (0 for identical strings, 999 for a relative diff against zero, 9999 for anything that doesn't parse) rather
+than floats, and those end up in the output files as ints, so alongside each array of differences is a mask of which
+cells hold one of the int flags.  A column that turns up a non-finite difference goes through the reference functions
+instead, since Python's max() and NumPy's argmax() disagree once NaN is involved.
+"""
+
+from operator import ne
+
+import numpy as np
+
+from energyplus_regressions.diffs.math_diff import (
+    abs_diff,
+    check_duplicate_headers,
+    column_errors,
+    error_labels,
+    read_comparable_matrices,
+    rel_diff,
+    report_math_diff,
+    summarize_column,
+    write_diff_columns,
+)
+
+
+def parse_column(cells):
+    """parse a column of csv strings into floats, returning the values and a mask of which cells were numeric.
+    Cells that aren't numeric are left at 0.0 in the values"""
+    count = len(cells)
+    try:
+        return np.fromiter(map(float, cells), np.float64, count), np.ones(count, dtype=bool)
+    except ValueError:
+        pass
+    # blank cells are by far the most common non-numeric cell, where variables report at different frequencies
+    numeric = np.fromiter(map(bool, cells), bool, count)
+    try:
+        return np.fromiter(map(float, (cell if cell else '0' for cell in cells)), np.float64, count), numeric
+    except ValueError:
+        pass
+    values = np.zeros(count)
+    for i, cell in enumerate(cells):
+        try:
+            values[i] = float(cell)
+        except ValueError:
+            numeric[i] = False
+    return values, numeric
+
+
+def diff_columns(cells_1, cells_2):
+    """vectorized abs_diff and rel_diff between two columns of csv strings.
+    Only the cells that differ as strings need to be parsed, since identical cells always diff to an int 0.
+    Returns (abs_values, abs_flags, rel_values, rel_flags), where the flags mark cells holding one of the int results
+    of abs_diff/rel_diff, or None if any difference is not finite"""
+    count = len(cells_1)
+    differ = np.flatnonzero(np.fromiter(map(ne, cells_1, cells_2), bool, count))
+    values_1, numeric_1 = parse_column([cells_1[i] for i in differ])
+    values_2, numeric_2 = parse_column([cells_2[i] for i in differ])
+    both_numeric = numeric_1 & numeric_2
+    zero_1 = numeric_1 & (values_1 == 0)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        delta = values_1 - values_2
+        abs_differ = np.abs(delta)
+        rel_differ = np.abs(delta / values_1)
+
+    # same precedence as the reference functions, assigned from the lowest to the highest
+    abs_differ[~both_numeric] = 9999
+    rel_differ[~numeric_2] = 9999
+    rel_differ[zero_1] = 999
+    rel_differ[~numeric_1] = 9999
+    if not (np.isfinite(abs_differ).all() and np.isfinite(rel_differ).all()):
+        return None
+
+    abs_values = np.zeros(count)
+    abs_values[differ] = abs_differ
+    abs_flags = np.ones(count, dtype=bool)
+    abs_flags[differ] = ~both_numeric
+    rel_values = np.zeros(count)
+    rel_values[differ] = rel_differ
+    rel_flags = np.ones(count, dtype=bool)
+    rel_flags[differ] = ~numeric_1 | zero_1 | ~numeric_2
+    return abs_values, abs_flags, rel_values, rel_flags
+
+
+def identical_column_errors(times, abs_thresh, rel_thresh):
+    """the error dict entries of a column that is identical in both files, where every difference is an int 0"""
+    errors = {label: 0 for label in error_labels}
+    errors['abs_thresh'] = abs_thresh
+    errors['time_of_max_abs_diff'] = times[0]
+    errors['rel_thresh'] = rel_thresh
+    errors['time_of_max_rel_diff'] = times[0]
+    return errors
+
+
+def python_value(values, flags, index):
+    return int(values[index]) if flags[index] else float(values[index])
+
+
+def python_list(values, flags):
+    """the column as the reference functions would have produced it, with ints where they return ints"""
+    return np.where(flags, values.astype(np.int64).astype(object), values.astype(object)).tolist()
+
+
+def vectorized_column_errors(abs_values, abs_flags, rel_values, rel_flags, times, abs_thresh, rel_thresh):
+    """the same error dict entries as math_diff.column_errors, from the arrays of differences"""
+    errors = {}
+
+    # argmax returns the first of any tied maxima, just like max() followed by index()
+    index_max_abs_diff = int(np.argmax(abs_values))
+    small_abs = (abs_values > 0.0) & (abs_values <= abs_thresh)
+    big_abs = abs_values > abs_thresh
+    errors['abs_thresh'] = abs_thresh
+    errors['max_abs_diff'] = python_value(abs_values, abs_flags, index_max_abs_diff)
+    errors['rel_diff_of_max_abs_diff'] = python_value(rel_values, rel_flags, index_max_abs_diff)
+    errors['time_of_max_abs_diff'] = times[index_max_abs_diff]
+    errors['count_of_small_abs_diff'] = int(np.count_nonzero(small_abs))
+    errors['count_of_big_abs_diff'] = int(np.count_nonzero(big_abs))
+
+    index_max_rel_diff = int(np.argmax(rel_values))
+    errors['rel_thresh'] = rel_thresh
+    errors['max_rel_diff'] = python_value(rel_values, rel_flags, index_max_rel_diff)
+    errors['abs_diff_of_max_rel_diff'] = python_value(abs_values, abs_flags, index_max_rel_diff)
+    errors['time_of_max_rel_diff'] = times[index_max_rel_diff]
+    if rel_thresh > 0:
+        small_rel = (rel_values > 0.0) & (rel_values <= rel_thresh)
+        big_rel = rel_values > rel_thresh
+        errors['count_of_small_rel_diff'] = int(np.count_nonzero(small_rel))
+        errors['count_of_big_rel_diff'] = int(np.count_nonzero(big_rel))
+        errors['count_of_small_abs_rel_diff'] = int(np.count_nonzero(small_abs | small_rel))
+        errors['count_of_big_abs_rel_diff'] = int(np.count_nonzero(big_abs & big_rel))
+    else:
+        errors['count_of_small_rel_diff'] = 0
+        errors['count_of_big_rel_diff'] = 0
+        errors['count_of_small_abs_rel_diff'] = errors['count_of_small_abs_diff']
+        errors['count_of_big_abs_rel_diff'] = errors['count_of_big_abs_diff']
+
+    return errors
+
+
+def summary_column(cells, values, numeric):
+    """the column as make_summary_dict converts it, blanks as int 0, or None if make_summary_dict would give up"""
+    column = values.astype(object)
+    for i in np.flatnonzero(~numeric):
+        if cells[i].strip() != '':
+            return None
+        column[i] = 0
+    return column.tolist()
+
+
+def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv):
+    problem, matrices = read_comparable_matrices(input_file_1, input_file_2, err_file)
+    if problem:
+        return problem
+    time1, mat1, mat2, h_order = matrices
+
+    t_key = time1[0][0]
+    t_dict = {t_key: [row[0] for row in time1[1:]]}
+    times = t_dict[t_key]
+
+    check_duplicate_headers(mat1[0])
+    check_duplicate_headers(mat2[0])
+    columns_1 = dict(zip(mat1[0], zip(*mat1[1:])))
+    columns_2 = dict(zip(mat2[0], zip(*mat2[1:])))
+
+    diffs = {}
+    err_dict = {}
+    for key in h_order:
+        cells_1 = columns_1[key]
+        cells_2 = columns_2[key]
+        (abs_thresh, rel_thresh) = thresh_dict.lookup(key)
+        if cells_1 == cells_2:
+            err_dict[key] = identical_column_errors(times, abs_thresh, rel_thresh)
+            continue
+        vectorized = diff_columns(cells_1, cells_2)
+        if vectorized:
+            diffs[key] = vectorized
+            err_dict[key] = vectorized_column_errors(*vectorized, times, abs_thresh, rel_thresh)
+        else:
+            abs_diff_column = list(map(abs_diff, cells_1, cells_2))
+            rel_diff_column = list(map(rel_diff, cells_1, cells_2))
+            diffs[key] = abs_diff_column, rel_diff_column
+            err_dict[key] = column_errors(abs_diff_column, rel_diff_column, times, abs_thresh, rel_thresh)
+
+    def write_diff_files(dh_order):
+        abs_diffs = {}
+        rel_diffs = {}
+        for k in dh_order:
+            if len(diffs[k]) == 4:
+                abs_values, abs_flags, rel_values, rel_flags = diffs[k]
+                abs_diffs[k] = python_list(abs_values, abs_flags)
+                rel_diffs[k] = python_list(rel_values, rel_flags)
+            else:
+                abs_diffs[k], rel_diffs[k] = diffs[k]
+        write_diff_columns(abs_diff_file, rel_diff_file, t_dict, dh_order, abs_diffs, rel_diffs)
+
+    def get_summaries():
+        summaries = []
+        for columns in [columns_1, columns_2]:
+            summary_dict = {}
+            for k in h_order:
+                column = summary_column(columns[k], *parse_column(columns[k]))
+                summary_dict[k] = summarize_column(column, times) if column is not None else {}
+            summaries.append(summary_dict)
+        return summaries
+
+    return report_math_diff(
+        input_file_1, input_file_2, err_file, summary_csv, t_key, len(times), h_order, err_dict,
+        write_diff_files, get_summaries
+    )
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+A streaming engine for math_diff, with the same arguments, results and output files as math_diff.math_diff, for csv
+files too big to hold in memory several times over.
+
+Both files are read side by side in blocks of rows, keeping running error aggregates for every column, so memory is
+bounded by the block size times the number of columns rather than by the length of the files.  Which fields differ
+isn't known until the end of the files, so when there are diffs a second pass summarizes the inputs and writes the
+absolute and relative diff files a block at a time.  Files the reference engine treats specially (missing, empty,
+header only, a single column, or not readable as text) are handed straight to it.
+"""
+
+import csv
+from itertools import islice, zip_longest
+from math import isfinite
+from operator import gt, lt
+import os
+import sys
+
+from energyplus_regressions.diffs import math_diff as reference
+from energyplus_regressions.diffs.math_diff import (
+    abs_diff,
+    check_duplicate_headers,
+    common_field_order,
+    error_labels,
+    info,
+    rel_diff,
+    report_math_diff,
+)
+
+# small blocks keep the working set in cache, on a 200 column, 30000 row file 100 rows per block ran faster than
+# 1000 or 10000 and peaked at a fifth of the memory of 1000
+DEFAULT_BLOCK_ROWS = 100
+
+# from Python 3.12 sum() adds floats with Neumaier's compensated summation, folding the compensation in only once it
+# reaches the end, so a sum carried on from block to block has to keep its own compensation to come out the same
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+# the error dict entries that are added up block by block, and the ones that decide whether a field has diffs
+COUNT_LABELS = [label for label in error_labels if label.startswith('count_of_')]
+DIFF_COUNT_LABELS = ['count_of_small_abs_diff', 'count_of_big_abs_diff', 'count_of_small_rel_diff',
+                     'count_of_big_rel_diff']
+
+
+def read_blocks(csv_file, block_rows):
+    """yields the stripped header row of an open csv file, then blocks of its rows, each row padded or trimmed to the
+    length of the header just like fill_matrix_holes"""
+    reader = csv.reader(csv_file)
+    header = [cell.strip() for cell in next(reader)]
+    yield header
+    num_cols = len(header)
+    while True:
+        block = list(islice(reader, block_rows))
+        if not block:
+            return
+        yield [row + [''] * (num_cols - len(row)) if len(row) < num_cols else row[:num_cols] for row in block]
+
+
+def streamable(input_file):
+    """whether the reference engine would read the file as an ordinary matrix with a header and some data"""
+    try:
+        with open(input_file) as f:
+            rows = list(islice(csv.reader(f), 2))
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return False
+    return len(rows) == 2 and len(rows[0]) > 1
+
+
+def running_extreme(current, values, better):
+    """the index in values of the new running max() (better=gt) or min() (better=lt) of a column, if values were the
+    next block of it and current the result so far (None at the start).  Returns None if the result doesn't change.
+    Ties and NaN go exactly as they would for max()/min() followed by index() over the whole column"""
+    if current is None:
+        current = values[0]
+        if current != current:  # a leading NaN is the result of the whole column
+            return 0
+        index = 0
+    else:
+        index = None
+    total = sum(values)
+    if total == total:  # no NaN in the block, so the block's own max/min and one comparison will do
+        extreme = max(values) if better is gt else min(values)
+        if index == 0 or better(extreme, current):
+            return values.index(extreme)
+        return None
+    for i, x in enumerate(values):
+        if better(x, current):
+            current = x
+            index = i
+    return index
+
+
+class RunningErrors:
+    """the column_errors of one field, accumulated a block of difference columns at a time"""
+
+    def __init__(self, abs_thresh, rel_thresh):
+        self.abs_thresh = abs_thresh
+        self.rel_thresh = rel_thresh
+        self.max_abs_diff = None
+        self.rel_diff_of_max_abs_diff = None
+        self.time_of_max_abs_diff = None
+        self.max_rel_diff = None
+        self.abs_diff_of_max_rel_diff = None
+        self.time_of_max_rel_diff = None
+        self.counts = dict.fromkeys(COUNT_LABELS, 0)
+
+    def add_identical(self, times):
+        """a block where the field is identical in both files, so every difference is an int 0"""
+        if self.max_abs_diff is None:
+            self.add([0], [0], times)
+
+    def add(self, abs_diff_column, rel_diff_column, times):
+        i = running_extreme(self.max_abs_diff, abs_diff_column, gt)
+        if i is not None:
+            self.max_abs_diff = abs_diff_column[i]
+            self.rel_diff_of_max_abs_diff = rel_diff_column[i]
+            self.time_of_max_abs_diff = times[i]
+        i = running_extreme(self.max_rel_diff, rel_diff_column, gt)
+        if i is not None:
+            self.max_rel_diff = rel_diff_column[i]
+            self.abs_diff_of_max_rel_diff = abs_diff_column[i]
+            self.time_of_max_rel_diff = times[i]
+
+        abs_thresh = self.abs_thresh
+        rel_thresh = self.rel_thresh
+        counts = self.counts
+        counts['count_of_small_abs_diff'] += sum(1 for x in abs_diff_column if 0.0 < x <= abs_thresh)
+        counts['count_of_big_abs_diff'] += sum(1 for x in abs_diff_column if x > abs_thresh)
+        if rel_thresh > 0:
+            counts['count_of_small_rel_diff'] += sum(1 for x in rel_diff_column if 0.0 < x <= rel_thresh)
+            counts['count_of_big_rel_diff'] += sum(1 for x in rel_diff_column if x > rel_thresh)
+            counts['count_of_small_abs_rel_diff'] += sum(
+                1 for x, y in zip(abs_diff_column, rel_diff_column) if 0 < x <= abs_thresh or 0 < y <= rel_thresh
+            )
+            counts['count_of_big_abs_rel_diff'] += sum(
+                1 for x, y in zip(abs_diff_column, rel_diff_column) if x > abs_thresh and y > rel_thresh
+            )
+
+    def errors(self):
+        errors = dict(self.counts)
+        for label in error_labels:
+            if label not in errors:
+                errors[label] = getattr(self, label)
+        if self.rel_thresh <= 0:
+            errors['count_of_small_abs_rel_diff'] = errors['count_of_small_abs_diff']
+            errors['count_of_big_abs_rel_diff'] = errors['count_of_big_abs_diff']
+        return errors
+
+
+class RunningSummary:
+    """the summarize_column of one field of one file, accumulated a block of csv cells at a time"""
+
+    def __init__(self):
+        self.column_error = False
+        self.count = 0
+        self.sum = 0
+        self.compensation = 0.0
+        self.max = self.min = self.time_of_max = self.time_of_min = None
+        self.nz_count = 0
+        self.nz_max = self.nz_min = self.nz_time_of_max = self.nz_time_of_min = None
+
+    def add(self, cells, times):
+        if self.column_error:
+            return
+        try:
+            column = [0 if cell.strip() == '' else float(cell) for cell in cells]
+        except ValueError:  # make_summary_dict gives up on the whole column
+            self.column_error = True
+            return
+        self.count += len(column)
+        self.add_to_sum(column)
+        i = running_extreme(self.max, column, gt)
+        if i is not None:
+            self.max, self.time_of_max = column[i], times[i]
+        i = running_extreme(self.min, column, lt)
+        if i is not None:
+            self.min, self.time_of_min = column[i], times[i]
+
+        nz_items = [item for item in column if item != 0]
+        if not nz_items:
+            return
+        self.nz_count += len(nz_items)
+        # the first cell equal to a non-zero item is always a non-zero item itself, so index() finds the same one
+        i = running_extreme(self.nz_max, nz_items, gt)
+        if i is not None:
+            self.nz_max = nz_items[i]
+            self.nz_time_of_max = times[column.index(self.nz_max)]
+        i = running_extreme(self.nz_min, nz_items, lt)
+        if i is not None:
+            self.nz_min = nz_items[i]
+            self.nz_time_of_min = times[column.index(self.nz_min)]
+
+    def add_to_sum(self, column):
+        if not COMPENSATED_SUM:
+            # sum() carries on from a start value just as if it had gone through the whole column in one go
+            self.sum = sum(column, self.sum)
+            return
+        total, compensation = self.sum, self.compensation
+        for item in column:
+            if type(total) is int:  # only blank cells so far, which sum() adds as ints until it meets a float
+                total += item
+                continue
+            t = total + item
+            if abs(total) >= abs(item):
+                compensation += (total - t) + item
+            else:
+                compensation += (item - t) + total
+            total = t
+        self.sum, self.compensation = total, compensation
+
+    def total(self):
+        # as sum() finishes, without letting the compensation turn an infinite sum into a NaN
+        if self.compensation and isfinite(self.compensation):
+            return self.sum + self.compensation
+        return self.sum
+
+    def summary(self):
+        if self.column_error:
+            return {}
+        total = self.total()
+        summary = {
+            'count': self.count, 'sum': total, 'max': self.max, 'min': self.min,
+            'average': total / self.count, 'time_of_max': self.time_of_max, 'time_of_min': self.time_of_min,
+        }
+        if not self.nz_count:
+            summary.update(dict.fromkeys(
+                ['nz_sum', 'nz_max', 'nz_min', 'nz_average', 'nz_time_of_max', 'nz_time_of_min'], 0.0
+            ))
+            summary['nz_count'] = 0
+        else:
+            summary['nz_count'] = self.nz_count
+            summary['nz_sum'] = self.nz_max  # same as the reference engine
+            summary['nz_max'] = self.nz_max
+            summary['nz_min'] = self.nz_min
+            summary['nz_average'] = summary['nz_sum'] / summary['nz_count']
+            summary['nz_time_of_max'] = self.nz_time_of_max
+            summary['nz_time_of_min'] = self.nz_time_of_min
+        return summary
+
+
+def paired_blocks(input_file_1, input_file_2, block_rows):
+    """yields the header rows of both files, then pairs of (times_1, times_2, columns_1, columns_2) for each block of
+    rows, with the columns split out of the rows.  Everything is None past the end of the shorter file"""
+    with open(input_file_1) as f_1, open(input_file_2) as f_2:
+        blocks_1 = read_blocks(f_1, block_rows)
+        blocks_2 = read_blocks(f_2, block_rows)
+        yield next(blocks_1), next(blocks_2)
+        for rows_1, rows_2 in zip_longest(blocks_1, blocks_2):
+            if rows_1 is None or rows_2 is None:
+                yield None, None, None, None
+                return
+            columns_1 = list(zip(*rows_1))
+            columns_2 = list(zip(*rows_2))
+            yield columns_1[0], columns_2[0], columns_1, columns_2
+
+
+def math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv,
+              block_rows=DEFAULT_BLOCK_ROWS):
+    if not (streamable(input_file_1) and streamable(input_file_2)):
+        return reference.math_diff(
+            thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv
+        )
+    try:
+        return streaming_math_diff(
+            thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv, block_rows
+        )
+    except (UnicodeDecodeError, csv.Error):  # partway into the files, and nothing has been written yet
+        return reference.math_diff(
+            thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv
+        )
+
+
+def streaming_math_diff(thresh_dict, input_file_1, input_file_2, abs_diff_file, rel_diff_file, err_file, summary_csv,
+                        block_rows):
+    blocks = paired_blocks(input_file_1, input_file_2, block_rows)
+    header_1, header_2 = next(blocks)
+    t_key = header_1[0]
+    h_set = set(header_1[1:]).intersection(header_2[1:])
+    # compare whatever can be compared, but headers that can't be will only be complained about once the time series
+    # have been found to match, to report problems in the same order as the reference engine
+    comparable = len(set(header_1[1:])) == len(header_1) - 1 and len(set(header_2[1:])) == len(header_2) - 1
+    h_order = [h for h in header_1[1:] if h in h_set] if comparable else []
+    index_1 = {h: i for i, h in enumerate(header_1)}
+    index_2 = {h: i for i, h in enumerate(header_2)}
+    running_errors = {key: RunningErrors(*thresh_dict.lookup(key)) for key in h_order}
+
+    times_match = t_key == header_2[0]
+    num_records = 0
+    for times_1, times_2, columns_1, columns_2 in blocks:
+        if not times_match or times_1 is None or times_1 != times_2:
+            times_match = False
+            break
+        num_records += len(times_1)
+        for key in h_order:
+            cells_1 = columns_1[index_1[key]]
+            cells_2 = columns_2[index_2[key]]
+            if cells_1 == cells_2:
+                running_errors[key].add_identical(times_1)
+            else:
+                running_errors[key].add(
+                    list(map(abs_diff, cells_1, cells_2)), list(map(rel_diff, cells_1, cells_2)), times_1
+                )
+    blocks.close()
+
+    if not times_match:
+        info('Time series in <%s> and <%s> do not match' % (input_file_1, input_file_2), err_file)
+        return 'Time series do not match', 0, 0, 0
+    h_order = common_field_order(header_1[1:], header_2[1:], input_file_1, input_file_2, err_file)
+    if h_order is None:
+        return 'No common fields', 0, 0, 0
+    check_duplicate_headers(header_1[1:])
+    check_duplicate_headers(header_2[1:])
+
+    err_dict = {key: running_errors[key].errors() for key in h_order}
+    partial_files = [abs_diff_file + '.partial', rel_diff_file + '.partial']
+
+    def get_summaries():
+        # the second pass, summarizing both files and writing the diffs for whichever fields turn out to be needed
+        dh_order = [h for h in h_order if any(err_dict[h][label] > 0 for label in DIFF_COUNT_LABELS)]
+        summaries_1 = {key: RunningSummary() for key in h_order}
+        summaries_2 = {key: RunningSummary() for key in h_order}
+        with open(partial_files[0], 'w') as abs_f, open(partial_files[1], 'w') as rel_f:
+            abs_writer = csv.writer(abs_f)
+            rel_writer = csv.writer(rel_f)
+            abs_writer.writerow([t_key] + dh_order)
+            rel_writer.writerow([t_key] + dh_order)
+            second_pass = paired_blocks(input_file_1, input_file_2, block_rows)
+            next(second_pass)
+            for times, _, columns_1, columns_2 in second_pass:
+                for key in h_order:
+                    summaries_1[key].add(columns_1[index_1[key]], times)
+                    summaries_2[key].add(columns_2[index_2[key]], times)
+                pairs = [(columns_1[index_1[key]], columns_2[index_2[key]]) for key in dh_order]
+                abs_writer.writerows(zip(times, *(map(abs_diff, c_1, c_2) for c_1, c_2 in pairs)))
+                rel_writer.writerows(zip(times, *(map(rel_diff, c_1, c_2) for c_1, c_2 in pairs)))
+        return (
+            {key: s.summary() for key, s in summaries_1.items()}, {key: s.summary() for key, s in summaries_2.items()}
+        )
+
+    def write_diff_files(dh_order):
+        os.replace(partial_files[0], abs_diff_file)
+        os.replace(partial_files[1], rel_diff_file)
+
+    try:
+        return report_math_diff(
+            input_file_1, input_file_2, err_file, summary_csv, t_key, num_records, h_order, err_dict,
+            write_diff_files, get_summaries
+        )
+    finally:
+        for partial_file in partial_files:
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
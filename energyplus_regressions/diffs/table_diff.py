@@ -34,12 +34,15 @@ __version__ = "1.4"
 __copyright__ = "Copyright (c) 2009 Santosh Philip and Amir Roth 2013"
 __license__ = "GNU General Public License Version 3"
 
+from collections import deque
 from pathlib import Path
 import sys
 import getopt
 import os.path
 
-from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4 import BeautifulSoup, NavigableString
+from bs4.dammit import EntitySubstitution
+from energyplus_regressions.diffs.table_parser import ParsedTable, UnsupportedTableMarkup, fast_tables
 from energyplus_regressions.diffs.thresh_dict import ThreshDict
 
 help_message = __doc__
@@ -142,83 +145,132 @@ def get_table_unique_heading(table):
         return None
 
 
-def hdict2soup(soup, heading, num, hdict, tdict, horder):
-    """Create soup table (including anchor and heading) from header dictionary and error dictionary"""
-    # Append table anchor
-    atag = Tag(soup, name='a', attrs=[('name', '%s%s' % ('tablehead', num,))])
-    soup.body.append(atag)
-
-    # Append table heading
-    htag = Tag(soup, name='b')
-    htag.append(heading)
-    soup.body.append(htag)
-
-    # Append table
-    tabletag = Tag(soup, name='table', attrs=[('border', '1')])
-    soup.body.append(tabletag)
-
-    # Append column headings
-    trtag = Tag(soup, name='tr')
-    tabletag.append(trtag)
+class PrettyHtmlWriter:
+    """Writes one of the html output files straight to disk as the tables are diffed, laid out just as BeautifulSoup's
+    prettify() would lay out the same tags.  The file is only started once there is something to write, goes to a
+    .partial file until finish() moves it into place, and discard() cleans up anything left unfinished"""
+
+    def __init__(self, path, title):
+        self.path = path
+        self.partial_path = path + '.partial'
+        self.title = title
+        self.f = None
+        self.tail = None
+        # the tables all go inside <html><body>
+        self.depth = 2
+
+    def start_file(self):
+        # the head is tiny, so let the soup lay it out, up to where the body is to be filled in
+        pretty = BeautifulSoup(title_css % (self.title, the_css,), features='html.parser').prettify()
+        head, tail = pretty.rsplit(' </body>\n', 1)
+        self.tail = ' </body>\n' + tail
+        self.f = open(self.partial_path, 'w', encoding='utf-8', errors='ignore', newline='')
+        self.f.write(head)
+
+    def line(self, txt):
+        if self.f is None:
+            self.start_file()
+        self.f.write(' ' * self.depth + txt + '\n')
+
+    def start(self, name, attrs=()):
+        attr_txt = ''.join(
+            ' %s=%s' % (key, EntitySubstitution.quoted_attribute_value(EntitySubstitution.substitute_xml(val)))
+            for key, val in sorted(attrs)
+        )
+        self.line('<%s%s>' % (name, attr_txt))
+        self.depth += 1
+
+    def end(self, name):
+        self.depth -= 1
+        self.line('</%s>' % name)
+
+    def text(self, txt):
+        txt = EntitySubstitution.substitute_xml(txt).strip()
+        if txt:
+            self.line(txt)
+
+    def element(self, name, txt, attrs=()):
+        self.start(name, attrs)
+        self.text(txt)
+        self.end(name)
+
+    def finish(self):
+        """complete the file and move it into place, returning False if nothing was ever written"""
+        if self.f is None:
+            return False
+        self.f.write(self.tail)
+        self.f.close()
+        os.replace(self.partial_path, self.path)
+        return True
+
+    def discard(self):
+        if self.f is not None and not self.f.closed:
+            self.f.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+def hdict2html(writer, heading, num, hdict, tdict, horder):
+    """Write html table (including anchor and heading) from header dictionary and error dictionary"""
+    # Table anchor and heading
+    writer.element('a', '', attrs=[('name', '%s%s' % ('tablehead', num,))])
+    writer.element('b', heading)
+
+    writer.start('table', attrs=[('border', '1')])
+
+    # Column headings
+    writer.start('tr')
     for h in horder:
-        tdtag = Tag(soup, name='th')
-        if h != 'DummyPlaceholder':
-            tdtag.append(str(h))
-        else:
-            tdtag.append('')
-        trtag.append(tdtag)
+        writer.element('th', str(h) if h != 'DummyPlaceholder' else '')
+    writer.end('tr')
 
-    # Append column thresholds
-    trtag = Tag(soup, name='tr')
-    tabletag.append(trtag)
+    # Column thresholds
+    writer.start('tr')
     for h in horder:
-        tdtag = Tag(soup, name='td')
-        trtag.append(tdtag)
-        if h in tdict:
-            (abs_thresh, rel_thresh) = tdict[h]
-            tdtag.append(str(abs_thresh))
-        else:
-            tdtag.append('Absolute threshold')
+        writer.element('td', str(tdict[h][0]) if h in tdict else 'Absolute threshold')
+    writer.end('tr')
 
-    trtag = Tag(soup, name='tr')
-    tabletag.append(trtag)
+    writer.start('tr')
     for h in horder:
-        tdtag = Tag(soup, name='td')
-        trtag.append(tdtag)
-        if h in tdict:
-            (abs_thresh, rel_thresh) = tdict[h]
-            tdtag.append(str(rel_thresh))
-        else:
-            tdtag.append('Relative threshold')
+        writer.element('td', str(tdict[h][1]) if h in tdict else 'Relative threshold')
+    writer.end('tr')
 
-    # Append table rows
+    # Table rows
     for i in range(0, len(hdict[horder[0]])):
-        trtag = Tag(soup, name='tr')
-        tabletag.append(trtag)
+        writer.start('tr')
         for h in horder:
             if h not in hdict:
-                tdtag = Tag(soup, name='td', attrs=[("class", "big")])
-                tdtag.append('ColumnHeadingDifference')
+                writer.element('td', 'ColumnHeadingDifference', attrs=[('class', 'big')])
             elif h == 'DummyPlaceholder' or h == 'Subcategory':
                 # Some tables such as the Source Energy End Use Components
                 # have a blank row full of `<td>&nbsp;</td>` which won't be
                 # decoded nicely
-                tdtag = Tag(soup, name='td')
-                val = hdict[h][i]
-                try:
-                    tdtag.append(str(val))
-                except Exception:  # pragma: no cover
-                    val = val.encode('ascii', 'ignore').decode('ascii')
-                    tdtag.append(str(val))
+                writer.element('td', str(hdict[h][i]))
             else:
                 (diff, which) = hdict[h][i]
-                tdtag = Tag(soup, name='td', attrs=[('class', which)])
-                try:
-                    tdtag.append(str(diff))
-                except Exception:  # pragma: no cover
-                    diff = diff.encode('ascii', 'ignore').decode('ascii')
-                    tdtag.append(str(diff))
-            trtag.append(tdtag)
+                writer.element('td', str(diff), attrs=[('class', which)])
+        writer.end('tr')
+
+    writer.end('table')
+
+
+def soup_tables(html_txt):
+    """the tables of an html document as ParsedTable instances, read through BeautifulSoup"""
+    soup = BeautifulSoup(html_txt, features='html.parser')
+    tables = []
+    for table in soup('table'):
+        rows = [[td.contents[0] if td.contents else None for td in trow('td')] for trow in table('tr')]
+        tables.append(ParsedTable(get_table_unique_heading(table), rows, len(table('td'))))
+    return tables
+
+
+def extract_tables(html_txt):
+    """the tables of an html document as ParsedTable instances, read by the single pass table extractor unless the
+    document has markup it doesn't handle, in which case BeautifulSoup reads it instead"""
+    try:
+        return fast_tables(html_txt)
+    except UnsupportedTableMarkup:
+        return soup_tables(html_txt)
 
 
 # Convert html table to heading dictionary (and header list) in single step
@@ -226,15 +278,11 @@ def table2hdict_horder(table, table_a=None):
     # If table_a_hdict is passed in, we can try to match the row order to avoid diffs just due to row order
     hdict = {}
     horder = []
-    trows = table('tr')
+    trows = table.rows
 
     # Create dictionary headings
-    for htd in trows[0]('td'):
-        try:
-            hcontents = htd.contents[0]
-        except IndexError:
-            hcontents = 'DummyPlaceholder'
-
+    headings = ['DummyPlaceholder' if htd is None else htd for htd in trows[0]]
+    for hcontents in headings:
         hdict[hcontents] = []
         horder.append(hcontents)
 
@@ -250,113 +298,67 @@ def table2hdict_horder(table, table_a=None):
     # I think the only way to handle this robustly would be to use the entire
     #  row as the key, which is annoying, but should work well.
     if table_a:
-        # process the rows of the "base" table_a that was provided into a list of search keys
-        trows_a = table_a('tr')
-        table_a_row_order = []
-        for trow in trows_a[1:]:
-            search_key = []
-            for tcol in trow('td'):
-                if tcol.contents:
-                    search_key.append(tcol.contents[0])
-                else:  # pragma: no cover
-                    # I really don't think we can make it here while searching, but I don't want to accidentally crash
-                    search_key.append("")
-            table_a_row_order.append(search_key)
-        # process the rows of the "mod" table that was provided into a list of search keys
-        found_table_b_row_order = []
-        for trow in trows[1:]:
-            search_key = []
-            for tcol in trow('td'):
-                if tcol.contents:
-                    search_key.append(tcol.contents[0])
-                else:  # pragma: no cover
-                    # I really don't think we can make it here while searching, but I don't want to accidentally crash
-                    search_key.append("")
-            found_table_b_row_order.append(search_key)
+        # process the rows of the "base" table_a and the "mod" table into lists of search keys
+        table_a_row_order = [tuple("" if tcol is None else tcol for tcol in trow) for trow in table_a.rows[1:]]
+        found_table_b_row_order = [tuple("" if tcol is None else tcol for tcol in trow) for trow in trows[1:]]
         # it's the same order exactly, skip any searching and just run with search_rows as-is
         if table_a_row_order == found_table_b_row_order:
             pass
         # if not exactly the same but overall the same stuff, it's reordered and we can match things up
         elif sorted(table_a_row_order) == sorted(found_table_b_row_order):
-            # now just build the list of trows to search by index based on table a order
-            search_rows = []
-            for to_find_val in table_a_row_order:
-                for search_row_index, trow in enumerate(trows[1:]):
-                    if found_table_b_row_order[search_row_index] == to_find_val:
-                        search_rows.append(trow)
-                        break
+            # index the rows by their search key, rows with the same key (like the blank spacing rows) are identical,
+            #  so they are just handed out in the order they appear
+            rows_by_key = {}
+            for row_key, trow in zip(found_table_b_row_order, trows[1:]):
+                rows_by_key.setdefault(row_key, deque()).append(trow)
+            # now just build the list of trows by key based on table a order
+            search_rows = [rows_by_key[row_key].popleft() for row_key in table_a_row_order]
 
     # whether it was reordered or just using the literal order, build out the hdict instance to pass back
     for trow in search_rows:
-        for htd, td in zip(trows[0]('td'), trow('td')):
-            try:
-                hcontents = htd.contents[0]
-            except IndexError:
-                hcontents = 'DummyPlaceholder'
-
-            try:
-                contents = td.contents[0]
-            except IndexError:
-                contents = ''
-
-            hdict[hcontents].append(contents)
+        for hcontents, td in zip(headings, trow):
+            hdict[hcontents].append('' if td is None else td)
 
     return hdict, horder
 
 
-def make_err_table_row(err_soup, tabletag, uheading, count_of_tables, abs_diff_file, rel_diff_file,
+def make_err_table_row(err_writer, uheading, count_of_tables, abs_diff_file, rel_diff_file,
                        small_diff, big_diff, equal, string_diff, size_error, not_in_1, not_in_2):
     # Create entry in error table
-    trtag = Tag(err_soup, name='tr')
-    tabletag.append(trtag)
-
-    tdtag_name = Tag(err_soup, name='td')
-    trtag.append(tdtag_name)
-    tdtag_name.append(uheading)
-
-    tdtag_abs_link = Tag(err_soup, name='td')
-    trtag.append(tdtag_abs_link)
+    err_writer.start('tr')
 
-    tdtag_rel_link = Tag(err_soup, name='td')
-    trtag.append(tdtag_rel_link)
+    err_writer.element('td', uheading)
 
     if small_diff > 0 or big_diff > 0 or string_diff > 0:
         file_name = os.path.basename(abs_diff_file)
-        atag = Tag(err_soup, name='a', attrs=[('href', '%s#tablehead%s' % (file_name, count_of_tables))])
-        atag.append('abs file')
-        tdtag_abs_link.append(atag)
+        err_writer.start('td')
+        err_writer.element('a', 'abs file', attrs=[('href', '%s#tablehead%s' % (file_name, count_of_tables))])
+        err_writer.end('td')
 
         file_name = os.path.basename(rel_diff_file)
-        atag = Tag(err_soup, name='a', attrs=[('href', '%s#tablehead%s' % (file_name, count_of_tables))])
-        atag.append('rel file')
-        tdtag_rel_link.append(atag)
-
-    tdtag_big_diff = Tag(err_soup, name='td', attrs=[('class', 'big')] if big_diff > 0 else [])
-    trtag.append(tdtag_big_diff)
-    tdtag_big_diff.append(str(big_diff))
-
-    tdtag_small_diff = Tag(err_soup, name='td', attrs=[('class', 'small')] if small_diff > 0 else [])
-    trtag.append(tdtag_small_diff)
-    tdtag_small_diff.append(str(small_diff))
-
-    tdtag_equal = Tag(err_soup, name='td', attrs=[])
-    trtag.append(tdtag_equal)
-    tdtag_equal.append(str(equal))
-
-    tdtag_string_diff = Tag(err_soup, name='td', attrs=[('class', 'stringdiff')] if string_diff > 0 else [])
-    trtag.append(tdtag_string_diff)
-    tdtag_string_diff.append(str(string_diff))
+        err_writer.start('td')
+        err_writer.element('a', 'rel file', attrs=[('href', '%s#tablehead%s' % (file_name, count_of_tables))])
+        err_writer.end('td')
+    else:
+        err_writer.element('td', '')
+        err_writer.element('td', '')
+
+    err_writer.element('td', str(big_diff), attrs=[('class', 'big')] if big_diff > 0 else [])
+    err_writer.element('td', str(small_diff), attrs=[('class', 'small')] if small_diff > 0 else [])
+    err_writer.element('td', str(equal))
+    err_writer.element('td', str(string_diff), attrs=[('class', 'stringdiff')] if string_diff > 0 else [])
+    err_writer.element(
+        'td',
+        'size mismatch' if size_error > 0 else 'not in 1' if not_in_1 > 0 else 'not in 2' if not_in_2 > 0 else '',
+        attrs=[('class', 'table_size_error')] if size_error > 0 or not_in_1 > 0 or not_in_2 > 0 else []
+    )
 
-    tdtag_table_size_error = Tag(err_soup, name='td', attrs=[
-        ('class', 'table_size_error')] if size_error > 0 or not_in_1 > 0 or not_in_2 > 0 else [])
-    trtag.append(tdtag_table_size_error)
-    tdtag_table_size_error.append(
-        'size mismatch' if size_error > 0 else 'not in 1' if not_in_1 > 0 else 'not in 2' if not_in_2 > 0 else '')
+    err_writer.end('tr')
 
 
 def table_diff(
         thresh_dict: ThreshDict, input_file_1: str, input_file_2: str, abs_diff_file: str,
-        rel_diff_file: str, err_file: str, summary_file: str
+        rel_diff_file: str, err_file: str, summary_file: str, table_extractor=extract_tables
 ):
     """
     Compares two xxxTable.html files returning
@@ -365,6 +367,7 @@ def table_diff(
         <#small_diff>, <#equals>, <#string_diff>,
         <#size_diff>, <#not_in_file1>, <#not_in_file2>
     )
+    The tables are read by table_extractor, which takes the html text and returns a list of ParsedTable
     """
     file_1 = Path(input_file_1)
     file_2 = Path(input_file_2)
@@ -384,42 +387,12 @@ def table_diff(
 
     page_title = f'{file_1.name} vs {file_2.name}'
 
-    # Error soup
-    err_soup = BeautifulSoup(title_css % (page_title + ' -- summary', the_css,), features='html.parser')
-
-    # Abs diff soup
-    abs_diff_soup = BeautifulSoup(title_css % (page_title + ' -- absolute differences', the_css,),
-                                  features='html.parser')
-
-    # Rel diff soup
-    rel_diff_soup = BeautifulSoup(title_css % (page_title + ' -- relative differences', the_css,),
-                                  features='html.parser')
-
-    # Make error table
-    tabletag = Tag(err_soup, name='table', attrs=[('border', '1')])
-    err_soup.body.append(tabletag)
-
-    # Make error table headings
-    trtag = Tag(err_soup, name='tr')
-    tabletag.append(trtag)
-    for title in ['Table', 'Abs file', 'Rel file', 'Big diffs', 'Small diffs', 'Equals', 'String diffs', 'Size diffs']:
-        thtag = Tag(err_soup, name='th')
-        trtag.append(thtag)
-        thtag.append(title)
+    # Read the tables out of the HTML input files, only once if they are identical, which is the usual case
+    tables1 = table_extractor(txt1)
+    tables2 = tables1 if txt1 == txt2 else table_extractor(txt2)
 
-    # Soup up the HTML input files
-    soup2 = BeautifulSoup(txt2, features='html.parser')
-    soup1 = BeautifulSoup(txt1, features='html.parser')
-
-    tables1 = soup1('table')
-    tables2 = soup2('table')
-
-    uheadings1 = []
-    uheadings2 = []
-    for table in tables1:
-        uheadings1.append(get_table_unique_heading(table))
-    for table in tables2:
-        uheadings2.append(get_table_unique_heading(table))
+    uheadings1 = [table.uheading for table in tables1]
+    uheadings2 = [table.uheading for table in tables2]
 
     if any([x is None for x in uheadings1]):
         return 'malformed comment/table structure in <%s>' % input_file_1, 0, 0, 0, 0, 0, 0, 0, 0
@@ -441,167 +414,190 @@ def table_diff(
     count_of_not_in_1 = 0
     count_of_not_in_2 = 0
 
-    for i1 in range(0, len(list(uheadings1))):
-
-        count_of_tables += 1
-
-        table_small_diff = 0
-        table_big_diff = 0
-        table_equal = 0
-        table_string_diff = 0
-        table_size_error = 0
-        table_not_in_1 = 0
-        table_not_in_2 = 0
-
-        uheading1 = uheadings1[i1]
-
-        # There are some (for now one) tables that we will want to skip entirely because they are not useful for
-        # throwing regressions, add search keys to this list to skip them
-        completely_skippable_table_keys = [
-            'Object Count Summary_Entire Facility_Input Fields'
-        ]
-        if any([x in uheading1 for x in completely_skippable_table_keys]):
-            continue
-
-        # Table missing in second input file
-        if uheading1 not in uhset_match:
-            table_not_in_2 = 1
-            count_of_not_in_2 += table_not_in_2
-            table_big_diff = 1
-            count_of_big_diff += table_big_diff
-            make_err_table_row(err_soup, tabletag, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
-                               table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
-                               table_not_in_1, table_not_in_2)
-            continue
-
-        table1 = tables1[i1]
-        table2 = tables2[uheadings2.index(uheading1)]
-
-        # Table size error
-        if len(table1('tr')) != len(table2('tr')) or len(table1('td')) != len(table2('td')):
-            table_size_error = 1
-            count_of_size_error += table_size_error
-            table_big_diff = 1
-            count_of_big_diff += table_big_diff
-            make_err_table_row(err_soup, tabletag, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
-                               table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
-                               table_not_in_1, table_not_in_2)
-            continue
+    # The output files are written as the tables are compared
+    err_writer = PrettyHtmlWriter(err_file, page_title + ' -- summary')
+    abs_diff_writer = PrettyHtmlWriter(abs_diff_file, page_title + ' -- absolute differences')
+    rel_diff_writer = PrettyHtmlWriter(rel_diff_file, page_title + ' -- relative differences')
 
-        # create a list of order-dependent table uheading keys, tables that include these keys in the name
-        # these will use strict row order enforcement
-        row_order_dependent_table_keys = ['Monthly', 'Topology']
+    try:
+        # Make error table and its headings
+        err_writer.start('table', attrs=[('border', '1')])
+        err_writer.start('tr')
+        for title in ['Table', 'Abs file', 'Rel file', 'Big diffs', 'Small diffs', 'Equals', 'String diffs',
+                      'Size diffs']:
+            err_writer.element('th', title)
+        err_writer.end('tr')
 
-        # always process the first table into a base hdict
-        hdict1, horder1 = table2hdict_horder(table1)
+        for i1 in range(0, len(list(uheadings1))):
 
-        # if we are in a row order dependent table, don't pass table1 as a baseline, just use the literal in-place order
-        if any(k in uheading1 for k in row_order_dependent_table_keys):
-            hdict2, horder2 = table2hdict_horder(table2)
-        # but for all other tables, we can use the first table as a baseline to carefully match up the rows
-        else:
-            hdict2, horder2 = table2hdict_horder(table2, table1)
-
-        # honestly, if the column headings have changed, this should be an indicator to all reviewers that this needs
-        # up close investigation.  As such, we are going to trigger the following things:
-        # 1) a table_size_error, because even though the sizes are the "same", the sizes have sort-of changed due to the
-        #    missing column and added column in the second table
-        # 2) a table_string_diff, because if the columns have changed, there must be at least one title different (yes
-        #    even if it is duplicate, it is different because there is another one)
-        # 3) a table_big_diff here, because something has definitely changed that needs attention
-        # 4) each datum in each row that doesn't have a match should trigger a big diff as well later
-        if any([h not in horder2 for h in horder1]) or any([h not in horder1 for h in horder2]):
-            table_size_error += 1
-            count_of_size_error += 1
-            table_string_diff += 1
-            count_of_string_diff += 1
-            table_big_diff += 1
-            count_of_big_diff += 1
-
-        # Dictionaries of absolute and relative differences
-        diff_dict = {}
-        h_thresh_dict = {}
-
-        for h in horder1:
-            if h == 'DummyPlaceholder':
-                diff_dict[h] = hdict1[h]
+            count_of_tables += 1
+
+            table_small_diff = 0
+            table_big_diff = 0
+            table_equal = 0
+            table_string_diff = 0
+            table_size_error = 0
+            table_not_in_1 = 0
+            table_not_in_2 = 0
+
+            uheading1 = uheadings1[i1]
+
+            # There are some (for now one) tables that we will want to skip entirely because they are not useful for
+            # throwing regressions, add search keys to this list to skip them
+            completely_skippable_table_keys = [
+                'Object Count Summary_Entire Facility_Input Fields'
+            ]
+            if any([x in uheading1 for x in completely_skippable_table_keys]):
+                continue
+
+            # Table missing in second input file
+            if uheading1 not in uhset_match:
+                table_not_in_2 = 1
+                count_of_not_in_2 += table_not_in_2
+                table_big_diff = 1
+                count_of_big_diff += table_big_diff
+                make_err_table_row(err_writer, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
+                                   table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
+                                   table_not_in_1, table_not_in_2)
+                continue
+
+            table1 = tables1[i1]
+            table2 = tables2[uheadings2.index(uheading1)]
+
+            # Table size error
+            if len(table1.rows) != len(table2.rows) or table1.num_cells != table2.num_cells:
+                table_size_error = 1
+                count_of_size_error += table_size_error
+                table_big_diff = 1
+                count_of_big_diff += table_big_diff
+                make_err_table_row(err_writer, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
+                                   table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
+                                   table_not_in_1, table_not_in_2)
+                continue
+
+            # create a list of order-dependent table uheading keys, tables that include these keys in the name
+            # these will use strict row order enforcement
+            row_order_dependent_table_keys = ['Monthly', 'Topology']
+
+            # always process the first table into a base hdict
+            hdict1, horder1 = table2hdict_horder(table1)
+
+            # every cell of a table compared with itself is equal, so there is nothing to match up or diff, but a
+            # repeated table name still pairs a table up with the first table of that name, just as it would across two
+            # files
+            if table2 is table1:
+                table_equal = sum(len(hdict1[h]) for h in horder1 if h != 'DummyPlaceholder')
+                count_of_equal += table_equal
+                make_err_table_row(err_writer, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
+                                   table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
+                                   table_not_in_1, table_not_in_2)
+                continue
+
+            # if we are in a row order dependent table, don't pass table1 as a baseline, just use the literal in-place
+            # order
+            if any(k in uheading1 for k in row_order_dependent_table_keys):
+                hdict2, horder2 = table2hdict_horder(table2)
+            # but for all other tables, we can use the first table as a baseline to carefully match up the rows
             else:
-                if h not in horder2:
-                    diff_dict[h] = [[0, 0, 'big']] * (len(table1('tr')) - 1)
+                hdict2, horder2 = table2hdict_horder(table2, table1)
+
+            # honestly, if the column headings have changed, this should be an indicator to all reviewers that this
+            # needs up close investigation.  As such, we are going to trigger the following things:
+            # 1) a table_size_error, because even though the sizes are the "same", the sizes have sort-of changed due to
+            #    the missing column and added column in the second table
+            # 2) a table_string_diff, because if the columns have changed, there must be at least one title different
+            #    (yes even if it is duplicate, it is different because there is another one)
+            # 3) a table_big_diff here, because something has definitely changed that needs attention
+            # 4) each datum in each row that doesn't have a match should trigger a big diff as well later
+            if any([h not in horder2 for h in horder1]) or any([h not in horder1 for h in horder2]):
+                table_size_error += 1
+                count_of_size_error += 1
+                table_string_diff += 1
+                count_of_string_diff += 1
+                table_big_diff += 1
+                count_of_big_diff += 1
+
+            # Dictionaries of absolute and relative differences
+            diff_dict = {}
+            h_thresh_dict = {}
+
+            for h in horder1:
+                if h == 'DummyPlaceholder':
+                    diff_dict[h] = hdict1[h]
                 else:
-                    (abs_thresh, rel_thresh) = thresh_dict.lookup(h)
-                    h_thresh_dict[h] = (abs_thresh, rel_thresh)
-                    diff_dict[h] = []
-                    for x, y in zip(hdict1[h], hdict2[h]):
-                        diff_dict[h].append(thresh_abs_rel_diff(abs_thresh, rel_thresh, x, y))
-
-                # Statistics local to this table
-                for diff_result in diff_dict[h]:
-                    diff_type = diff_result[2]
-                    if h == 'Version ID':
-                        table_equal += 1
-                        count_of_equal += 1
-                    elif diff_type == 'small':
-                        table_small_diff += 1
-                        count_of_small_diff += 1
-                    elif diff_type == 'big':
-                        table_big_diff += 1
-                        count_of_big_diff += 1
-                    elif diff_type == 'equal':
-                        table_equal += 1
-                        count_of_equal += 1
-                    if diff_type == 'stringdiff':
-                        table_string_diff += 1
-                        count_of_string_diff += 1
-
-        make_err_table_row(err_soup, tabletag, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
-                           table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
-                           table_not_in_1, table_not_in_2)
-
-        # If there were no differences, we are done
-        if (table_small_diff == 0) and (table_big_diff == 0) and (table_string_diff == 0):
-            continue
-
-        # Add difference tables to absolute and relative difference soups
-        abs_diff_dict = {}
-        for h in horder1:
-            if h not in horder2:
-                continue
-            abs_diff_dict[h] = diff_dict[h] if (h == 'DummyPlaceholder' or h == 'Subcategory') else [
-                (x_y_z[0], x_y_z[2]) for x_y_z in diff_dict[h]]
-        hdict2soup(abs_diff_soup, uheading1, count_of_tables, abs_diff_dict.copy(), h_thresh_dict, horder1)
+                    if h not in horder2:
+                        diff_dict[h] = [[0, 0, 'big']] * (len(table1.rows) - 1)
+                    else:
+                        (abs_thresh, rel_thresh) = thresh_dict.lookup(h)
+                        h_thresh_dict[h] = (abs_thresh, rel_thresh)
+                        diff_dict[h] = []
+                        for x, y in zip(hdict1[h], hdict2[h]):
+                            diff_dict[h].append(thresh_abs_rel_diff(abs_thresh, rel_thresh, x, y))
+
+                    # Statistics local to this table
+                    for diff_result in diff_dict[h]:
+                        diff_type = diff_result[2]
+                        if h == 'Version ID':
+                            table_equal += 1
+                            count_of_equal += 1
+                        elif diff_type == 'small':
+                            table_small_diff += 1
+                            count_of_small_diff += 1
+                        elif diff_type == 'big':
+                            table_big_diff += 1
+                            count_of_big_diff += 1
+                        elif diff_type == 'equal':
+                            table_equal += 1
+                            count_of_equal += 1
+                        if diff_type == 'stringdiff':
+                            table_string_diff += 1
+                            count_of_string_diff += 1
+
+            make_err_table_row(err_writer, uheading1, count_of_tables, abs_diff_file, rel_diff_file,
+                               table_small_diff, table_big_diff, table_equal, table_string_diff, table_size_error,
+                               table_not_in_1, table_not_in_2)
 
-        rel_diff_dict = {}
-        for h in horder1:
-            if h not in horder2:
+            # If there were no differences, we are done
+            if (table_small_diff == 0) and (table_big_diff == 0) and (table_string_diff == 0):
                 continue
-            rel_diff_dict[h] = diff_dict[h] if (h == 'DummyPlaceholder' or h == 'Subcategory') else [
-                (x_y_z[1], x_y_z[2]) for x_y_z in diff_dict[h]]
-        hdict2soup(rel_diff_soup, uheading1, count_of_tables, rel_diff_dict.copy(), h_thresh_dict, horder1)
 
-        count_of_tables_diff += 1
+            # Add difference tables to absolute and relative difference soups
+            abs_diff_dict = {}
+            for h in horder1:
+                if h not in horder2:
+                    continue
+                abs_diff_dict[h] = diff_dict[h] if (h == 'DummyPlaceholder' or h == 'Subcategory') else [
+                    (x_y_z[0], x_y_z[2]) for x_y_z in diff_dict[h]]
+            hdict2html(abs_diff_writer, uheading1, count_of_tables, abs_diff_dict.copy(), h_thresh_dict, horder1)
 
-    for uheading2 in uheadings2:
-        if uheading2 not in uhset_match:
-            count_of_tables += 1
-            count_of_not_in_1 += 1
-            make_err_table_row(err_soup, tabletag, uheading2, count_of_tables, abs_diff_file, rel_diff_file,
-                               0, 0, 0, 0, 0, 1, 0)
-
-    # Write error file
-    err_txt = err_soup.prettify()
-    with open(err_file, 'wb') as f_out:
-        f_out.write(err_txt.encode('utf-8', errors='ignore'))
-
-    # Only write absolute and relative diff files if any tables were actually different
-    if count_of_tables_diff > 0:
-        abs_diff_txt = abs_diff_soup.prettify()
-        with open(abs_diff_file, 'wb') as f_abs:
-            f_abs.write(abs_diff_txt.encode('utf-8', errors='ignore'))
-
-        rel_diff_txt = rel_diff_soup.prettify()
-        with open(rel_diff_file, 'wb') as f_rel:
-            f_rel.write(rel_diff_txt.encode('utf-8', errors='ignore'))
+            rel_diff_dict = {}
+            for h in horder1:
+                if h not in horder2:
+                    continue
+                rel_diff_dict[h] = diff_dict[h] if (h == 'DummyPlaceholder' or h == 'Subcategory') else [
+                    (x_y_z[1], x_y_z[2]) for x_y_z in diff_dict[h]]
+            hdict2html(rel_diff_writer, uheading1, count_of_tables, rel_diff_dict.copy(), h_thresh_dict, horder1)
+
+            count_of_tables_diff += 1
+
+        for uheading2 in uheadings2:
+            if uheading2 not in uhset_match:
+                count_of_tables += 1
+                count_of_not_in_1 += 1
+                make_err_table_row(err_writer, uheading2, count_of_tables, abs_diff_file, rel_diff_file,
+                                   0, 0, 0, 0, 0, 1, 0)
+
+        # Finish error file
+        err_writer.end('table')
+        err_writer.finish()
+
+        # Only keep absolute and relative diff files if any tables were actually different
+        if count_of_tables_diff > 0:
+            abs_diff_writer.finish()
+            rel_diff_writer.finish()
+    finally:
+        for writer in [err_writer, abs_diff_writer, rel_diff_writer]:
+            writer.discard()
 
     if summary_file:
         if not os.path.exists(summary_file):
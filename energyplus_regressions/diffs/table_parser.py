@@ -0,0 +1,188 @@
+"""
+A single pass extractor for the tables in E+ html output files.
+
+The tables are pulled straight out of the html.parser events, building none of the document tree that BeautifulSoup
+would, but keeping to the same tree building rules so that the headings and cells come out just as they would from the
+soup.  It only understands the plain tables E+ writes, a comment naming each table followed by rows of text-only cells,
+and raises UnsupportedTableMarkup for anything else so that the caller can fall back to BeautifulSoup.
+"""
+
+from html.parser import HTMLParser
+
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+# these are BeautifulSoup's own lists, as the tree has to come out the same shape as it would from the soup
+EMPTY_ELEMENT_TAGS = HTMLTreeBuilder.empty_element_tags
+PRESERVE_WHITESPACE_TAGS = HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+class UnsupportedTableMarkup(Exception):
+    pass
+
+
+class ParsedTable:
+    """The parts of an html table that table_diff compares.
+
+    Rows hold the first child of each cell, as the soup's td.contents[0] would, or None for an empty cell.
+    """
+
+    def __init__(self, uheading, rows, num_cells):
+        self.uheading = uheading
+        self.rows = rows
+        self.num_cells = num_cells
+
+
+class _OpenTag:
+    __slots__ = ('name', 'last_sibling')
+
+    def __init__(self, name):
+        self.name = name
+        # the most recent child that isn't a whitespace-only string, which is what a following table is named by:
+        # None for no such child yet, a string, or _OpenTag.ELEMENT
+        self.last_sibling = None
+
+    ELEMENT = object()
+
+
+class TableExtractor(HTMLParser):
+
+    def __init__(self):
+        # character references are handled below exactly as BeautifulSoup handles them
+        super().__init__(convert_charrefs=False)
+        self.tables = []
+        self.stack = [_OpenTag('[document]')]
+        self.already_closed_empty_element = []
+        self.data = []
+        self.table = None
+        self.row = None
+        self.cell = None
+
+    def end_data(self, special=False):
+        """the end of a run of text, which becomes a single string in the soup.
+        Special strings are comments, declarations and the like, which the soup keeps even when empty"""
+        if not self.data and not special:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if not any(open_tag.name in PRESERVE_WHITESPACE_TAGS for open_tag in self.stack):
+            if not data.strip(ASCII_SPACES):
+                data = '\n' if '\n' in data else ' '
+        if self.table is not None:
+            # only the first child of a cell matters, anything else in a table doesn't show up in its rows or cells
+            if self.cell == [] and self.stack[-1].name == 'td':
+                self.cell.append(data)
+            return
+        if data.strip() != '':
+            self.stack[-1].last_sibling = data
+
+    def handle_starttag(self, tag, attrs, empty_element=True):
+        self.end_data()
+        if self.table is not None:
+            self.start_table_part(tag)
+        elif tag == 'table':
+            last_sibling = self.stack[-1].last_sibling
+            if last_sibling is _OpenTag.ELEMENT:
+                raise UnsupportedTableMarkup('table named by an element rather than a comment')
+            self.table = ParsedTable(last_sibling, [], 0)
+            self.tables.append(self.table)
+        self.stack[-1].last_sibling = _OpenTag.ELEMENT
+        self.stack.append(_OpenTag(tag))
+        if empty_element and tag in EMPTY_ELEMENT_TAGS:
+            self.handle_endtag(tag, check_already_closed=False)
+            self.already_closed_empty_element.append(tag)
+
+    def start_table_part(self, tag):
+        parent = self.stack[-1].name
+        if self.cell is not None:
+            # line breaks and the like are fine after the text of a cell, but not as its first child, or a table within
+            if not self.cell or tag in ('table', 'tr', 'td', 'th'):
+                raise UnsupportedTableMarkup(f'<{tag}> inside <td>')
+        elif tag == 'tr' and parent == 'table':
+            self.row = []
+            self.table.rows.append(self.row)
+        elif tag == 'td' and parent == 'tr':
+            self.cell = []
+            self.row.append(self.cell)
+            self.table.num_cells += 1
+        else:
+            raise UnsupportedTableMarkup(f'<{tag}> inside <{parent}>')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, empty_element=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(tag)
+            return
+        self.end_data()
+        if self.table is not None:
+            if tag != self.stack[-1].name:
+                raise UnsupportedTableMarkup(f'</{tag}> closing <{self.stack[-1].name}>')
+            if tag == 'td':
+                self.row[-1] = self.cell[0] if self.cell else None
+                self.cell = None
+            elif tag == 'tr':
+                self.row = None
+            elif tag == 'table':
+                self.table = None
+        # pop up to and including the most recent open tag of this name, if there is one
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].name == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.data.append(character if character is not None else '&%s' % name)
+
+    def handle_charref(self, name):
+        if name.startswith(('x', 'X')):
+            code_point = int(name.lstrip('xX'), 16)
+        else:
+            code_point = int(name)
+        data = None
+        if code_point < 256:
+            try:
+                data = bytearray([code_point]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code_point)
+            except (ValueError, OverflowError):
+                pass
+        self.data.append(data or '\N{REPLACEMENT CHARACTER}')
+
+    def special_string(self, data):
+        self.end_data()
+        self.data = [data]
+        self.end_data(special=True)
+
+    def handle_comment(self, data):
+        self.special_string(data)
+
+    def handle_decl(self, decl):
+        self.special_string(decl[len('DOCTYPE '):])
+
+    def unknown_decl(self, data):
+        self.special_string(data[len('CDATA['):] if data.upper().startswith('CDATA[') else data)
+
+    def handle_pi(self, data):
+        self.special_string(data)
+
+
+def fast_tables(html_txt):
+    """the tables of an html document as ParsedTable instances, raising UnsupportedTableMarkup if it can't be sure of
+    reading them the same way as BeautifulSoup"""
+    extractor = TableExtractor()
+    extractor.feed(html_txt)
+    extractor.close()
+    if extractor.table is not None:
+        raise UnsupportedTableMarkup('unclosed table')
+    return extractor.tables
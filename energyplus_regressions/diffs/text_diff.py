@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Line diffs of the plain text E+ outputs, fast enough for the multi-MB eio, audit and shd files of large models.
+
+Lines are hashed down to ints before they are compared, the common head and tail of the files are trimmed off, and the
+rest goes through a Myers diff, which takes time in proportion to the size of the files times the number of lines that
+differ rather than the square of the size of the files.  A diff that would take more than a time budget, or more
+edits than an edit budget, is written as a summary of the first few differing lines instead.
+"""
+
+from array import array
+from difflib import SequenceMatcher
+import re
+from time import perf_counter
+
+# lines with these in them are expected to differ between any two runs, so they are blanked out before diffing
+SKIP_STRINGS = [
+    "Program Version,EnergyPlus",
+    "Version,",
+    "EnergyPlus Completed",
+    "EnergyPlus Terminated",
+    "DElight input generated",
+    "(idf)=",
+    "(user input)=",
+    "(input file)=",
+    "(IDF Directory)=",
+    "(Current Working Directory)=",
+    "(Current Working Directory)\"=",
+    "ReadVars Run Time",
+    "EnergyPlus Program Version",
+    "PythonPlugin: Class",
+    "ExpandObjects Finished. Time:",
+    "EnergyPlus, Version",
+    "EnergyPlus Run Time=",
+    "ParametricPreprocessor Finished. Time:",
+    "ExpandObjects Finished with Error(s). Time:",
+    "Elapsed time: ",
+]
+SKIP_PATTERN = re.compile('|'.join(re.escape(s) for s in SKIP_STRINGS))
+SKIPPED_LINE = '-line skipped-'
+
+DEFAULT_MAX_SECONDS = 10.0
+# the edit path is kept for every step of the diff, which takes memory in proportion to the square of the edits
+DEFAULT_MAX_EDITS = 2000
+SUMMARY_LINES = 100
+
+
+class DiffBudgetExceeded(Exception):
+    pass
+
+
+def skip_lines(lines):
+    """the lines with each one containing any of the skip strings replaced by a placeholder"""
+    search = SKIP_PATTERN.search
+    return [SKIPPED_LINE if search(line) else line for line in lines]
+
+
+def hash_lines(lines_1, lines_2):
+    """the two lists of lines as lists of ints, equal lines getting equal ints, so comparing them is cheap"""
+    ids = {}
+    return [ids.setdefault(line, len(ids)) for line in lines_1], [ids.setdefault(line, len(ids)) for line in lines_2]
+
+
+def myers_matching_blocks(a, b, max_edits, deadline):
+    """the (i, j, size) runs of a[i:i + size] == b[j:j + size] along a shortest edit script between a and b.
+    Raises DiffBudgetExceeded if the script needs more than max_edits edits or runs past the deadline"""
+    n = len(a)
+    m = len(b)
+    limit = min(n + m, max_edits)
+    offset = limit + 1
+    v = array('l', [0]) * (2 * limit + 3)
+    trace = []
+    for d in range(limit + 1):
+        if perf_counter() > deadline:
+            raise DiffBudgetExceeded('diff took longer than its time budget')
+        # the furthest reaching paths for diagonals -d - 1 through d + 1, as they were before this step
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return backtrack(trace, d, n, m)
+    raise DiffBudgetExceeded('diff needs more than %s edits' % max_edits)
+
+
+def backtrack(trace, edits, n, m):
+    blocks = []
+    x = n
+    y = m
+    for d in range(edits, 0, -1):
+        v = trace[d]
+        k = x - y
+        # v holds diagonals -d - 1 through d + 1
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+            snake_x = v[prev_k + d + 1]
+        else:
+            prev_k = k - 1
+            snake_x = v[prev_k + d + 1] + 1
+        if x > snake_x:
+            blocks.append((snake_x, snake_x - k, x - snake_x))
+        x = v[prev_k + d + 1]
+        y = x - prev_k
+    if x > 0:
+        blocks.append((0, 0, x))
+    blocks.reverse()
+    return blocks
+
+
+def diff_opcodes(lines_1, lines_2, max_edits=DEFAULT_MAX_EDITS, max_seconds=DEFAULT_MAX_SECONDS):
+    """difflib style opcodes turning lines_1 into lines_2, raising DiffBudgetExceeded if they can't be worked out
+    within the budgets"""
+    a, b = hash_lines(lines_1, lines_2)
+    n = len(a)
+    m = len(b)
+    head = 0
+    while head < n and head < m and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < n - head and tail < m - head and a[n - 1 - tail] == b[m - 1 - tail]:
+        tail += 1
+    middle = myers_matching_blocks(a[head:n - tail], b[head:m - tail], max_edits, perf_counter() + max_seconds)
+    blocks = [(0, 0, head)] + [(i + head, j + head, size) for i, j, size in middle] + [(n - tail, m - tail, tail)]
+
+    opcodes = []
+    i = 0
+    j = 0
+    for block_i, block_j, size in blocks:
+        if i < block_i and j < block_j:
+            opcodes.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(('delete', i, block_i, j, block_j))
+        elif j < block_j:
+            opcodes.append(('insert', i, block_i, j, block_j))
+        if size:
+            if opcodes and opcodes[-1][0] == 'equal':
+                opcodes[-1] = ('equal', opcodes[-1][1], block_i + size, opcodes[-1][3], block_j + size)
+            else:
+                opcodes.append(('equal', block_i, block_i + size, block_j, block_j + size))
+        i = block_i + size
+        j = block_j + size
+    return opcodes
+
+
+class _OpcodeMatcher(SequenceMatcher):
+    """a SequenceMatcher handing out opcodes worked out elsewhere, to reuse its grouping of them into hunks"""
+
+    def __init__(self, opcodes):
+        super().__init__(None, [], [])
+        self.opcodes = opcodes
+
+
+def format_range(start, stop):
+    """the line range of a hunk as difflib writes it in a unified diff"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return '{}'.format(beginning)
+    if not length:
+        beginning -= 1
+    return '{},{}'.format(beginning, length)
+
+
+def unified_diff(lines_1, lines_2, n=3, max_edits=DEFAULT_MAX_EDITS, max_seconds=DEFAULT_MAX_SECONDS):
+    """the lines of a unified diff between two lists of lines, in the same format as difflib.unified_diff, or of a
+    summary of where they differ if the diff is beyond the budgets"""
+    try:
+        opcodes = diff_opcodes(lines_1, lines_2, max_edits, max_seconds)
+    except DiffBudgetExceeded as e:
+        yield from summarized_diff(lines_1, lines_2, str(e))
+        return
+    started = False
+    for group in _OpcodeMatcher(opcodes).get_grouped_opcodes(n):
+        if not started:
+            started = True
+            yield '--- \n'
+            yield '+++ \n'
+        first, last = group[0], group[-1]
+        yield '@@ -{} +{} @@\n'.format(format_range(first[1], last[2]), format_range(first[3], last[4]))
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in lines_1[i1:i2]:
+                    yield ' ' + line
+                continue
+            for line in lines_1[i1:i2]:
+                yield '-' + line
+            for line in lines_2[j1:j2]:
+                yield '+' + line
+
+
+def summarized_diff(lines_1, lines_2, reason, max_lines=SUMMARY_LINES):
+    """a short account of how two lists of lines differ, with the first few lines that differ in place"""
+    differing = [i for i, (line_1, line_2) in enumerate(zip(lines_1, lines_2)) if line_1 != line_2]
+    yield '--- \n'
+    yield '+++ \n'
+    yield '-- summarized, as the %s --\n' % reason
+    yield '-- %s lines in file 1, %s lines in file 2, %s of the first %s lines differ in place --\n' % (
+        len(lines_1), len(lines_2), len(differing), min(len(lines_1), len(lines_2))
+    )
+    for i in differing[:max_lines]:
+        yield '@@ -{} +{} @@\n'.format(i + 1, i + 1)
+        yield '-' + lines_1[i]
+        yield '+' + lines_2[i]
+    if len(differing) > max_lines:
+        yield '-- %s more differing lines not shown --\n' % (len(differing) - max_lines)
@@ -1,16 +1,92 @@
-import glob
-from os import chdir, getcwd, rename, environ
+import asyncio
+import json
+import os
+from os import environ, rename
 from pathlib import Path
-import shutil
+import signal
 import subprocess
+import sys
+import time
+from typing import Dict, Generator, List, Optional
 
 from energyplus_regressions.builds.base import BuildTree
-from energyplus_regressions.structures import ForceRunType
+from energyplus_regressions.staging import StagingStats, stage_file
+from energyplus_regressions.structures import ForceRunType, StagingMode
+from energyplus_regressions.tracing import StageTracer
+
+# the limits a simulation can be stopped at, or that it was stopped because the whole suite was cancelled
+TIMED_OUT = 'timeout'
+OUT_OF_MEMORY = 'out of memory'
+CANCELLED = 'cancelled'
+
+# written into the run directory of a simulation stopped at one of its limits, saying which limit and which tool
+LIMIT_FILE_NAME = 'eplusout.limit'
+
+# written into the test output directory to cancel the suite, every running tool sees it and kills itself, whichever
+# process it was started from
+CANCEL_FILE_NAME = 'cancel.requested'
+
+# how often a tool running under a limit is checked against it
+LIMIT_POLL_SECONDS = 0.25
+
+# how often a running tool looks for the cancel file, which may be on a network mount, so much less often than a limit
+# is checked, but well inside the scheduler's stop grace so that a tool in a worker process has seen it before the
+# worker is killed
+CANCEL_POLL_SECONDS = 2.0
+
+# where the memory of a running tool can be read, from /proc on Linux, it is sampled this often for the peak the tool's
+# stage is traced with, so a spike shorter than this can be missed, and a tool done before the first sample has none
+SAMPLE_MEMORY = os.path.exists('/proc/self/statm')
+MEMORY_SAMPLE_SECONDS = 0.5
+
+# each tool is started in a process group of its own so that anything it starts is killed along with it
+NEW_PROCESS_GROUP = os.name == 'posix'
+
+# on Windows a script can only be started through its file association, which needs a shell, so a tool that is a Python
+# script, like the stand-ins for the EnergyPlus tools in the tests, is run with this interpreter instead
+RUN_SCRIPTS_WITH_INTERPRETER = os.name == 'nt'
+
+# the tools running right now that were started from this process, by pid, so they can be killed on cancel
+running_tools: Dict[int, object] = {}
+
+
+class SimulationLimits:
+    """How long a whole simulation and each of its tools may run, in wall seconds, and how much resident memory a
+    tool may use, any of which is None for no limit.  Memory is read from /proc, so it is only enforced where that is
+    available."""
+    __slots__ = ('case_timeout_seconds', 'tool_timeout_seconds', 'max_memory_bytes')
+
+    def __init__(self, case_timeout_seconds: Optional[float] = None, tool_timeout_seconds: Optional[float] = None,
+                 max_memory_bytes: Optional[int] = None):
+        self.case_timeout_seconds = case_timeout_seconds
+        self.tool_timeout_seconds = tool_timeout_seconds
+        self.max_memory_bytes = max_memory_bytes
+
+    def case_deadline(self) -> Optional[float]:
+        if self.case_timeout_seconds is None:
+            return None
+        return time.monotonic() + self.case_timeout_seconds
+
+    def tool_timeout(self, case_deadline: Optional[float]) -> Optional[float]:
+        """The timeout of the next tool, its own or the time left for the whole simulation, whichever is shorter"""
+        timeout = self.tool_timeout_seconds
+        if case_deadline is not None:
+            remaining = max(0.0, case_deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
 
 
 class ExecutionArguments:
+    # this is sent to a worker process for every simulation, so keep it compact
+    __slots__ = (
+        'build_tree', 'entry_name', 'test_run_directory', 'run_type', 'min_reporting_freq', 'this_parametric_file',
+        'weather_file_name', 'staging_mode', 'limits', 'cancel_file'
+    )
+
     def __init__(self, build_tree: BuildTree, entry_name: str, test_run_directory: Path,
-                 run_type, min_reporting_freq, this_parametric_file, weather_file_name: str):
+                 run_type, min_reporting_freq, this_parametric_file, weather_file_name: str,
+                 staging_mode: StagingMode = StagingMode.COPY, limits: Optional[SimulationLimits] = None,
+                 cancel_file: Optional[Path] = None):
         self.build_tree = build_tree
         self.entry_name = entry_name
         self.test_run_directory = test_run_directory
@@ -18,10 +94,84 @@ class ExecutionArguments:
         self.min_reporting_freq = min_reporting_freq
         self.this_parametric_file = this_parametric_file
         self.weather_file_name = weather_file_name
+        self.staging_mode = staging_mode
+        self.limits = limits
+        self.cancel_file = cancel_file
 
 
-# noinspection PyBroadException
-def execute_energyplus(e_args: ExecutionArguments) -> tuple[Path, str, bool, bool, str]:
+class ToolInvocation:
+    """One of the tools run in the run directory of a simulation: the stage it is traced as, the argument list it is
+    executed with directly, without a shell in between, and the environment to run it in.  ``keep_stderr`` is False
+    for a tool whose stderr doesn't go into eplusout.stderr."""
+    __slots__ = ('stage', 'argv', 'env', 'keep_stderr')
+
+    def __init__(self, stage: str, argv: List[str], env: Dict[str, str], keep_stderr: bool = True):
+        self.stage = stage
+        self.argv = argv
+        self.env = env
+        self.keep_stderr = keep_stderr
+
+
+def tool_argv(tool: Path, *args: str) -> List[str]:
+    """The argument list that executes a tool with the given arguments"""
+    argv = [str(tool), *args]
+    if RUN_SCRIPTS_WITH_INTERPRETER and Path(tool).suffix.lower() == '.py':
+        argv.insert(0, sys.executable)
+    return argv
+
+
+class ToolResult:
+    """What a tool run by a ToolInvocation returned and wrote, the limit it was killed at, if it was, and the most
+    resident memory it and the processes it started were seen using, if that was sampled"""
+    __slots__ = ('return_code', 'stdout', 'stderr', 'limit_exceeded', 'peak_rss_bytes')
+
+    def __init__(self, return_code: int, stdout: bytes, stderr: bytes, limit_exceeded: Optional[str] = None,
+                 peak_rss_bytes: Optional[int] = None):
+        self.return_code = return_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.limit_exceeded = limit_exceeded
+        self.peak_rss_bytes = peak_rss_bytes
+
+
+def simulation_environment(e_args: ExecutionArguments) -> Dict[str, str]:
+    """The environment the tools of a simulation run in, built for each simulation rather than changing os.environ"""
+    env = environ.copy()
+    env["DISPLAYADVANCEDREPORTVARIABLES"] = "YES"
+    env["DISPLAYALLWARNINGS"] = "YES"
+    if e_args.run_type == ForceRunType.DD:
+        env["DDONLY"] = "Y"
+        env["REVERSEDD"] = ""
+        env["FULLANNUALRUN"] = ""
+    elif e_args.run_type == ForceRunType.ANNUAL:
+        env["DDONLY"] = ""
+        env["REVERSEDD"] = ""
+        env["FULLANNUALRUN"] = "Y"
+    elif e_args.run_type == ForceRunType.NONE:
+        env["DDONLY"] = ""
+        env["REVERSEDD"] = ""
+        env["FULLANNUALRUN"] = ""
+    else:  # pragma: no cover
+        # it feels weird to try to test this path...have to set run_type to something invalid?
+        # should we just eliminate this else?
+        pass  # do nothing?
+
+    # use the user-entered minimum reporting frequency
+    #  (useful for limiting to daily outputs for annual simulation, etc.)
+    env["MINREPORTFREQUENCY"] = e_args.min_reporting_freq.upper()
+    return env
+
+
+def simulation_steps(
+        e_args: ExecutionArguments, staging_stats: Optional[StagingStats] = None
+) -> Generator[ToolInvocation, ToolResult, tuple[Path, str, bool, bool, str]]:
+    """The whole chain of tools of one simulation, from EPMacro to ReadVarsESO, and the file handling between them.
+
+    Each tool to run is yielded, and whatever runs it sends back its ToolResult, so the same chain
+    is run by execute_energyplus in a worker process and by execute_energyplus_async on an event loop.  Every path is
+    absolute and each tool is given its environment, nothing here changes the working directory or os.environ.
+    The simulation results are the return value.
+    """
     # set up a few paths
     energyplus = e_args.build_tree.energyplus
     basement = e_args.build_tree.basement
@@ -33,207 +183,399 @@ def execute_energyplus(e_args: ExecutionArguments) -> tuple[Path, str, bool, boo
     ep_macro = e_args.build_tree.epmacro
     read_vars = e_args.build_tree.readvars
     parametric = e_args.build_tree.parametric
+    run_dir = e_args.test_run_directory
+    env = simulation_environment(e_args)
 
-    # Save the current path so we can go back here
-    start_path = getcwd()
+    tool_outputs: List[tuple[ToolInvocation, ToolResult]] = []
 
-    std_out = b""
-    std_err = b""
+    def run(tool: ToolInvocation):
+        # collects the output of each tool as it is run, returning the result for any checks of it
+        result = yield tool
+        tool_outputs.append((tool, result))
+        return result
 
-    try:
+    new_idd_path = run_dir / 'Energy+.idd'
+    stage_file(idd_path, new_idd_path, e_args.staging_mode, staging_stats)
+
+    # Bring the weather file into the simulation directory
+    if e_args.weather_file_name:
+        stage_file(e_args.weather_file_name, run_dir / 'in.epw', e_args.staging_mode, staging_stats)
 
-        new_idd_path = e_args.test_run_directory / 'Energy+.idd'
-        shutil.copy(idd_path, new_idd_path)
-
-        # Copy the weather file into the simulation directory
-        if e_args.weather_file_name:
-            shutil.copy(e_args.weather_file_name, e_args.test_run_directory / 'in.epw')
-
-        # Switch to the simulation directory
-        chdir(e_args.test_run_directory)
-
-        # Run EPMacro as necessary
-        idf_file = e_args.test_run_directory / 'in.idf'
-        expanded_file = e_args.test_run_directory / 'expanded.idf'
-        imf_path = e_args.test_run_directory / 'in.imf'
-        ght_file = e_args.test_run_directory / 'GHTIn.idf'
-        basement_file = e_args.test_run_directory / 'BasementGHTIn.idf'
-        ep_json_file = e_args.test_run_directory / 'in.epJSON'
-        rvi_file = e_args.test_run_directory / 'in.rvi'
-        mvi_file = e_args.test_run_directory / 'in.mvi'
-
-        if imf_path.exists():
-            with imf_path.open('rb') as f:
-                lines = f.readlines()
-            newlines = []
-            for line in lines:
-                encoded_line = line.decode('UTF-8', 'ignore')
-                if '##fileprefix' in encoded_line:
-                    newlines.append('')
-                else:
-                    newlines.append(encoded_line)
-            with open('in.imf', 'w') as f:
-                for line in newlines:
-                    f.write(line)
-            macro_run = subprocess.Popen(
-                str(ep_macro), shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            o, e = macro_run.communicate()
-            std_out += o
-            std_err += e
-            rename('out.idf', 'in.idf')
-
-        # Run Preprocessor -- after EPMacro?
-        if e_args.this_parametric_file:
-            parametric_run = subprocess.Popen(
-                str(parametric) + ' in.idf', shell=True, stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            o, e = parametric_run.communicate()
-            std_out += o
-            std_err += e
-            candidate_files = glob.glob('in-*.idf')
-            if len(candidate_files) > 0:
-                file_to_run_here = sorted(candidate_files)[0]
-                if idf_file.exists():
-                    idf_file.unlink()
-                rename(file_to_run_here, idf_file)
+    # Run EPMacro as necessary
+    idf_file = run_dir / 'in.idf'
+    expanded_file = run_dir / 'expanded.idf'
+    imf_path = run_dir / 'in.imf'
+    ght_file = run_dir / 'GHTIn.idf'
+    basement_file = run_dir / 'BasementGHTIn.idf'
+    ep_json_file = run_dir / 'in.epJSON'
+    rvi_file = run_dir / 'in.rvi'
+    mvi_file = run_dir / 'in.mvi'
+
+    if imf_path.exists():
+        with imf_path.open('rb') as f:
+            lines = f.readlines()
+        newlines = []
+        for line in lines:
+            encoded_line = line.decode('UTF-8', 'ignore')
+            if '##fileprefix' in encoded_line:
+                newlines.append('')
             else:
-                return e_args.build_tree.build_dir, e_args.entry_name, False, False, "Issue with Parametric"
-
-        # Run ExpandObjects and process as necessary, but not for epJSON files!
-        if idf_file.exists():
-            expand_objects_run = subprocess.Popen(
-                str(expand_objects), shell=True, stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            o, e = expand_objects_run.communicate()
-            std_out += o
-            std_err += e
-            if expanded_file.exists():
-                if idf_file.exists():
-                    idf_file.unlink()
-                rename(expanded_file, idf_file)
-
-                if basement_file.exists():
-                    shutil.copy(basement_idd, e_args.test_run_directory)
-                    basement_environment = environ.copy()
-                    basement_environment['CI_BASEMENT_NUMYEARS'] = '2'
-                    basement_run = subprocess.Popen(
-                        str(basement), shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE, env=basement_environment
-                    )
-                    o, e = basement_run.communicate()
-                    std_out += o
-                    std_err += e
-                    with open('EPObjects.TXT') as f:
-                        append_text = f.read()
-                    with open('in.idf', 'a') as f:
-                        f.write("\n%s\n" % append_text)
-                    (e_args.test_run_directory / 'RunINPUT.TXT').unlink()
-                    (e_args.test_run_directory / 'RunDEBUGOUT.TXT').unlink()
-                    (e_args.test_run_directory / 'EPObjects.TXT').unlink()
-                    (e_args.test_run_directory / 'BasementGHTIn.idf').unlink()
-                    (e_args.test_run_directory / 'MonthlyResults.csv').unlink()
-                    (e_args.test_run_directory / 'BasementGHT.idd').unlink()
-
-                if ght_file.exists():
-                    shutil.copy(slab_idd, e_args.test_run_directory)
-                    slab_run = subprocess.Popen(
-                        str(slab), shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-                    )
-                    o, e = slab_run.communicate()
-                    std_out += o
-                    std_err += e
-                    with open('SLABSurfaceTemps.TXT') as f:
-                        append_text = f.read()
-                    with open('in.idf', 'a') as f:
-                        f.write("\n%s\n" % append_text)
-                    (e_args.test_run_directory / 'SLABINP.TXT').unlink()
-                    (e_args.test_run_directory / 'GHTIn.idf').unlink()
-                    (e_args.test_run_directory / 'SLABSurfaceTemps.TXT').unlink()
-                    (e_args.test_run_directory / 'SLABSplit Surface Temps.TXT').unlink()
-                    (e_args.test_run_directory / 'SlabGHT.idd').unlink()
-
-        # Set up environment
-        environ["DISPLAYADVANCEDREPORTVARIABLES"] = "YES"
-        environ["DISPLAYALLWARNINGS"] = "YES"
-        if e_args.run_type == ForceRunType.DD:
-            environ["DDONLY"] = "Y"
-            environ["REVERSEDD"] = ""
-            environ["FULLANNUALRUN"] = ""
-        elif e_args.run_type == ForceRunType.ANNUAL:
-            environ["DDONLY"] = ""
-            environ["REVERSEDD"] = ""
-            environ["FULLANNUALRUN"] = "Y"
-        elif e_args.run_type == ForceRunType.NONE:
-            environ["DDONLY"] = ""
-            environ["REVERSEDD"] = ""
-            environ["FULLANNUALRUN"] = ""
-        else:  # pragma: no cover
-            # it feels weird to try to test this path...have to set run_type to something invalid?
-            # should we just eliminate this else?
-            pass  # do nothing?
-
-        # use the user-entered minimum reporting frequency
-        #  (useful for limiting to daily outputs for annual simulation, etc.)
-        environ["MINREPORTFREQUENCY"] = e_args.min_reporting_freq.upper()
-
-        # Execute EnergyPlus
-        try:
-            command_line = str(energyplus)
-            if ep_json_file.exists():
-                command_line += ' in.epJSON'
-            std_out += subprocess.check_output(
-                command_line, shell=True, stdin=subprocess.DEVNULL, stderr=subprocess.PIPE
-            )
-        except subprocess.CalledProcessError as e:  # pragma: no cover
-            ...
-            # so I can verify that I hit this during the test_case_b_crash test, but if I just have the return in
-            #  here alone, it shows as missing on the coverage...wonky
-            return e_args.build_tree.build_dir, e_args.entry_name, False, False, str(e)
-
-        # Execute read-vars
-        if rvi_file.exists():
-            csv_run = subprocess.Popen(
-                str(read_vars) + ' in.rvi', shell=True, stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-        else:
-            csv_run = subprocess.Popen(
-                str(read_vars), shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        o, e = csv_run.communicate()
-        std_out += o
-        std_err += e
-        if mvi_file.exists():
-            mtr_run = subprocess.Popen(
-                str(read_vars) + ' in.mvi', shell=True, stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
+                newlines.append(encoded_line)
+        with imf_path.open('w') as f:
+            for line in newlines:
+                f.write(line)
+        yield from run(ToolInvocation('EPMacro', tool_argv(ep_macro), env))
+        rename(run_dir / 'out.idf', idf_file)
+
+    # Run Preprocessor -- after EPMacro?
+    if e_args.this_parametric_file:
+        yield from run(ToolInvocation('ParametricPreprocessor', tool_argv(parametric, 'in.idf'), env))
+        candidate_files = sorted(run_dir.glob('in-*.idf'))
+        if len(candidate_files) > 0:
+            file_to_run_here = candidate_files[0]
+            if idf_file.exists():
+                idf_file.unlink()
+            rename(file_to_run_here, idf_file)
         else:
-            with mvi_file.open('w') as f:
-                f.write("eplusout.mtr\n")
-                f.write("eplusmtr.csv\n")
-            mtr_run = subprocess.Popen(
-                str(read_vars) + ' in.mvi', shell=True, stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-        o, e = mtr_run.communicate()
-        std_out += o
-        std_err += e
-
-        if len(std_out) > 0:
-            with open('eplusout.stdout', 'w') as f:
-                f.write(std_out.decode('utf-8'))
-        if len(std_err) > 0:
-            with open('eplusout.stderr', 'w') as f:
-                f.write(std_err.decode('utf-8'))
-
-        new_idd_path.unlink()
-        chdir(start_path)
-        return e_args.build_tree.build_dir, e_args.entry_name, True, False, ""
+            return e_args.build_tree.build_dir, e_args.entry_name, False, False, "Issue with Parametric"
+
+    # Run ExpandObjects and process as necessary, but not for epJSON files!
+    if idf_file.exists():
+        yield from run(ToolInvocation('ExpandObjects', tool_argv(expand_objects), env))
+        if expanded_file.exists():
+            if idf_file.exists():
+                idf_file.unlink()
+            rename(expanded_file, idf_file)
+
+            if basement_file.exists():
+                stage_file(basement_idd, run_dir, e_args.staging_mode, staging_stats)
+                basement_environment = dict(env)
+                basement_environment['CI_BASEMENT_NUMYEARS'] = '2'
+                yield from run(ToolInvocation('Basement', tool_argv(basement), basement_environment))
+                with (run_dir / 'EPObjects.TXT').open() as f:
+                    append_text = f.read()
+                with idf_file.open('a') as f:
+                    f.write("\n%s\n" % append_text)
+                (run_dir / 'RunINPUT.TXT').unlink()
+                (run_dir / 'RunDEBUGOUT.TXT').unlink()
+                (run_dir / 'EPObjects.TXT').unlink()
+                (run_dir / 'BasementGHTIn.idf').unlink()
+                (run_dir / 'MonthlyResults.csv').unlink()
+                (run_dir / 'BasementGHT.idd').unlink()
+
+            if ght_file.exists():
+                stage_file(slab_idd, run_dir, e_args.staging_mode, staging_stats)
+                yield from run(ToolInvocation('Slab', tool_argv(slab), env))
+                with (run_dir / 'SLABSurfaceTemps.TXT').open() as f:
+                    append_text = f.read()
+                with idf_file.open('a') as f:
+                    f.write("\n%s\n" % append_text)
+                (run_dir / 'SLABINP.TXT').unlink()
+                (run_dir / 'GHTIn.idf').unlink()
+                (run_dir / 'SLABSurfaceTemps.TXT').unlink()
+                (run_dir / 'SLABSplit Surface Temps.TXT').unlink()
+                (run_dir / 'SlabGHT.idd').unlink()
+
+    # Execute EnergyPlus
+    energyplus_argv = tool_argv(energyplus)
+    if ep_json_file.exists():
+        energyplus_argv.append('in.epJSON')
+    energyplus_result = yield from run(ToolInvocation('EnergyPlus', energyplus_argv, env, keep_stderr=False))
+    if energyplus_result.return_code != 0:
+        return (
+            e_args.build_tree.build_dir, e_args.entry_name, False, False,
+            str(subprocess.CalledProcessError(energyplus_result.return_code, energyplus_argv))
+        )
+
+    # Execute read-vars
+    if rvi_file.exists():
+        yield from run(ToolInvocation('ReadVarsESO eso', tool_argv(read_vars, 'in.rvi'), env))
+    else:
+        yield from run(ToolInvocation('ReadVarsESO eso', tool_argv(read_vars), env))
+    if not mvi_file.exists():
+        with mvi_file.open('w') as f:
+            f.write("eplusout.mtr\n")
+            f.write("eplusmtr.csv\n")
+    yield from run(ToolInvocation('ReadVarsESO mtr', tool_argv(read_vars, 'in.mvi'), env))
+
+    std_out = b"".join(result.stdout for _, result in tool_outputs)
+    std_err = b"".join(result.stderr for tool, result in tool_outputs if tool.keep_stderr)
+    if len(std_out) > 0:
+        with (run_dir / 'eplusout.stdout').open('w') as f:
+            f.write(std_out.decode('utf-8'))
+    if len(std_err) > 0:
+        with (run_dir / 'eplusout.stderr').open('w') as f:
+            f.write(std_err.decode('utf-8'))
+
+    new_idd_path.unlink()
+    return e_args.build_tree.build_dir, e_args.entry_name, True, False, ""
+
 
+def process_rss_bytes(pid: int) -> Optional[int]:
+    """The resident memory of a running process, or None where it can't be read"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def child_pids(pid: int) -> List[int]:
+    """The processes a running process has started that are still its children, where Linux lists them"""
+    try:
+        tasks = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return []
+    children = []
+    for task in tasks:
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):  # the thread has gone, or the kernel doesn't list children
+            continue
+    return children
+
+
+def process_tree_rss_bytes(pid: int) -> Optional[int]:
+    """The resident memory of a running tool and every process under it, like the program a wrapper script runs, or
+    None where it can't be read.  Walking down from the tool only reads a few files, where finding the members of its
+    process group would mean reading every process on the machine on every poll."""
+    total = None
+    to_visit = [pid]
+    seen = set()
+    while to_visit:
+        current = to_visit.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        rss = process_rss_bytes(current)
+        if rss is None:  # gone since it was listed
+            continue
+        total = rss if total is None else total + rss
+        to_visit.extend(child_pids(current))
+    return total
+
+
+class ToolWatch:
+    """Keeps track of when a running tool is next due to be checked against its limits, if it has any, and the cancel
+    file, if there is one, and of the peak of its memory, if that is sampled"""
+
+    def __init__(self, timeout: Optional[float], max_memory_bytes: Optional[int], cancel_file: Optional[Path],
+                 sample_memory: bool = False):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.max_memory_bytes = max_memory_bytes
+        self.cancel_file = cancel_file
+        self.sample_memory = sample_memory
+        self.next_cancel_check = time.monotonic() + CANCEL_POLL_SECONDS
+        self.next_memory_sample = time.monotonic() + MEMORY_SAMPLE_SECONDS
+        self.peak_rss_bytes: Optional[int] = None
+
+    def watching(self) -> bool:
+        checks = (self.deadline, self.max_memory_bytes, self.cancel_file)
+        return self.sample_memory or any(check is not None for check in checks)
+
+    def poll_seconds(self) -> float:
+        now = time.monotonic()
+        seconds = max(0.0, self.next_cancel_check - now) if self.cancel_file is not None else CANCEL_POLL_SECONDS
+        if self.sample_memory:
+            seconds = min(seconds, max(0.0, self.next_memory_sample - now))
+        if self.max_memory_bytes is not None:
+            seconds = min(seconds, LIMIT_POLL_SECONDS)
+        if self.deadline is not None:
+            seconds = min(seconds, LIMIT_POLL_SECONDS, max(0.0, self.deadline - now))
+        return seconds
+
+    def limit_exceeded(self, pid: int) -> Optional[str]:
+        now = time.monotonic()
+        if self.cancel_file is not None and now >= self.next_cancel_check:
+            self.next_cancel_check = now + CANCEL_POLL_SECONDS
+            if self.cancel_file.exists():
+                return CANCELLED
+        if self.deadline is not None and now >= self.deadline:
+            return TIMED_OUT
+        if self.max_memory_bytes is not None or (self.sample_memory and now >= self.next_memory_sample):
+            self.next_memory_sample = now + MEMORY_SAMPLE_SECONDS
+            rss = process_tree_rss_bytes(pid)
+            if rss is not None:
+                self.peak_rss_bytes = max(rss, self.peak_rss_bytes or 0)
+                if self.max_memory_bytes is not None and rss > self.max_memory_bytes:
+                    return OUT_OF_MEMORY
+        return None
+
+
+def kill_process_group(process) -> None:
+    """Kills a tool along with anything it started, works for both a Popen and an asyncio process"""
+    if NEW_PROCESS_GROUP:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:  # already gone
+            pass
+    else:  # pragma: no cover -- no process groups to kill on Windows
+        process.kill()
+
+
+def kill_running_tools() -> None:
+    """Kills every tool started from this process that is still running"""
+    for process in list(running_tools.values()):
+        kill_process_group(process)
+
+
+def run_tool(
+        tool: ToolInvocation, run_dir: Path, timeout: Optional[float] = None, max_memory_bytes: Optional[int] = None,
+        cancel_file: Optional[Path] = None, sample_memory: bool = SAMPLE_MEMORY
+) -> ToolResult:
+    process = subprocess.Popen(
+        tool.argv, cwd=run_dir, env=tool.env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        start_new_session=NEW_PROCESS_GROUP
+    )
+    running_tools[process.pid] = process
+    try:
+        watch = ToolWatch(timeout, max_memory_bytes, cancel_file, sample_memory)
+        if not watch.watching():
+            o, e = process.communicate()
+            return ToolResult(process.returncode, o, e, peak_rss_bytes=watch.peak_rss_bytes)
+        while True:
+            try:
+                o, e = process.communicate(timeout=watch.poll_seconds())
+                return ToolResult(process.returncode, o, e, peak_rss_bytes=watch.peak_rss_bytes)
+            except subprocess.TimeoutExpired:
+                pass
+            limit = watch.limit_exceeded(process.pid)
+            if limit:
+                kill_process_group(process)
+                o, e = process.communicate()
+                return ToolResult(process.returncode, o, e, limit, watch.peak_rss_bytes)
+    finally:
+        del running_tools[process.pid]
+
+
+async def run_tool_async(
+        tool: ToolInvocation, run_dir: Path, timeout: Optional[float] = None, max_memory_bytes: Optional[int] = None,
+        cancel_file: Optional[Path] = None, sample_memory: bool = SAMPLE_MEMORY
+) -> ToolResult:
+    process = await asyncio.create_subprocess_exec(
+        *tool.argv, cwd=run_dir, env=tool.env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        start_new_session=NEW_PROCESS_GROUP
+    )
+    running_tools[process.pid] = process
+    try:
+        watch = ToolWatch(timeout, max_memory_bytes, cancel_file, sample_memory)
+        if not watch.watching():
+            o, e = await process.communicate()
+            return ToolResult(process.returncode, o, e, peak_rss_bytes=watch.peak_rss_bytes)
+        output = asyncio.ensure_future(process.communicate())
+        while True:
+            done, _ = await asyncio.wait({output}, timeout=watch.poll_seconds())
+            if done:
+                o, e = output.result()
+                return ToolResult(process.returncode, o, e, peak_rss_bytes=watch.peak_rss_bytes)
+            # walking /proc for the memory of the tool, or looking for the cancel file, is done on a thread
+            limit = await asyncio.to_thread(watch.limit_exceeded, process.pid)
+            if limit:
+                kill_process_group(process)
+                o, e = await output
+                return ToolResult(process.returncode, o, e, limit, watch.peak_rss_bytes)
+    except asyncio.CancelledError:
+        kill_process_group(process)
+        raise
+    finally:
+        del running_tools[process.pid]
+
+
+def advance_steps(steps: Generator, completed: Optional[ToolResult] = None) -> tuple:
+    """Runs simulation_steps on to its next tool, giving back the tool and None, or, once the chain is done, None and
+    the simulation results, as the StopIteration that ends it can't be passed back from a thread"""
+    try:
+        return steps.send(completed), None
+    except StopIteration as done:
+        return None, done.value
+
+
+def cancel_requested(e_args: ExecutionArguments) -> bool:
+    return e_args.cancel_file is not None and e_args.cancel_file.exists()
+
+
+def stopped_at_limit(e_args: ExecutionArguments, tool: ToolInvocation, limit: str) -> tuple:
+    if limit == CANCELLED:
+        # nothing to mark, a cancelled simulation is just unfinished
+        message = f"{tool.stage} was killed, the suite was cancelled"
+        return e_args.build_tree.build_dir, e_args.entry_name, False, False, message, limit
+    # the marker is how the diffs tell a simulation that was stopped from one that crashed
+    with (e_args.test_run_directory / LIMIT_FILE_NAME).open('w') as f:
+        json.dump({'limit': limit, 'stage': tool.stage}, f)
+    message = f"{tool.stage} was killed at the {limit} limit"
+    print("**" + message)
+    return e_args.build_tree.build_dir, e_args.entry_name, False, False, message, limit
+
+
+# noinspection PyBroadException
+def execute_energyplus(
+        e_args: ExecutionArguments, tracer: Optional[StageTracer] = None, staging_stats: Optional[StagingStats] = None
+) -> tuple:
+    """Runs the whole chain of tools of a simulation, returning the results of simulation_steps, or, for a simulation
+    stopped at one of its limits, those results with which limit it was appended"""
+    # each of the tools run is timed as a stage of the simulation
+    if tracer is None:
+        tracer = StageTracer(e_args.entry_name, str(e_args.build_tree.build_dir))
+    limits = e_args.limits or SimulationLimits()
+    case_deadline = limits.case_deadline()
+    steps = simulation_steps(e_args, staging_stats)
+    try:
+        tool = next(steps)
+        while True:
+            with tracer.span(tool.stage) as details:
+                completed = run_tool(
+                    tool, e_args.test_run_directory, limits.tool_timeout(case_deadline), limits.max_memory_bytes,
+                    e_args.cancel_file
+                )
+                details['return_code'] = completed.return_code
+                details['peak_rss_bytes'] = completed.peak_rss_bytes
+                if completed.limit_exceeded:
+                    details['limit_exceeded'] = completed.limit_exceeded
+            # a tool killed from elsewhere on cancel looks like any other failure, so check before going on
+            limit = CANCELLED if cancel_requested(e_args) else completed.limit_exceeded
+            if limit:
+                steps.close()
+                return stopped_at_limit(e_args, tool, limit)
+            tool = steps.send(completed)
+    except StopIteration as done:
+        return done.value
+    except Exception as e:
+        print("**" + str(e))
+        return e_args.build_tree.build_dir, e_args.entry_name, False, False, str(e)
+
+
+# noinspection PyBroadException
+async def execute_energyplus_async(
+        e_args: ExecutionArguments, tracer: Optional[StageTracer] = None, staging_stats: Optional[StagingStats] = None
+) -> tuple:
+    """Runs a simulation like execute_energyplus, but as a coroutine waiting on its tools, so that one process can
+    keep many simulations going at once without a worker process for each.  The staging, copying and reading of files
+    between the tools is done on a thread, as a slow disk would otherwise hold up every simulation on the loop."""
+    if tracer is None:
+        tracer = StageTracer(e_args.entry_name, str(e_args.build_tree.build_dir))
+    limits = e_args.limits or SimulationLimits()
+    case_deadline = limits.case_deadline()
+    steps = simulation_steps(e_args, staging_stats)
+    try:
+        tool, results = await asyncio.to_thread(advance_steps, steps)
+        while tool is not None:
+            with tracer.span(tool.stage) as details:
+                completed = await run_tool_async(
+                    tool, e_args.test_run_directory, limits.tool_timeout(case_deadline), limits.max_memory_bytes,
+                    e_args.cancel_file
+                )
+                details['return_code'] = completed.return_code
+                details['peak_rss_bytes'] = completed.peak_rss_bytes
+                if completed.limit_exceeded:
+                    details['limit_exceeded'] = completed.limit_exceeded
+            # a tool killed from elsewhere on cancel looks like any other failure, so check before going on
+            limit = CANCELLED if await asyncio.to_thread(cancel_requested, e_args) else completed.limit_exceeded
+            if limit:
+                steps.close()
+                return await asyncio.to_thread(stopped_at_limit, e_args, tool, limit)
+            tool, results = await asyncio.to_thread(advance_steps, steps, completed)
+        return results
     except Exception as e:
         print("**" + str(e))
-        chdir(start_path)
         return e_args.build_tree.build_dir, e_args.entry_name, False, False, str(e)
@@ -1,5 +1,6 @@
 from pathlib import Path
-from typing import Union
+import re
+from typing import Dict, Iterable, Optional, Tuple, Union
 
 # In most runs, the EPW assignment will be guessed from the CMakeLists file in the testfiles/ directory.
 # However, when using an E+ install as a build directory, the EPW assignments are not known.
@@ -735,49 +736,90 @@ epw_map = {
 }
 
 
-# TODO: This should not be a hanging function that re-parses the file over and over...
-def get_epw_for_idf(repo_source_dir: Path, idf: str) -> Union[None, str]:
+_IDF_TOKEN = re.compile(r'IDF_FILE\s+([^\s)]+)')
+_EPW_TOKEN = re.compile(r'EPW_FILE\s+([^\s)]+)')
+
+# parsed CMakeLists.txt files, by path, along with the modification time and size they were parsed at
+_cmake_lists_indexes: Dict[Path, Tuple[int, int, Dict[str, str]]] = {}
+
+
+def parse_cmake_lists(cmake_lists: Path) -> Dict[str, str]:
+    """
+    Reads the EPW assigned to each IDF out of the simulation tests in a testfiles/CMakeLists.txt, keyed by the IDF path
+    exactly as it is written there, like "1ZoneEvapCooler.idf" or "BasicsFiles/ThisTest1.idf".  Where an IDF is
+    listed more than once, the first EPW listed for it is kept.
+
+    :param cmake_lists:
+    :return:
     """
-    Tries to get the correct EPW for an IDF.
+    index = {}
+    with cmake_lists.open() as f_cmake:
+        for line in f_cmake:
+            cleaned = line.strip()
+            if cleaned.startswith('#'):
+                continue
+            idf_match = _IDF_TOKEN.search(cleaned)
+            epw_match = _EPW_TOKEN.search(cleaned)
+            if idf_match and epw_match:
+                index.setdefault(idf_match.group(1), epw_match.group(1))
+    return index
+
+
+def cmake_lists_index(cmake_lists: Path) -> Dict[str, str]:
+    """
+    The parsed CMakeLists.txt, only read again when the file has changed since it was last parsed
+
+    :param cmake_lists:
+    :return:
+    """
+    stat = cmake_lists.stat()
+    cached = _cmake_lists_indexes.get(cmake_lists)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    index = parse_cmake_lists(cmake_lists)
+    _cmake_lists_indexes[cmake_lists] = (stat.st_mtime_ns, stat.st_size, index)
+    return index
+
+
+def get_epws_for_idfs(repo_source_dir: Path, idfs: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Tries to get the correct EPW for each of a list of IDFs, reading the source tree at most once for all of them.
 
     The repo source tree should be known based on the build type (VS, Make, Install).  If it contains a "testfiles"
     directory, then "testfiles/CMakeLists.txt" is searched for the correct EPW.  If not, the list above is used. If
     it still cannot be found, then None is returned, and the diff engine will use a default as needed.
 
-    The IDF should be relative to the root of the testfiles directory, so like: "1ZoneEvapCooler.idf", or
-    "BasicsFiles/ThisTest1.idf"
+    The IDFs should be relative to the root of the testfiles directory, so like: "1ZoneEvapCooler.idf", or
+    "BasicsFiles/ThisTest1.idf", and must match the name in CMakeLists.txt exactly.
 
     :param repo_source_dir:
-    :param idf:
-    :return:
+    :param idfs:
+    :return: the EPW (or None) for each IDF, keyed by IDF
     """
+    idfs = list(idfs)
     if not repo_source_dir.exists():
-        return None
+        return {idf: None for idf in idfs}
     test_files_dir = repo_source_dir / 'testfiles'
     if test_files_dir.exists():
         # it appears we have a build folder
         cmake_lists = test_files_dir / 'CMakeLists.txt'
-        if cmake_lists.exists():
-            # it appears we can look up the IDF in this file
-            with cmake_lists.open() as f_cmake:
-                lines = f_cmake.readlines()
-            for line in lines:
-                cleaned = line.strip()
-                if cleaned.startswith('#'):
-                    continue
-                if idf in cleaned:
-                    tokens = cleaned.split(" ")
-                    if len(tokens) >= 4:
-                        potential_epw_token = tokens[3]
-                        if potential_epw_token.endswith(')'):
-                            return potential_epw_token[:-1]
-                        else:
-                            return tokens[3]
-        else:
+        if not cmake_lists.exists():
             # something is weird, just return None
-            return None
+            return {idf: None for idf in idfs}
+        # it appears we can look up the IDFs in this file
+        index = cmake_lists_index(cmake_lists.resolve())
     else:
-        # it appears we have an e+ install folder, try to look up the value, return None if not found
-        return epw_map.get(idf, None)
-    # if something went really awry, just return None to use to the default
-    return None
+        # it appears we have an e+ install folder, try to look up the values, None if not found
+        index = epw_map
+    return {idf: index.get(idf) for idf in idfs}
+
+
+def get_epw_for_idf(repo_source_dir: Path, idf: str) -> Union[None, str]:
+    """
+    Tries to get the correct EPW for an IDF, see get_epws_for_idfs, which should be used when looking up many IDFs.
+
+    :param repo_source_dir:
+    :param idf:
+    :return:
+    """
+    return get_epws_for_idfs(repo_source_dir, [idf])[idf]
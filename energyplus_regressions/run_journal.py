@@ -0,0 +1,73 @@
+"""
+An append-only journal of a suite run, kept in its test output directory, with a line written as soon as each
+simulation or diff finishes, so that a run that dies part way through can be picked up again with ``--resume``:
+
+    {"event": "simulation", "build": "A", "case": "1ZoneUncontrolled", "success": true, "end_mtime_ns": 1712345678}
+    {"event": "diff", "case": "1ZoneUncontrolled", "entry": {...}, "message": "Processed Diffs : 1ZoneUncontrolled"}
+
+Each line is flushed to disk before the run carries on, and a line cut short by a crash is ignored when the journal is
+read back.  The entry of a diff is everything TestEntry.to_record knows about the case, and the end time of a
+simulation is the modification time of the file that showed it had got to the end, so that a run directory that has
+been prepared or run again since isn't taken for the one that was journaled.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from energyplus_regressions.structures import TestEntry
+
+JOURNAL_FILE_NAME = 'run_journal.jsonl'
+
+SIMULATION = 'simulation'
+DIFF = 'diff'
+
+
+class RunJournal:
+    """The simulations and diffs finished so far in a test output directory, read back from its journal file"""
+
+    def __init__(self, journal_file: Path):
+        self.journal_file = journal_file
+        # (build label, case name) -> whether the simulation succeeded, and the modification time of its end file
+        self.simulations: Dict[Tuple[str, str], Tuple[bool, Optional[int]]] = {}
+        # case name -> the diffed entry and the message it was reported with
+        self.diffs: Dict[str, Tuple[TestEntry, str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.journal_file, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:  # nothing run here yet
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if record['event'] == SIMULATION:
+                    self.simulations[(record['build'], record['case'])] = (
+                        record['success'], record.get('end_mtime_ns')
+                    )
+                elif record['event'] == DIFF:
+                    self.diffs[record['case']] = (TestEntry.from_record(record['entry']), record['message'])
+            except (ValueError, KeyError, TypeError):  # the last line of a run that crashed while writing it
+                continue
+
+    def record_simulation(
+            self, build_label: str, case_name: str, success: bool, end_mtime_ns: Optional[int] = None
+    ) -> None:
+        self.simulations[(build_label, case_name)] = (success, end_mtime_ns)
+        self.append({
+            'event': SIMULATION, 'build': build_label, 'case': case_name, 'success': success,
+            'end_mtime_ns': end_mtime_ns
+        })
+
+    def record_diff(self, this_entry: TestEntry, message: str) -> None:
+        self.diffs[this_entry.basename] = (this_entry, message)
+        self.append({'event': DIFF, 'case': this_entry.basename, 'entry': this_entry.to_record(), 'message': message})
+
+    def append(self, record: dict) -> None:
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
@@ -3,36 +3,77 @@
 from __future__ import unicode_literals
 
 import argparse
+import asyncio
+import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 import json
+import os
 from pathlib import Path
 from platform import system
 import shutil
 import sys
+from threading import BoundedSemaphore
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
 
 if getattr(sys, 'frozen', False):  # pragma: no cover -- not covering frozen apps in unit tests
     frozen = True
 else:
     frozen = False
 
-from difflib import unified_diff  # python's own diff library
-
 from energyplus_regressions.builds.base import BuildTree, BaseBuildDirectoryStructure
-from energyplus_regressions.diffs import math_diff, table_diff, thresh_dict as td
-from energyplus_regressions.energyplus import ExecutionArguments, execute_energyplus
+from energyplus_regressions.dependency_rules import PARAMETRIC, DependencyRules
+from energyplus_regressions.diffs import math_diff, math_diff_streaming, table_diff, text_diff, thresh_dict as td
+from energyplus_regressions.energyplus import (
+    CANCEL_FILE_NAME, CANCELLED, LIMIT_FILE_NAME, OUT_OF_MEMORY, ExecutionArguments, SimulationLimits,
+    execute_energyplus, execute_energyplus_async, kill_running_tools
+)
 from energyplus_regressions.structures import (
     ForceRunType,
     TextDifferences,
     EndErrSummary,
+    ExecutionBackend,
     MathDifferences,
     TableDifferences,
     CompletedStructure,
     ReportingFreq,
     ForceOutputSQL,
     ForceOutputSQLUnitConversion,
+    MathDiffEngine,
+    StagingMode,
     TestEntry
 )
-from multiprocessing import Pool
+from energyplus_regressions.run_journal import JOURNAL_FILE_NAME, RunJournal
+from energyplus_regressions.runtime_history import (
+    RuntimeHistory, count_input_objects, estimate_input_objects, predict_makespan
+)
+from energyplus_regressions.scheduler import AsyncioExecutor, Job, JobGraphScheduler, PoolExecutor, SerialExecutor
+from energyplus_regressions.sim_cache import CacheStats, SimulationCache, snapshot_directory
+from energyplus_regressions.staging import StagingStats, stage_file
+from energyplus_regressions.tracing import (
+    TIMELINE_FILE_NAME, TRACE_FILE_NAME, StageTrace, StageTracer, write_chrome_trace
+)
+
+# the default upper limit on the size of the simulation cache, if one is used
+DEFAULT_SIM_CACHE_SIZE = 20 * 1024 ** 3
+
+# diffs are quick and each one finishes off a case, so they always go ahead of any waiting simulation
+DIFF_PRIORITY = float('-inf')
+
+# the read size used when checking whether two output files are byte-for-byte identical
+IDENTICAL_CHECK_CHUNK_BYTES = 1024 * 1024
+
+# run directories are prepared on this many threads while the simulations run, mostly waiting on file I/O
+PREPARATION_THREADS = 4
+
+# how many prepared runs are allowed to be waiting on a worker, per worker, before preparation pauses
+PREPARED_RUNS_AHEAD_PER_WORKER = 2
+
+# a case timeout derived from its runtime history is never shorter than this, so that a case that normally takes a
+# second isn't killed for a moment's hiccup on a busy machine
+MIN_HISTORY_TIMEOUT_SECONDS = 60
 
 # get the current file path for convenience
 script_dir = Path(__file__).resolve().parent
@@ -44,7 +85,15 @@ class TestRunConfiguration:
     def __init__(self, force_run_type: str, num_threads: int, report_freq: str,
                  build_a: BaseBuildDirectoryStructure, build_b: BaseBuildDirectoryStructure,
                  single_test_run: bool = False, force_output_sql: ForceOutputSQL = ForceOutputSQL.NOFORCE,
-                 force_output_sql_unitconv: ForceOutputSQLUnitConversion = ForceOutputSQLUnitConversion.NOFORCE):
+                 force_output_sql_unitconv: ForceOutputSQLUnitConversion = ForceOutputSQLUnitConversion.NOFORCE,
+                 sim_cache_dir: Optional[Path] = None, sim_cache_max_size_bytes: int = DEFAULT_SIM_CACHE_SIZE,
+                 math_diff_engine: MathDiffEngine = MathDiffEngine.AUTO, staging_mode: StagingMode = StagingMode.COPY,
+                 dependency_rules_file: Optional[Path] = None,
+                 execution_backend: ExecutionBackend = ExecutionBackend.PROCESSES,
+                 max_concurrent_simulations: Optional[int] = None,
+                 case_timeout_seconds: Optional[float] = None, tool_timeout_seconds: Optional[float] = None,
+                 timeout_history_factor: Optional[float] = None, max_memory_bytes: Optional[int] = None,
+                 resume_test_output_dir: Optional[str] = None):
         self.force_run_type = force_run_type
         self.TestOneFile = single_test_run
         self.num_threads = num_threads
@@ -53,17 +102,138 @@ class TestRunConfiguration:
         self.report_freq = report_freq
         self.force_output_sql = ForceOutputSQL(force_output_sql)
         self.force_output_sql_unitconv = ForceOutputSQLUnitConversion(force_output_sql_unitconv)
+        self.sim_cache_dir = sim_cache_dir
+        self.sim_cache_max_size_bytes = sim_cache_max_size_bytes
+        self.math_diff_engine = MathDiffEngine(math_diff_engine)
+        self.staging_mode = StagingMode(staging_mode)
+        self.dependency_rules_file = dependency_rules_file
+        self.execution_backend = ExecutionBackend(execution_backend)
+        # only used by the asyncio backend, which otherwise keeps num_threads simulations going
+        self.max_concurrent_simulations = max_concurrent_simulations
+        # limits each simulation is killed at, None for no limit; with a history factor, a case run before is also
+        # limited to that many times the median of its recent wall times
+        self.case_timeout_seconds = case_timeout_seconds
+        self.tool_timeout_seconds = tool_timeout_seconds
+        self.timeout_history_factor = timeout_history_factor
+        self.max_memory_bytes = max_memory_bytes
+        # the test output directory of an earlier run to carry on with, instead of starting a new one
+        self.resume_test_output_dir = resume_test_output_dir
 
 
 class TestCaseCompleted:
     __test__ = False  # so that PyTest doesn't try to run this as a class fixture
 
-    def __init__(self, run_directory: str, case_name: str, run_status, error_msg_reported_already, extra_message=""):
+    def __init__(self, run_directory: str, case_name: str, run_status, error_msg_reported_already, extra_message="",
+                 limit_exceeded=None):
         self.run_directory = run_directory
         self.case_name = case_name
         self.run_success = run_status
         self.muffle_err_msg = error_msg_reported_already
         self.extra_message = extra_message
+        # the limit the simulation was killed at, TIMED_OUT or OUT_OF_MEMORY, if it was
+        self.limit_exceeded = limit_exceeded
+
+
+class DiffArguments:
+    # this is sent to a worker process for every case diff, so keep it compact
+    __slots__ = ('entry', 'build_tree_a', 'build_tree_b', 'test_output_dir', 'thresh_dict_file', 'math_diff_engine')
+
+    def __init__(self, entry: TestEntry, build_tree_a: BuildTree, build_tree_b: BuildTree, test_output_dir: str,
+                 thresh_dict_file: Path, math_diff_engine: MathDiffEngine):
+        self.entry = entry
+        self.build_tree_a = build_tree_a
+        self.build_tree_b = build_tree_b
+        self.test_output_dir = test_output_dir
+        self.thresh_dict_file = thresh_dict_file
+        self.math_diff_engine = math_diff_engine
+
+
+# the worker functions live at module level so that only the job arguments are pickled for each task, not the runner
+def simulation_worker(
+        run_args: ExecutionArguments, sim_cache: Optional[SimulationCache] = None
+):  # pragma: no cover -- runs in a worker process
+    # returns the simulation results along with the cache status, the wall time of an actual simulation, the spans
+    # of each stage of it and how the IDD and weather files were staged
+    tracer = StageTracer(run_args.entry_name, str(run_args.build_tree.build_dir))
+    staging_stats = StagingStats()
+    if not sim_cache:
+        return timed_simulation(run_args, tracer, staging_stats) + (None, tracer.spans, staging_stats)
+    try:
+        key = sim_cache.key_for(run_args)
+        with tracer.span('cache restore'):
+            restored = sim_cache.restore(key, run_args)
+        if restored:
+            results = run_args.build_tree.build_dir, run_args.entry_name, True, False, ""
+            return results, None, SimulationCache.HIT, tracer.spans, staging_stats
+        before = snapshot_directory(run_args.test_run_directory)
+    except OSError as e:  # a broken cache should never stop the simulation from running
+        print(f"**Could not use simulation cache: {e}")
+        return timed_simulation(run_args, tracer, staging_stats) + (None, tracer.spans, staging_stats)
+    results, wall_seconds = timed_simulation(run_args, tracer, staging_stats)
+    if results[2]:
+        try:
+            with tracer.span('cache store'):
+                sim_cache.store(key, run_args.test_run_directory, before)
+        except OSError as e:
+            print(f"**Could not store simulation in cache: {e}")
+    return results, wall_seconds, SimulationCache.MISS, tracer.spans, staging_stats
+
+
+def timed_simulation(
+        run_args: ExecutionArguments, tracer: StageTracer, staging_stats: StagingStats
+):  # pragma: no cover -- runs in a worker process
+    start = perf_counter()
+    results = execute_energyplus(run_args, tracer, staging_stats)
+    return results, perf_counter() - start
+
+
+async def simulation_worker_async(run_args: ExecutionArguments, sim_cache: Optional[SimulationCache] = None):
+    # the same as simulation_worker, but on the event loop of the asyncio backend, with the file copying of the cache
+    # done on a thread so the loop can keep the other simulations going meanwhile
+    tracer = StageTracer(run_args.entry_name, str(run_args.build_tree.build_dir))
+    staging_stats = StagingStats()
+    if not sim_cache:
+        return await timed_simulation_async(run_args, tracer, staging_stats) + (None, tracer.spans, staging_stats)
+    try:
+        key = await asyncio.to_thread(sim_cache.key_for, run_args)
+        with tracer.span('cache restore'):
+            restored = await asyncio.to_thread(sim_cache.restore, key, run_args)
+        if restored:
+            results = run_args.build_tree.build_dir, run_args.entry_name, True, False, ""
+            return results, None, SimulationCache.HIT, tracer.spans, staging_stats
+        before = await asyncio.to_thread(snapshot_directory, run_args.test_run_directory)
+    except OSError as e:  # a broken cache should never stop the simulation from running
+        print(f"**Could not use simulation cache: {e}")
+        return await timed_simulation_async(run_args, tracer, staging_stats) + (None, tracer.spans, staging_stats)
+    results, wall_seconds = await timed_simulation_async(run_args, tracer, staging_stats)
+    if results[2]:
+        try:
+            with tracer.span('cache store'):
+                await asyncio.to_thread(sim_cache.store, key, run_args.test_run_directory, before)
+        except OSError as e:
+            print(f"**Could not store simulation in cache: {e}")
+    return results, wall_seconds, SimulationCache.MISS, tracer.spans, staging_stats
+
+
+async def timed_simulation_async(run_args: ExecutionArguments, tracer: StageTracer, staging_stats: StagingStats):
+    start = perf_counter()
+    results = await execute_energyplus_async(run_args, tracer, staging_stats)
+    return results, perf_counter() - start
+
+
+def diff_worker(diff_args: DiffArguments):  # pragma: no cover -- runs in a worker process
+    # returns the diff results along with the spans of each diff
+    tracer = StageTracer(diff_args.entry.basename)
+    try:
+        return SuiteRunner.process_diffs_for_one_case(
+            diff_args.entry, diff_args.build_tree_a, diff_args.build_tree_b, diff_args.test_output_dir,
+            diff_args.thresh_dict_file, math_diff_engine=diff_args.math_diff_engine, tracer=tracer
+        ), tracer.spans
+    except Exception as e:  # I'm not trying to catch every possible case here
+        msg = f"Unexpected error processing diffs for {diff_args.entry.basename},"
+        msg += "could indicate an E+ crash caused corrupted files, "
+        msg += f"Message: {e}"
+        return (diff_args.entry, msg), tracer.spans
 
 
 # the actual main test suite run class
@@ -94,6 +264,26 @@ class SuiteRunner:
         self.min_reporting_freq = run_config.report_freq
         self.force_output_sql = run_config.force_output_sql
         self.force_output_sql_unitconv = run_config.force_output_sql_unitconv
+        self.math_diff_engine = run_config.math_diff_engine
+        self.staging_mode = run_config.staging_mode
+        self.execution_backend = run_config.execution_backend
+        self.max_concurrent_simulations = run_config.max_concurrent_simulations or self.number_of_threads
+        self.case_timeout_seconds = run_config.case_timeout_seconds
+        self.tool_timeout_seconds = run_config.tool_timeout_seconds
+        self.timeout_history_factor = run_config.timeout_history_factor
+        self.max_memory_bytes = run_config.max_memory_bytes
+        self.resuming = bool(run_config.resume_test_output_dir)
+        self.journal: Optional[RunJournal] = None
+        self.dependency_rules = DependencyRules.from_file(run_config.dependency_rules_file)
+        self.staging_stats = StagingStats()
+        self.sim_cache = None
+        if run_config.sim_cache_dir:
+            self.sim_cache = SimulationCache(run_config.sim_cache_dir, run_config.sim_cache_max_size_bytes)
+        self.sim_cache_stats = CacheStats()
+        self.runtime_histories: Dict[Path, RuntimeHistory] = {}
+        self.estimated_sim_seconds = []
+        self.stage_trace: Optional[StageTrace] = None
+        self.finished_jobs: List[Job] = []
 
         # File list brought in separately
         self.entries = these_entries
@@ -118,6 +308,9 @@ class SuiteRunner:
             self.test_output_dir = "Tests"
         i = datetime.now()
         self.test_output_dir += i.strftime('_%Y%m%d_%H%M%S')
+        if self.resuming:
+            # given by name, or as a path to it in either build directory
+            self.test_output_dir = Path(run_config.resume_test_output_dir).name
 
         # For files that don't have a specified weather file, use Chicago
         self.default_weather_filename = "USA_IL_Chicago-OHare.Intl.AP.725300_TMY3.epw"
@@ -126,29 +319,51 @@ class SuiteRunner:
 
         # reset this flag
         self.id_like_to_stop_now = False
+        self.sim_cache_stats = CacheStats()
+        self.staging_stats = StagingStats()
+        self.estimated_sim_seconds = []
+        self.finished_jobs = []
 
         # do some preparation
         self.prepare_dir_structure(self.build_tree_a, self.build_tree_b, self.test_output_dir)
+        self.cancel_file.unlink(missing_ok=True)
+        self.journal = RunJournal(self.build_tree_a.build_dir / self.test_output_dir / JOURNAL_FILE_NAME)
+        if self.resuming:
+            self.my_print(
+                f"Resuming {self.test_output_dir}, {len(self.journal.simulations)} simulations and "
+                f"{len(self.journal.diffs)} diffs were already done"
+            )
 
         if self.id_like_to_stop_now:  # pragma: no cover
             self.my_cancelled()
             return
 
+        try:
+            self.stage_trace = StageTrace(
+                self.build_tree_a.build_dir / self.test_output_dir / TRACE_FILE_NAME, keep_existing=self.resuming
+            )
+        except OSError as this_exception:  # pragma: no cover
+            self.my_print('Could not start stage trace file: ' + str(this_exception))
+
         start_time = datetime.now()
         self.my_starting(len(self.entries))
 
-        # run the energyplus script
-        self.run_build(self.build_tree_a)
-        if self.id_like_to_stop_now:  # pragma: no cover
-            self.my_cancelled()
-            return
-        self.run_build(self.build_tree_b)
-        if self.id_like_to_stop_now:  # pragma: no cover
-            self.my_cancelled()
-            return
-        self.my_simulations_complete()
-
-        self.diff_logs_for_build(start_time)
+        # run the energyplus script for both builds, diffing each case as soon as both of its runs are done
+        self.create_completed_structure(start_time)
+        self.run_builds_and_diffs()
+        if self.id_like_to_stop_now:
+            # whatever was diffed before the cancel is still worth looking at
+            self.cancel_file.unlink(missing_ok=True)
+            self.my_cancelled(self.completed_structure)
+            return self.completed_structure
+
+        if self.sim_cache:
+            try:
+                self.sim_cache.evict(self.sim_cache_stats)
+            except OSError as this_exception:  # pragma: no cover
+                self.my_print('Could not trim simulation cache: ' + str(this_exception))
+            self.my_print(self.sim_cache_stats.report())
+        self.my_print(self.staging_stats.report())
 
         try:
             self.my_print('Writing runtime summary file')
@@ -166,6 +381,19 @@ class SuiteRunner:
         except Exception as this_exception:  # pragma: no cover
             self.my_print('Could not write results summary file: ' + str(this_exception))
 
+        if self.stage_trace and self.stage_trace.spans:
+            self.my_print('Slowest stages across the suite, timings of every stage are in ' + TRACE_FILE_NAME)
+            for line in self.stage_trace.slowest_stages():
+                self.my_print(line)
+
+        try:
+            timeline_file_path = self.build_tree_a.build_dir / self.test_output_dir / TIMELINE_FILE_NAME
+            spans = self.stage_trace.spans if self.stage_trace else []
+            write_chrome_trace(timeline_file_path, self.finished_jobs, spans)
+            self.my_print('Suite timeline written to ' + TIMELINE_FILE_NAME + ', it can be opened in Perfetto')
+        except OSError as this_exception:  # pragma: no cover
+            self.my_print('Could not write suite timeline file: ' + str(this_exception))
+
         self.my_print("Test suite complete for directories:")
         self.my_print(" --build-1--> %s" % self.build_tree_a.build_dir)
         self.my_print(" --build-2--> %s" % self.build_tree_b.build_dir)
@@ -174,6 +402,10 @@ class SuiteRunner:
         self.my_all_done(self.completed_structure)
         return self.completed_structure
 
+    @property
+    def cancel_file(self) -> Path:
+        return self.build_tree_a.build_dir / self.test_output_dir / CANCEL_FILE_NAME
+
     def prepare_dir_structure(self, b_a: BuildTree, b_b: BuildTree, d_test: str):
         # make tests directory as needed
         if b_a:
@@ -259,198 +491,134 @@ class SuiteRunner:
 
         return idf_text
 
-    def run_build(self, build_tree: BuildTree):
-
-        this_test_dir: str = self.test_output_dir
-        local_run_type: str = self.force_run_type
-
-        # Create a job list
-        energy_plus_runs: list[ExecutionArguments] = []
-
-        # loop over all entries
-        for this_entry in self.entries:
-            # get a few convenience, typed, variables
-            build_dir: Path = build_tree.build_dir
-            test_files_dir: Path = build_tree.test_files_dir
-            base_name: str = this_entry.basename
-            weather_dir: Path = build_tree.weather_dir
-
-            # first remove the previous test directory for this file and rename it
-            test_run_directory: Path = build_dir / this_test_dir / base_name
-            if test_run_directory.exists():  # pragma: no cover - dir name is generated by local timestamp now
-                shutil.rmtree(test_run_directory)
-            test_run_directory.mkdir()
-
-            # establish the absolute path to the idf or imf, and append .idf or .imf as necessary
-
-            full_input_file_path: Path = test_files_dir / this_entry.name_relative_to_testfiles_dir
-
-            parametric_file: bool = False
-            if not full_input_file_path.exists():
-                self.my_print(f"Input file does not exist: {full_input_file_path}")
-                self.my_case_completed(TestCaseCompleted(this_test_dir, base_name, False, False))
-                continue
-
-            # copy macro files if it is an imf
-            is_ep_json: bool = False
-            if full_input_file_path.name.endswith('.idf'):
-                ep_in_filename = "in.idf"
-            elif full_input_file_path.name.endswith('.imf'):
-                ep_in_filename = "in.imf"
-                # find the rest of the imf files and copy them into the test directory
-                for full_file_name in test_files_dir.iterdir():
-                    if full_file_name.name[-4:] == '.imf':
-                        shutil.copy(full_file_name, build_dir / this_test_dir / base_name)
-            elif full_input_file_path.name.endswith('.epJSON'):
-                ep_in_filename = "in.epJSON"
-                is_ep_json = True
+    def prepare_case_run(
+            self, build_tree: BuildTree, this_entry: TestEntry, staging_stats: Optional[StagingStats] = None,
+            reports: Optional[List[Callable]] = None
+    ) -> Optional[ExecutionArguments]:
+        """Sets up the run directory for one case in one build, returning the arguments to simulate it, or None if the
+        case could not be prepared, in which case the completion has been reported.
+
+        This only touches the run directory of the case and the staging stats, so cases can be prepared on separate
+        threads as long as each has its own stats.  Given a reports list, the callbacks are added to it instead of
+        being made, for the scheduling thread to make."""
+        staging_stats = self.staging_stats if staging_stats is None else staging_stats
+
+        def report(callback: Callable, *args):
+            if reports is None:
+                callback(*args)
             else:
-                self.my_print(f"Invalid file extension, must be idf, imf, or epJSON: {full_input_file_path}")
-                self.my_case_completed(TestCaseCompleted(this_test_dir, base_name, False, False))
-                continue
+                reports.append(partial(callback, *args))
 
-            # copy the input file into the test directory, renaming to in.idf or in.imf
-            shutil.copy(full_input_file_path, test_run_directory / ep_in_filename)
-
-            # read in the entire text of the idf to do some special operations;
-            # could put in one line, but the with block ensures the file handle is closed
-            idf_text = SuiteRunner.read_file_content(test_run_directory / ep_in_filename)
-
-            # if the file requires the window 5 data set file, bring it into the test run directory
-            if 'Window5DataFile.dat' in idf_text:
-                data_sets_dir = test_run_directory / 'datasets'
-                data_sets_dir.mkdir()
-                shutil.copy(build_tree.data_sets_dir / 'Window5DataFile.dat', test_run_directory / 'datasets')
-                idf_text = idf_text.replace('..\\datasets\\Window5DataFile.dat', 'datasets/Window5DataFile.dat')
-
-            # if the file requires the TDV data set file, bring it
-            #  into the test run directory, right now I think it's broken
-            if 'DataSets\\TDV' in idf_text or 'DataSets\\\\TDV' in idf_text:
-                data_sets_dir = test_run_directory / 'datasets'
-                tdv_dir = data_sets_dir / 'TDV'
-                data_sets_dir.mkdir()
-                tdv_dir.mkdir()
-                original_tdv_dir = build_tree.data_sets_dir / 'TDV'
-                for full_file_name in original_tdv_dir.iterdir():
-                    if full_file_name.is_file():
-                        shutil.copy(full_file_name, tdv_dir)
-                from os import sep
-                idf_text = idf_text.replace(
-                    '..\\datasets\\TDV\\TDV_2008_kBtu_CTZ06.csv',
-                    sep.join(['datasets', 'TDV', 'TDV_2008_kBtu_CTZ06.csv'])
-                )
-
-            if 'HybridModel' in base_name:
-                shutil.copy(
-                    build_tree.test_files_dir / 'HybridModel_Measurements_with_HVAC.csv',
-                    test_run_directory / 'HybridModel_Measurements_with_HVAC.csv'
-                )
-                shutil.copy(
-                    build_tree.test_files_dir / 'HybridModel_Measurements_no_HVAC.csv',
-                    test_run_directory / 'HybridModel_Measurements_no_HVAC.csv'
-                )
-
-            # several checks that just bring a single file from the test files dir based on the filename as a keyword
-            single_file_checks = [
-                'HybridZoneModel_TemperatureData.csv',
-                'LookupTable.csv',
-                'SolarShadingTest_Shading_Data.csv',
-                'LocalEnvData.csv',
-                'SurfacePropGndSurfs.csv',
-            ]
-            for single_file_check in single_file_checks:
-                if single_file_check in idf_text:
-                    shutil.copy(
-                        build_tree.test_files_dir / single_file_check,
-                        test_run_directory / single_file_check
-                    )
+        def stage(source: Path, destination: Path):
+            stage_file(source, destination, self.staging_mode, staging_stats)
 
-            if 'report variable dictionary' in idf_text:
-                idf_text = idf_text.replace('report variable dictionary', '')
-
-            if 'Parametric:' in idf_text:
-                parametric_file = True
-
-            # if the file requires the FMUs data set file, bring it
-            #  into the test run directory, right now I think it's broken
-            if 'ExternalInterface:' in idf_text:
-                # self.my_print('Skipping an FMU based file as this is not set up to run yet')
-                # continue
-                new_datasets_dir = test_run_directory / 'datasets'
-                new_fmu_dir = new_datasets_dir / 'FMUs'
-                new_datasets_dir.mkdir()
-                new_fmu_dir.mkdir()
-                original_fmu_dir = build_tree.data_sets_dir / 'FMUs'
-                for full_file_name in original_fmu_dir.iterdir():
-                    if full_file_name.is_file():
-                        shutil.copy(
-                            full_file_name,
-                            test_run_directory / 'datasets' / 'FMUs'
-                        )
-                idf_text = idf_text.replace('..\\datasets', 'datasets')
-
-            if ':ASHRAE205' in idf_text:
-                # need to copy in the cbor data files so that they can run
-                cbor_files = [
-                    'CoolSys1-Chiller.RS0001.a205.cbor',
-                    'A205ExampleChiller.RS0001.a205.cbor',
-                    'CoolSys1-Chiller-Detailed.RS0001.a205.cbor',
-                ]
-                for cbor_file in cbor_files:
-                    shutil.copy(
-                        build_tree.test_files_dir / cbor_file,
-                        test_run_directory / cbor_file
-                    )
+        this_test_dir: str = self.test_output_dir
+        local_run_type: str = self.force_run_type
 
-            # Add Output:SQLite if requested
-            if self.force_output_sql != ForceOutputSQL.NOFORCE:
-                idf_text = self.add_or_modify_output_sqlite(
-                    idf_text=idf_text, force_output_sql=self.force_output_sql,
-                    force_output_sql_unitconv=self.force_output_sql_unitconv,
-                    is_ep_json=is_ep_json
-                )
+        # get a few convenience, typed, variables
+        build_dir: Path = build_tree.build_dir
+        test_files_dir: Path = build_tree.test_files_dir
+        base_name: str = this_entry.basename
+        weather_dir: Path = build_tree.weather_dir
+
+        # first remove the previous test directory for this file and rename it
+        test_run_directory: Path = build_dir / this_test_dir / base_name
+        if test_run_directory.exists():  # only when resuming, the dir name is generated by local timestamp otherwise
+            shutil.rmtree(test_run_directory)
+        test_run_directory.mkdir()
+
+        # establish the absolute path to the idf or imf, and append .idf or .imf as necessary
+
+        full_input_file_path: Path = test_files_dir / this_entry.name_relative_to_testfiles_dir
+
+        parametric_file: bool = False
+        if not full_input_file_path.exists():
+            report(self.my_print, f"Input file does not exist: {full_input_file_path}")
+            report(self.my_case_completed, TestCaseCompleted(this_test_dir, base_name, False, False))
+            return None
+
+        # copy macro files if it is an imf
+        is_ep_json: bool = False
+        if full_input_file_path.name.endswith('.idf'):
+            ep_in_filename = "in.idf"
+        elif full_input_file_path.name.endswith('.imf'):
+            ep_in_filename = "in.imf"
+            # find the rest of the imf files and copy them into the test directory
+            for full_file_name in test_files_dir.iterdir():
+                if full_file_name.name[-4:] == '.imf':
+                    stage(full_file_name, build_dir / this_test_dir / base_name)
+        elif full_input_file_path.name.endswith('.epJSON'):
+            ep_in_filename = "in.epJSON"
+            is_ep_json = True
+        else:
+            report(self.my_print, f"Invalid file extension, must be idf, imf, or epJSON: {full_input_file_path}")
+            report(self.my_case_completed, TestCaseCompleted(this_test_dir, base_name, False, False))
+            return None
+
+        # copy the input file into the test directory, renaming to in.idf or in.imf
+        shutil.copy(full_input_file_path, test_run_directory / ep_in_filename)
+
+        # read in the entire text of the idf to do some special operations;
+        # could put in one line, but the with block ensures the file handle is closed
+        idf_text = SuiteRunner.read_file_content(test_run_directory / ep_in_filename)
+
+        # bring in any datasets and auxiliary files the input file needs, and point the input file at them
+        dependencies = self.dependency_rules.dependencies(idf_text, base_name)
+        dependencies.stage(build_tree, test_run_directory, self.staging_mode, staging_stats)
+        idf_text = dependencies.rewrite(idf_text)
+        parametric_file = PARAMETRIC in dependencies.flags
+
+        # Add Output:SQLite if requested
+        if self.force_output_sql != ForceOutputSQL.NOFORCE:
+            idf_text = self.add_or_modify_output_sqlite(
+                idf_text=idf_text, force_output_sql=self.force_output_sql,
+                force_output_sql_unitconv=self.force_output_sql_unitconv,
+                is_ep_json=is_ep_json
+            )
 
-            # rewrite the idf with the (potentially) modified idf text
-            new_idf_file = build_tree.build_dir / this_test_dir / base_name / ep_in_filename
-            with new_idf_file.open('w', encoding='utf-8') as f_i:
-                f_i.write("%s\n" % idf_text)
-
-            rvi: Path = test_files_dir / (base_name + '.rvi')
-            if rvi.exists():
-                shutil.copy(rvi, build_tree.build_dir / this_test_dir / base_name / 'in.rvi')
-
-            mvi: Path = test_files_dir / (base_name + '.mvi')
-            if mvi.exists():
-                shutil.copy(mvi, build_tree.build_dir / this_test_dir / base_name / 'in.mvi')
-
-            # pick up the corresponding python plugin file, for now this is just the idf basename with .py extension
-            py: Path = test_files_dir / (base_name + '.py')
-            if py.exists():
-                shutil.copy(py, build_dir / this_test_dir / base_name / (base_name + '.py'))
-
-            epw_path: Path = weather_dir / self.default_weather_filename
-            if this_entry.epw:
-                epw_path = weather_dir / (this_entry.epw + '.epw')
-                if not epw_path.exists():
-                    self.my_print(
-                        "For case %s, weather file did not exist at %s, using a default one!" % (
-                            base_name, epw_path
-                        )
+        # rewrite the idf with the (potentially) modified idf text
+        new_idf_file = build_tree.build_dir / this_test_dir / base_name / ep_in_filename
+        with new_idf_file.open('w', encoding='utf-8') as f_i:
+            f_i.write("%s\n" % idf_text)
+
+        rvi: Path = test_files_dir / (base_name + '.rvi')
+        if rvi.exists():
+            stage(rvi, build_tree.build_dir / this_test_dir / base_name / 'in.rvi')
+
+        mvi: Path = test_files_dir / (base_name + '.mvi')
+        if mvi.exists():
+            stage(mvi, build_tree.build_dir / this_test_dir / base_name / 'in.mvi')
+
+        # pick up the corresponding python plugin file, for now this is just the idf basename with .py extension
+        py: Path = test_files_dir / (base_name + '.py')
+        if py.exists():
+            stage(py, build_dir / this_test_dir / base_name / (base_name + '.py'))
+
+        epw_path: Path = weather_dir / self.default_weather_filename
+        if this_entry.epw:
+            epw_path = weather_dir / (this_entry.epw + '.epw')
+            if not epw_path.exists():
+                report(
+                    self.my_print,
+                    "For case %s, weather file did not exist at %s, using a default one!" % (
+                        base_name, epw_path
                     )
-                    epw_path = weather_dir / self.default_weather_filename
-
-            energy_plus_runs.append(
-                ExecutionArguments(
-                    build_tree,
-                    base_name,
-                    test_run_directory,
-                    local_run_type,
-                    self.min_reporting_freq,
-                    parametric_file,
-                    str(epw_path)
                 )
-            )
+                epw_path = weather_dir / self.default_weather_filename
+
+        return ExecutionArguments(
+            build_tree,
+            base_name,
+            test_run_directory,
+            local_run_type,
+            self.min_reporting_freq,
+            parametric_file,
+            str(epw_path),
+            self.staging_mode,
+            cancel_file=self.cancel_file
+        )
 
+    def make_scheduler(self) -> JobGraphScheduler:
         # So...on Windows, pyinstaller freezes the application, and then multiprocessing vomits on this.
         # If you are running this from code, say from a Pip install, it works fine.  It's merely the combination of
         # freezing _plus_ multiprocessing.  Apparently the tool needs to run multiprocessing.freeze_support(), which I
@@ -458,23 +626,292 @@ class SuiteRunner:
         # class and add some extra stuff in there, but I could not figure out how to integrate that along with the
         # `apply_async` approach I am using.  Gross.  Once again, on Windows, this means it will partially not be
         # multithreaded.
-        if self.number_of_threads == 1 or frozen and system() in ['Windows', 'Darwin']:  # pragma: no cover
+        # The asyncio backend needs no worker processes for the simulations, so it still runs them concurrently there,
+        # just with the diffs done one at a time.
+        serial = self.number_of_threads == 1 or frozen and system() in ['Windows', 'Darwin']
+        if self.execution_backend == ExecutionBackend.ASYNCIO:
+            diff_executor = SerialExecutor() if serial else PoolExecutor(self.number_of_threads)
+            diff_workers = 1 if serial else self.number_of_threads
+            executor = AsyncioExecutor(self.max_concurrent_simulations, diff_executor)
+            return JobGraphScheduler(
+                executor, self.max_concurrent_simulations + diff_workers, lambda: self.id_like_to_stop_now
+            )
+        if serial:  # pragma: no cover
             if self.number_of_threads > 1:
                 self.my_print("Ignoring num_threads on frozen Windows/Mac instance, just running with one thread.")
-            for run in energy_plus_runs:
-                ep_return = self.ep_wrapper(run)
-                self.ep_done(ep_return)
-        else:  # for all other applications, run them in a multiprocessing pool
-            p = Pool(self.number_of_threads)
-            for run in energy_plus_runs:
-                p.apply_async(self.ep_wrapper, (run,), callback=self.ep_done, error_callback=self.ep_done)
-            p.close()
-            p.join()
-
-    def ep_wrapper(self, run_args):  # pragma: no cover -- this is being skipped by coverage?
-        if self.id_like_to_stop_now:
-            return ["", "Cancelled", False, False]
-        return execute_energyplus(run_args)
+            return JobGraphScheduler(SerialExecutor(), 1, lambda: self.id_like_to_stop_now)
+        # for all other applications, run them in a multiprocessing pool
+        executor = PoolExecutor(self.number_of_threads)
+        return JobGraphScheduler(executor, self.number_of_threads, lambda: self.id_like_to_stop_now)
+
+    def runtime_history(self, build_tree: BuildTree) -> RuntimeHistory:
+        if build_tree.build_dir not in self.runtime_histories:
+            self.runtime_histories[build_tree.build_dir] = RuntimeHistory(build_tree.build_dir)
+        return self.runtime_histories[build_tree.build_dir]
+
+    def save_runtime_histories(self):
+        for history in self.runtime_histories.values():
+            try:
+                history.save()
+            except OSError as this_exception:  # pragma: no cover
+                self.my_print('Could not save runtime history: ' + str(this_exception))
+
+    def simulation_limits(self, history: RuntimeHistory, history_key: str) -> Optional[SimulationLimits]:
+        case_timeout = self.case_timeout_seconds
+        if self.timeout_history_factor:
+            median_seconds = history.median(history_key)
+            if median_seconds is not None:
+                from_history = max(MIN_HISTORY_TIMEOUT_SECONDS, self.timeout_history_factor * median_seconds)
+                case_timeout = from_history if case_timeout is None else min(case_timeout, from_history)
+        if case_timeout is None and self.tool_timeout_seconds is None and self.max_memory_bytes is None:
+            return None
+        return SimulationLimits(case_timeout, self.tool_timeout_seconds, self.max_memory_bytes)
+
+    def simulation_job(self, run: ExecutionArguments, on_complete: Optional[Callable] = None) -> Job:
+        # longest expected simulations are started first so that a huge file can't start last and hold up the suite
+        history = self.runtime_history(run.build_tree)
+        history_key = RuntimeHistory.case_key(run.run_type, run.entry_name)
+        num_objects = count_input_objects(run.test_run_directory)
+        estimated_seconds = history.estimate(history_key, num_objects)
+        self.estimated_sim_seconds.append(estimated_seconds)
+        run.limits = self.simulation_limits(history, history_key)
+
+        def on_done(results, error):
+            wall_seconds = None
+            cache_status = None
+            if error is not None:  # pragma: no cover -- execute_energyplus catches its own exceptions
+                results = [run.build_tree.build_dir, run.entry_name, False, False, str(error)]
+            else:
+                results, wall_seconds, cache_status, spans, staging_stats = results
+                self.record_spans(spans)
+                self.staging_stats.merge(staging_stats)
+            if cache_status == SimulationCache.HIT:
+                self.sim_cache_stats.hits += 1
+            elif cache_status == SimulationCache.MISS:
+                self.sim_cache_stats.misses += 1
+            if wall_seconds is not None and results[2]:
+                history.record(history_key, wall_seconds, num_objects)
+            # a cancelled run stopped part way through its tools, so it is left for a resumed run to do again
+            cancelled = len(results) > 5 and results[5] == CANCELLED
+            if self.journal and not cancelled:
+                self.journal.record_simulation(
+                    build_label, run.entry_name, bool(results[2]), self.run_end_mtime_ns(run.test_run_directory)
+                )
+            self.ep_done(results)
+            if on_complete:
+                on_complete(run.entry_name)
+        build_label = self.build_label(run.build_tree)
+        worker = simulation_worker_async if self.execution_backend == ExecutionBackend.ASYNCIO else simulation_worker
+        return Job(
+            Job.SIMULATION, worker, (run, self.sim_cache), on_done, priority=-estimated_seconds,
+            name=f'{run.entry_name} (build {build_label})'
+        )
+
+    def expected_seconds(self, build_tree: BuildTree, this_entry: TestEntry) -> float:
+        """The runtime history's estimate for a case before its run directory is prepared, going by the size of its
+        input file for a case not run before"""
+        history = self.runtime_history(build_tree)
+        num_objects = estimate_input_objects(build_tree.test_files_dir / this_entry.name_relative_to_testfiles_dir)
+        return history.estimate(RuntimeHistory.case_key(self.force_run_type, this_entry.basename), num_objects)
+
+    def build_label(self, build_tree: BuildTree) -> str:
+        return 'A' if build_tree.build_dir == self.build_tree_a.build_dir else 'B'
+
+    @staticmethod
+    def run_end_mtime_ns(run_dir: Path) -> Optional[int]:
+        """The modification time of the file that shows a run got to the end, the limit marker of a run that was
+        killed or else EnergyPlus's end file, or None if there is neither"""
+        for file_name in [LIMIT_FILE_NAME, 'eplusout.end']:
+            try:
+                return (run_dir / file_name).stat().st_mtime_ns
+            except OSError:
+                continue
+        return None
+
+    def reusable_simulation(self, build_tree: BuildTree, case_name: str) -> bool:
+        """Whether the journal has a simulation of the case in the build as done, and the run directory still has
+        the end of that same run in it, rather than one that was prepared or started again and didn't finish"""
+        if not self.journal:
+            return False
+        _, end_mtime_ns = self.journal.simulations.get((self.build_label(build_tree), case_name), (False, None))
+        if end_mtime_ns is None:
+            return False
+        return self.run_end_mtime_ns(build_tree.build_dir / self.test_output_dir / case_name) == end_mtime_ns
+
+    def diff_job(self, this_entry: TestEntry) -> Job:
+        def on_done(results, error):
+            if error is not None:  # pragma: no cover -- diff_wrapper catches its own exceptions
+                results = this_entry, f"Unexpected error processing diffs for {this_entry.basename}, Message: {error}"
+            else:
+                results, spans = results
+                self.record_spans(spans)
+            if self.journal and results[0].summary_result is not None:
+                self.journal.record_diff(*results)
+            self.diff_done(results)
+        diff_args = DiffArguments(
+            this_entry, self.build_tree_a, self.build_tree_b, self.test_output_dir, self.thresh_dict_file,
+            self.math_diff_engine
+        )
+        return Job(
+            Job.DIFF, diff_worker, (diff_args,), on_done, priority=DIFF_PRIORITY, name=f'{this_entry.basename} (diff)'
+        )
+
+    def run_cases(
+            self, scheduler: JobGraphScheduler, cases: List[tuple[BuildTree, TestEntry]],
+            on_prepared: Optional[Callable] = None, on_complete: Optional[Callable] = None
+    ):
+        """Prepares the run directory of each (build tree, entry) case and simulates it, running the scheduler until
+        every case is done along with any jobs the callbacks add.
+
+        The run directories are prepared on a few threads, longest expected simulation first, and each simulation is
+        queued as soon as its own directory is ready, so the first simulations start right away instead of once every
+        directory is prepared.  Preparation stays a bounded number of runs ahead of the simulations that have
+        finished, so preparing in the order the simulations should start in is what lets a long case listed last
+        still start early.  The callbacks of preparation are made in the scheduling thread, ``on_prepared`` with the
+        entry and its run, or None if it could not be prepared, and ``on_complete`` with the case name once its
+        simulation is done.
+        """
+        runs_ahead = BoundedSemaphore(scheduler.max_in_flight * (1 + PREPARED_RUNS_AHEAD_PER_WORKER))
+
+        def simulation_complete(case_name: str):
+            runs_ahead.release()
+            if on_complete:
+                on_complete(case_name)
+
+        def prepared(
+                this_entry: TestEntry, run: Optional[ExecutionArguments], staging_stats: StagingStats, slot_taken: bool,
+                reports: List[Callable]
+        ):
+            # back in the scheduling thread, a prepared run keeps its slot until its simulation is done
+            for report in reports:
+                report()
+            self.staging_stats.merge(staging_stats)
+            if run:
+                scheduler.add(self.simulation_job(run, simulation_complete))
+            elif slot_taken:
+                runs_ahead.release()
+            if on_prepared:
+                on_prepared(this_entry, run)
+
+        def prepare(build_tree: BuildTree, this_entry: TestEntry):
+            staging_stats = StagingStats()
+            reports = []
+            run = None
+            slot_taken = False
+            while not slot_taken and not scheduler.should_stop():
+                slot_taken = runs_ahead.acquire(timeout=0.1)
+            if slot_taken and not scheduler.should_stop():
+                try:
+                    run = self.prepare_case_run(build_tree, this_entry, staging_stats, reports)
+                except Exception as this_exception:  # one bad case should not take the rest of the suite down
+                    reports.append(partial(
+                        self.my_print, f"Could not prepare run directory for {this_entry.basename}: {this_exception}"
+                    ))
+                    reports.append(partial(
+                        self.my_case_completed,
+                        TestCaseCompleted(self.test_output_dir, this_entry.basename, False, False)
+                    ))
+            scheduler.post(lambda: prepared(this_entry, run, staging_stats, slot_taken, reports))
+
+        scheduler.hold(len(cases))
+        # sorted is stable, so cases with the same estimate stay interleaved between the builds
+        cases = sorted(cases, key=lambda case: -self.expected_seconds(*case))
+        with ThreadPoolExecutor(PREPARATION_THREADS, thread_name_prefix='prepare') as preparation:
+            for build_tree, this_entry in cases:
+                preparation.submit(prepare, build_tree, this_entry)
+            scheduler.run()
+
+    def run_build(self, build_tree: BuildTree):
+        """Prepares and simulates every entry in a single build, without diffing anything"""
+        scheduler = self.make_scheduler()
+        self.run_cases(scheduler, [(build_tree, this_entry) for this_entry in self.entries])
+        scheduler.close()
+        self.save_runtime_histories()
+
+    def run_builds_and_diffs(self):
+        """Runs the simulations of both builds and the diffs as a single job graph.
+
+        The build A and build B simulations of every case share one set of workers, and each case's diff is queued as
+        soon as both of its simulations have finished, instead of waiting on every simulation of both builds first.
+
+        Simulations the journal already has, with their outputs intact, aren't run again, and a case's journaled diff
+        is reused as long as neither of its simulations had to be.
+        """
+        scheduler = self.make_scheduler()
+        entries_by_name = {this_entry.basename: this_entry for this_entry in self.entries}
+        builds = [self.build_tree_a, self.build_tree_b]
+        reused_sims = [
+            (build_tree, this_entry) for this_entry in self.entries for build_tree in builds
+            if self.reusable_simulation(build_tree, this_entry.basename)
+        ]
+        unprepared_runs_by_case = {this_entry.basename: len(builds) for this_entry in self.entries}
+        for _, this_entry in reused_sims:
+            unprepared_runs_by_case[this_entry.basename] -= 1
+        remaining_sims_by_case = {this_entry.basename: 0 for this_entry in self.entries}
+        reused_diffs = {}
+        if self.journal:
+            reused_diffs = {
+                case_name: diff for case_name, diff in self.journal.diffs.items()
+                if unprepared_runs_by_case.get(case_name) == 0
+            }
+        sims_finished_at = []
+
+        def check_case(case_name: str):
+            # a case is diffed once both of its runs have been prepared and every one that could be has been simulated
+            if unprepared_runs_by_case[case_name] or remaining_sims_by_case[case_name]:
+                return
+            if case_name in reused_diffs:
+                self.diff_done(reused_diffs[case_name])
+            else:
+                scheduler.add(self.diff_job(entries_by_name[case_name]))
+            if not any(unprepared_runs_by_case.values()) and not any(remaining_sims_by_case.values()):
+                sims_finished_at.append(perf_counter())
+                self.my_simulations_complete()
+
+        def case_prepared(this_entry: TestEntry, run: Optional[ExecutionArguments]):
+            unprepared_runs_by_case[this_entry.basename] -= 1
+            if run:
+                remaining_sims_by_case[this_entry.basename] += 1
+            check_case(this_entry.basename)
+
+        def sim_complete(case_name: str):
+            remaining_sims_by_case[case_name] -= 1
+            check_case(case_name)
+
+        # interleave the two builds so that the first cases become diff-able as early as possible
+        cases = [
+            (build_tree, this_entry) for this_entry in self.entries for build_tree in builds
+            if (build_tree, this_entry) not in reused_sims
+        ]
+        if not self.entries:
+            self.my_simulations_complete()
+        for build_tree, this_entry in reused_sims:
+            success, _ = self.journal.simulations[(self.build_label(build_tree), this_entry.basename)]
+            self.my_case_completed(
+                TestCaseCompleted(build_tree.build_dir, this_entry.basename, success, False, "from the run journal")
+            )
+        for this_entry in self.entries:
+            if not unprepared_runs_by_case[this_entry.basename]:
+                check_case(this_entry.basename)
+        start = perf_counter()
+        self.run_cases(scheduler, cases, case_prepared, sim_complete)
+        scheduler.close()
+        self.finished_jobs.extend(scheduler.finished_jobs)
+        self.save_runtime_histories()
+        if sims_finished_at and self.estimated_sim_seconds:
+            predicted = predict_makespan(self.estimated_sim_seconds, scheduler.max_in_flight)
+            self.my_print(
+                f"Simulation makespan: predicted {predicted:.1f}s, achieved {sims_finished_at[0] - start:.1f}s "
+                f"({len(self.estimated_sim_seconds)} simulations, {scheduler.max_in_flight} workers)"
+            )
+
+    def record_spans(self, spans):
+        if not self.stage_trace:
+            return
+        try:
+            self.stage_trace.add(spans)
+        except OSError as this_exception:  # pragma: no cover
+            self.my_print('Could not write stage trace: ' + str(this_exception))
 
     def ep_done(self, results):
         self.my_case_completed(TestCaseCompleted(*results))
@@ -486,10 +923,58 @@ class SuiteRunner:
                 return True
         return False
 
+    @staticmethod
+    def files_are_identical(file_a: Path, file_b: Path) -> bool:
+        # most outputs are bit-for-bit identical between the two builds, and comparing bytes is far cheaper than parsing
+        try:
+            if os.path.samefile(file_a, file_b):
+                return True
+            if file_a.stat().st_size != file_b.stat().st_size:
+                return False
+            with file_a.open('rb') as f_a, file_b.open('rb') as f_b:
+                while True:
+                    chunk_a = f_a.read(IDENTICAL_CHECK_CHUNK_BYTES)
+                    if chunk_a != f_b.read(IDENTICAL_CHECK_CHUNK_BYTES):
+                        return False
+                    if not chunk_a:
+                        return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def identical_csv_math_diff(file_a: Path, file_b: Path):
+        """Returns the math_diff response for two byte-for-byte identical csv files without parsing either of them.
+
+        Returns None if the files differ, or if the file is one that math_diff would report a problem with instead of
+        comparing (no data, a single column, duplicate headers), so that math_diff still gets to say so.
+        """
+        if not SuiteRunner.files_are_identical(file_a, file_b):
+            return None
+        try:
+            with open(file_a) as f:
+                header = [cell.strip() for cell in next(csv.reader([f.readline()]))]
+            num_lines = 0
+            last_chunk = b''
+            with file_a.open('rb') as f:
+                for chunk in iter(lambda: f.read(IDENTICAL_CHECK_CHUNK_BYTES), b''):
+                    num_lines += chunk.count(b'\n')
+                    last_chunk = chunk
+        except (OSError, UnicodeDecodeError, csv.Error, StopIteration):
+            return None
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            num_lines += 1
+        num_records = num_lines - 1
+        fields = header[1:]
+        if num_records < 1 or not fields or len(set(fields)) != len(fields):
+            return None
+        return 'All Equal', num_records, 0, 0
+
     @staticmethod
     def diff_perf_log(file_a: Path, file_b: Path, diff_file: Path):
         # will do a pretty simple CSV text token comparison, no numeric comparison, and omit some certain patterns
         tokens_to_skip = [1, 2, 27, 28, 30, 31]
+        if SuiteRunner.files_are_identical(file_a, file_b):
+            return TextDifferences.EQUAL
         with file_a.open(encoding='utf-8') as f_txt_1:
             txt1 = f_txt_1.readlines()
         with file_b.open(encoding='utf-8') as f_txt_2:
@@ -511,11 +996,9 @@ class SuiteRunner:
         if txt1_cleaned == txt2_cleaned:
             return TextDifferences.EQUAL
         # if we aren't equal, compute the comparison and write to the output file, return that diffs occurred
-        comparison = unified_diff(txt1_cleaned, txt2_cleaned)
+        comparison = text_diff.unified_diff(txt1_cleaned, txt2_cleaned)
         with diff_file.open('w', encoding='utf-8') as out_file:
-            out_lines = list(comparison)
-            for out_line in out_lines:
-                out_file.write(out_line)
+            out_file.writelines(comparison)
         return TextDifferences.DIFFS
 
     @staticmethod
@@ -528,46 +1011,16 @@ class SuiteRunner:
 
     @staticmethod
     def diff_text_files(file_a: Path, file_b: Path, diff_file: Path):
+        if SuiteRunner.files_are_identical(file_a, file_b):
+            return TextDifferences.EQUAL
         # read the contents of the two files into a list, could read it into text first
         with file_a.open(encoding='utf-8') as f_txt_1:
             txt1 = f_txt_1.readlines()
         with file_b.open(encoding='utf-8') as f_txt_2:
             txt2 = f_txt_2.readlines()
         # remove any lines that have some specific listed strings in them
-        txt1_cleaned = []
-        skip_strings = [
-            "Program Version,EnergyPlus",
-            "Version,",
-            "EnergyPlus Completed",
-            "EnergyPlus Terminated",
-            "DElight input generated",
-            "(idf)=",
-            "(user input)=",
-            "(input file)=",
-            "(IDF Directory)=",
-            "(Current Working Directory)=",
-            "(Current Working Directory)\"=",
-            "ReadVars Run Time",
-            "EnergyPlus Program Version",
-            "PythonPlugin: Class",
-            "ExpandObjects Finished. Time:",
-            "EnergyPlus, Version",
-            "EnergyPlus Run Time=",
-            "ParametricPreprocessor Finished. Time:",
-            "ExpandObjects Finished with Error(s). Time:",
-            "Elapsed time: ",
-        ]
-        for line in txt1:
-            if any([x in line for x in skip_strings]):
-                txt1_cleaned.append('-line skipped-')
-            else:
-                txt1_cleaned.append(line)
-        txt2_cleaned = []
-        for line in txt2:
-            if any([x in line for x in skip_strings]):
-                txt2_cleaned.append('-line skipped-')
-            else:
-                txt2_cleaned.append(line)
+        txt1_cleaned = text_diff.skip_lines(txt1)
+        txt2_cleaned = text_diff.skip_lines(txt2)
         if txt1_cleaned == txt2_cleaned:
             return TextDifferences.EQUAL
 
@@ -614,15 +1067,15 @@ class SuiteRunner:
             return TextDifferences.EQUAL
 
         # if we aren't equal, compute the comparison and write to the output file, return that diffs occurred
-        comparison = unified_diff(txt1_numeric_checked, txt2_numeric_checked)
+        comparison = text_diff.unified_diff(txt1_numeric_checked, txt2_numeric_checked)
         with diff_file.open('w', encoding='utf-8') as out_file:
-            out_lines = list(comparison)
-            for out_line in out_lines:
-                out_file.write(out_line)
+            out_file.writelines(comparison)
         return TextDifferences.DIFFS
 
     @staticmethod
     def diff_glhe_files(file_a: Path, file_b: Path, diff_file: Path):
+        if SuiteRunner.files_are_identical(file_a, file_b):
+            return TextDifferences.EQUAL
         with file_a.open(encoding='utf-8') as f_txt_1:
             txt1 = f_txt_1.read()
         with file_b.open(encoding='utf-8') as f_txt_2:
@@ -728,6 +1181,8 @@ class SuiteRunner:
         num_values_checked = 0
         num_big_diffs = 0
         num_small_diffs = 0
+        if SuiteRunner.files_are_identical(file_a, file_b):
+            return resulting_diff_type, num_values_checked, num_big_diffs, num_small_diffs
         with file_a.open(encoding='utf-8') as f_txt_1:
             txt1 = f_txt_1.read()
         with file_b.open(encoding='utf-8') as f_txt_2:
@@ -816,11 +1271,28 @@ class SuiteRunner:
             out_file.write(my_json_str)
         return resulting_diff_type, num_values_checked, num_big_diffs, num_small_diffs
 
+    @staticmethod
+    def math_diff_function(engine: MathDiffEngine):
+        if engine == MathDiffEngine.STREAMING:
+            return math_diff_streaming.math_diff
+        if engine != MathDiffEngine.PYTHON:
+            try:
+                from energyplus_regressions.diffs import math_diff_numpy
+                return math_diff_numpy.math_diff
+            except ImportError:
+                if engine == MathDiffEngine.NUMPY:
+                    raise
+        return math_diff.math_diff
+
     @staticmethod
     def process_diffs_for_one_case(
             this_entry, build_tree_a: BuildTree, build_tree_b: BuildTree,
-            test_output_dir, thresh_dict_file, ci_mode=False
+            test_output_dir, thresh_dict_file, ci_mode=False, math_diff_engine=MathDiffEngine.AUTO,
+            tracer: Optional[StageTracer] = None
     ):
+        # each of the diffs is timed as a stage of the case
+        if tracer is None:
+            tracer = StageTracer(this_entry.basename)
 
         if ci_mode:  # in "ci_mode" the build directory is actually the output directory of each file
             case_result_dir_1 = build_tree_a.build_dir
@@ -846,6 +1318,13 @@ class SuiteRunner:
         end_path = case_result_dir_2 / 'eplusout.end'
         if end_path.exists():
             [status_case2, runtime_case2] = SuiteRunner.process_end_file(end_path)
+        # a simulation stopped at a limit may have left an end file behind, from EnergyPlus before ReadVarsESO hung
+        limit_path = case_result_dir_1 / LIMIT_FILE_NAME
+        if limit_path.exists():
+            [status_case1, runtime_case1] = [SuiteRunner.process_limit_file(limit_path), 0]
+        limit_path = case_result_dir_2 / LIMIT_FILE_NAME
+        if limit_path.exists():
+            [status_case2, runtime_case2] = [SuiteRunner.process_limit_file(limit_path), 0]
 
         # one quick check here for expect-fatal tests
         if this_entry.basename == 'EMSTestMathAndKill' or this_entry.basename == 'PythonPluginTestMathAndKill':
@@ -863,6 +1342,24 @@ class SuiteRunner:
         # add the initial end/err summary to the entry
         this_entry.add_summary_result(EndErrSummary(status_case1, runtime_case1, status_case2, runtime_case2))
 
+        # Stopped at a limit in either case: there is no complete set of outputs to diff
+        limit_statuses = [EndErrSummary.STATUS_TIMEOUT, EndErrSummary.STATUS_OUT_OF_MEMORY]
+        stopped = [EndErrSummary.status_to_string(x) for x in [status_case1, status_case2] if x in limit_statuses]
+        if len(stopped) == 2:
+            return (
+                this_entry,
+                "Skipping entry because it was stopped at a limit (%s) in both base and mod cases: %s" % (
+                    ', '.join(stopped), this_entry.basename
+                )
+            )
+        elif len(stopped) == 1:
+            return (
+                this_entry,
+                "Skipping an entry because it was stopped at a limit (%s) in one case: %s" % (
+                    stopped[0], this_entry.basename
+                )
+            )
+
         # Handle the results of the end file before doing anything with diffs
         # Case 1: Both end files existed, so E+ did complete
         if not any(x == EndErrSummary.STATUS_MISSING for x in [status_case1, status_case2]):
@@ -899,187 +1396,89 @@ class SuiteRunner:
 
         # Load diffing threshold dictionary
         thresh_dict = td.ThreshDict(thresh_dict_file)
+        math_diff_function = SuiteRunner.math_diff_function(math_diff_engine)
 
         # Do Math (CSV) Diffs
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.csv'):
-            this_entry.add_math_differences(MathDifferences(math_diff.math_diff(
-                thresh_dict,
-                str(case_result_dir_1 / 'eplusout.csv'),
-                str(case_result_dir_2 / 'eplusout.csv'),
-                str(out_dir / "eplusout.csv.absdiff.csv"),
-                str(out_dir / 'eplusout.csv.percdiff.csv'),
-                str(out_dir / 'eplusout.csv.diffsummary.csv'),
-                path_to_math_diff_log)), MathDifferences.ESO)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusmtr.csv'):
-            this_entry.add_math_differences(MathDifferences(math_diff.math_diff(
-                thresh_dict,
-                str(case_result_dir_1 / 'eplusmtr.csv'),
-                str(case_result_dir_2 / 'eplusmtr.csv'),
-                str(out_dir / 'eplusmtr.csv.absdiff.csv'),
-                str(out_dir / 'eplusmtr.csv.percdiff.csv'),
-                str(out_dir / 'eplusmtr.csv.diffsummary.csv'),
-                path_to_math_diff_log)), MathDifferences.MTR)
-
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'epluszsz.csv'):
-            this_entry.add_math_differences(MathDifferences(math_diff.math_diff(
-                thresh_dict,
-                str(case_result_dir_1 / 'epluszsz.csv'),
-                str(case_result_dir_2 / 'epluszsz.csv'),
-                str(out_dir / 'epluszsz.csv.absdiff.csv'),
-                str(out_dir / 'epluszsz.csv.percdiff.csv'),
-                str(out_dir / 'epluszsz.csv.diffsummary.csv'),
-                path_to_math_diff_log)), MathDifferences.ZSZ)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusssz.csv'):
-            this_entry.add_math_differences(MathDifferences(math_diff.math_diff(
-                thresh_dict,
-                str(case_result_dir_1 / 'eplusssz.csv'),
-                str(case_result_dir_2 / 'eplusssz.csv'),
-                str(out_dir / 'eplusssz.csv.absdiff.csv'),
-                str(out_dir / 'eplusssz.csv.percdiff.csv'),
-                str(out_dir / 'eplusssz.csv.diffsummary.csv'),
-                path_to_math_diff_log)), MathDifferences.SSZ)
+        for csv_name, math_diff_type in [
+            ('eplusout.csv', MathDifferences.ESO),
+            ('eplusmtr.csv', MathDifferences.MTR),
+            ('epluszsz.csv', MathDifferences.ZSZ),
+            ('eplusssz.csv', MathDifferences.SSZ),
+        ]:
+            if not SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, csv_name):
+                continue
+            with tracer.span(f'math diff {csv_name}'):
+                response = SuiteRunner.identical_csv_math_diff(
+                    case_result_dir_1 / csv_name, case_result_dir_2 / csv_name
+                )
+                if response is None:
+                    response = math_diff_function(
+                        thresh_dict,
+                        str(case_result_dir_1 / csv_name),
+                        str(case_result_dir_2 / csv_name),
+                        str(out_dir / f'{csv_name}.absdiff.csv'),
+                        str(out_dir / f'{csv_name}.percdiff.csv'),
+                        str(out_dir / f'{csv_name}.diffsummary.csv'),
+                        path_to_math_diff_log)
+            this_entry.add_math_differences(MathDifferences(response), math_diff_type)
 
         # Do sorta-math-diff JSON diff
         if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout_hourly.json'):
-            this_entry.add_math_differences(MathDifferences(SuiteRunner.diff_json_time_series(
-                case_result_dir_1 / 'eplusout_hourly.json',
-                case_result_dir_2 / 'eplusout_hourly.json',
-                out_dir / 'eplusout_hourly.diffs.json')), MathDifferences.JSON)
+            with tracer.span('json diff eplusout_hourly.json'):
+                response = SuiteRunner.diff_json_time_series(
+                    case_result_dir_1 / 'eplusout_hourly.json',
+                    case_result_dir_2 / 'eplusout_hourly.json',
+                    out_dir / 'eplusout_hourly.diffs.json')
+            this_entry.add_math_differences(MathDifferences(response), MathDifferences.JSON)
 
         # Do Tabular (HTML) Diffs
         if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplustbl.htm'):
-            this_entry.add_table_differences(TableDifferences(table_diff.table_diff(
-                thresh_dict,
-                str(case_result_dir_1 / 'eplustbl.htm'),
-                str(case_result_dir_2 / 'eplustbl.htm'),
-                str(out_dir / 'eplustbl.htm.absdiff.htm'),
-                str(out_dir / 'eplustbl.htm.percdiff.htm'),
-                str(out_dir / 'eplustbl.htm.summarydiff.htm'),
-                path_to_table_diff_log)))
+            with tracer.span('table diff eplustbl.htm'):
+                response = table_diff.table_diff(
+                    thresh_dict,
+                    str(case_result_dir_1 / 'eplustbl.htm'),
+                    str(case_result_dir_2 / 'eplustbl.htm'),
+                    str(out_dir / 'eplustbl.htm.absdiff.htm'),
+                    str(out_dir / 'eplustbl.htm.percdiff.htm'),
+                    str(out_dir / 'eplustbl.htm.summarydiff.htm'),
+                    path_to_table_diff_log)
+            this_entry.add_table_differences(TableDifferences(response))
 
         # Do Textual Diffs
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'in.idf'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'in.idf',
-                case_result_dir_2 / 'in.idf',
-                out_dir / 'in.idf.diff')), TextDifferences.IDF)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.stdout'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.stdout',
-                case_result_dir_2 / 'eplusout.stdout',
-                out_dir / 'eplusout.stdout.diff')), TextDifferences.STDOUT)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.stderr'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.stderr',
-                case_result_dir_2 / 'eplusout.stderr',
-                out_dir / 'eplusout.stderr.diff')), TextDifferences.STDERR)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.audit'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.audit',
-                case_result_dir_2 / 'eplusout.audit',
-                out_dir / 'eplusout.audit.diff')), TextDifferences.AUD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.bnd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.bnd',
-                case_result_dir_2 / 'eplusout.bnd',
-                out_dir / 'eplusout.bnd.diff')), TextDifferences.BND)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.dxf'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.dxf',
-                case_result_dir_2 / 'eplusout.dxf',
-                out_dir / 'eplusout.dxf.diff')), TextDifferences.DXF)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.eio'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.eio',
-                case_result_dir_2 / 'eplusout.eio',
-                out_dir / 'eplusout.eio.diff')), TextDifferences.EIO)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout_perflog.csv'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_perf_log(
-                case_result_dir_1 / 'eplusout_perflog.csv',
-                case_result_dir_2 / 'eplusout_perflog.csv',
-                out_dir / 'eplusout_perflog.csv.diff')), TextDifferences.PERF_LOG)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.mdd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.mdd',
-                case_result_dir_2 / 'eplusout.mdd',
-                out_dir / 'eplusout.mdd.diff')), TextDifferences.MDD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.mtd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.mtd',
-                case_result_dir_2 / 'eplusout.mtd',
-                out_dir / 'eplusout.mtd.diff')), TextDifferences.MTD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.rdd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.rdd',
-                case_result_dir_2 / 'eplusout.rdd',
-                out_dir / 'eplusout.rdd.diff')), TextDifferences.RDD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.shd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.shd',
-                case_result_dir_2 / 'eplusout.shd',
-                out_dir / 'eplusout.shd.diff')), TextDifferences.SHD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.err'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.err',
-                case_result_dir_2 / 'eplusout.err',
-                out_dir / 'eplusout.err.diff')), TextDifferences.ERR)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.delightin'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.delightin',
-                case_result_dir_2 / 'eplusout.delightin',
-                out_dir / 'eplusout.delightin.diff')), TextDifferences.DL_IN)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.delightout'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.delightout',
-                case_result_dir_2 / 'eplusout.delightout',
-                out_dir / 'eplusout.delightout.diff')), TextDifferences.DL_OUT)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'readvars.audit'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'readvars.audit',
-                case_result_dir_2 / 'readvars.audit',
-                out_dir / 'readvars.audit.diff')), TextDifferences.READ_VARS_AUDIT)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.edd'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.edd',
-                case_result_dir_2 / 'eplusout.edd',
-                out_dir / 'eplusout.edd.diff')), TextDifferences.EDD)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.wrl'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.wrl',
-                case_result_dir_2 / 'eplusout.wrl',
-                out_dir / 'eplusout.wrl.diff')), TextDifferences.WRL)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.sln'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.sln',
-                case_result_dir_2 / 'eplusout.sln',
-                out_dir / 'eplusout.sln.diff')), TextDifferences.SLN)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.sci'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.sci',
-                case_result_dir_2 / 'eplusout.sci',
-                out_dir / 'eplusout.sci.diff')), TextDifferences.SCI)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusmap.csv'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusmap.csv',
-                case_result_dir_2 / 'eplusmap.csv',
-                out_dir / 'eplusmap.csv.diff')), TextDifferences.MAP)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.dfs'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusout.dfs',
-                case_result_dir_2 / 'eplusout.dfs',
-                out_dir / 'eplusout.dfs.diff')), TextDifferences.DFS)
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusscreen.csv'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_text_files(
-                case_result_dir_1 / 'eplusscreen.csv',
-                case_result_dir_2 / 'eplusscreen.csv',
-                out_dir / 'eplusscreen.csv.diff')), TextDifferences.SCREEN)
-
-        # sorta textual diff, the GLHE json file
-        if SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, 'eplusout.glhe'):
-            this_entry.add_text_differences(TextDifferences(SuiteRunner.diff_glhe_files(
-                case_result_dir_1 / 'eplusout.glhe',
-                case_result_dir_2 / 'eplusout.glhe',
-                out_dir / 'eplusout.glhe.diff')), TextDifferences.GLHE)
+        for file_name, text_diff_function, text_diff_type in [
+            ('in.idf', SuiteRunner.diff_text_files, TextDifferences.IDF),
+            ('eplusout.stdout', SuiteRunner.diff_text_files, TextDifferences.STDOUT),
+            ('eplusout.stderr', SuiteRunner.diff_text_files, TextDifferences.STDERR),
+            ('eplusout.audit', SuiteRunner.diff_text_files, TextDifferences.AUD),
+            ('eplusout.bnd', SuiteRunner.diff_text_files, TextDifferences.BND),
+            ('eplusout.dxf', SuiteRunner.diff_text_files, TextDifferences.DXF),
+            ('eplusout.eio', SuiteRunner.diff_text_files, TextDifferences.EIO),
+            ('eplusout_perflog.csv', SuiteRunner.diff_perf_log, TextDifferences.PERF_LOG),
+            ('eplusout.mdd', SuiteRunner.diff_text_files, TextDifferences.MDD),
+            ('eplusout.mtd', SuiteRunner.diff_text_files, TextDifferences.MTD),
+            ('eplusout.rdd', SuiteRunner.diff_text_files, TextDifferences.RDD),
+            ('eplusout.shd', SuiteRunner.diff_text_files, TextDifferences.SHD),
+            ('eplusout.err', SuiteRunner.diff_text_files, TextDifferences.ERR),
+            ('eplusout.delightin', SuiteRunner.diff_text_files, TextDifferences.DL_IN),
+            ('eplusout.delightout', SuiteRunner.diff_text_files, TextDifferences.DL_OUT),
+            ('readvars.audit', SuiteRunner.diff_text_files, TextDifferences.READ_VARS_AUDIT),
+            ('eplusout.edd', SuiteRunner.diff_text_files, TextDifferences.EDD),
+            ('eplusout.wrl', SuiteRunner.diff_text_files, TextDifferences.WRL),
+            ('eplusout.sln', SuiteRunner.diff_text_files, TextDifferences.SLN),
+            ('eplusout.sci', SuiteRunner.diff_text_files, TextDifferences.SCI),
+            ('eplusmap.csv', SuiteRunner.diff_text_files, TextDifferences.MAP),
+            ('eplusout.dfs', SuiteRunner.diff_text_files, TextDifferences.DFS),
+            ('eplusscreen.csv', SuiteRunner.diff_text_files, TextDifferences.SCREEN),
+            # sorta textual diff, the GLHE json file
+            ('eplusout.glhe', SuiteRunner.diff_glhe_files, TextDifferences.GLHE),
+        ]:
+            if not SuiteRunner.both_files_exist(case_result_dir_1, case_result_dir_2, file_name):
+                continue
+            with tracer.span(f'text diff {file_name}'):
+                response = text_diff_function(
+                    case_result_dir_1 / file_name, case_result_dir_2 / file_name, out_dir / f'{file_name}.diff'
+                )
+            this_entry.add_text_differences(TextDifferences(response), text_diff_type)
 
         # return the updated entry
         return this_entry, "Processed Diffs : %s" % this_entry.basename
@@ -1121,9 +1520,19 @@ class SuiteRunner:
         # return results from this end file
         return [status, total_runtime_seconds]
 
-    # diff_logs_for_build creates diff logs between simulations in two build directories
-    def diff_logs_for_build(self, original_start_time: datetime):
-
+    @staticmethod
+    def process_limit_file(limit_path):
+        # written by execute_energyplus when it kills a simulation, saying which limit it was stopped at
+        try:
+            with limit_path.open(encoding='utf-8') as f_limit:
+                limit = json.load(f_limit)['limit']
+        except (OSError, ValueError, KeyError, TypeError):
+            return EndErrSummary.STATUS_UNKNOWN
+        if limit == OUT_OF_MEMORY:
+            return EndErrSummary.STATUS_OUT_OF_MEMORY
+        return EndErrSummary.STATUS_TIMEOUT
+
+    def create_completed_structure(self, original_start_time: datetime):
         self.completed_structure = CompletedStructure(
             self.build_tree_a.source_dir, self.build_tree_a.build_dir,
             self.build_tree_b.source_dir, self.build_tree_b.build_dir,
@@ -1131,42 +1540,15 @@ class SuiteRunner:
             self.build_tree_b.build_dir / self.test_output_dir,
             original_start_time
         )
-        diff_runs = []
-        for this_entry in self.entries:
-            diff_runs.append(
-                [
-                    this_entry,
-                    self.build_tree_a,
-                    self.build_tree_b,
-                    self.test_output_dir,
-                    self.thresh_dict_file
-                ]
-            )
 
-        if self.number_of_threads == 1 or frozen and system() in ['Windows', 'Darwin']:  # pragma: no cover
-            if self.number_of_threads > 1:
-                self.my_print("Ignoring num_threads on frozen Windows/Mac instance, just running with one thread.")
-            for run in diff_runs:
-                diff_return = self.diff_wrapper(run)
-                self.diff_done(diff_return)
-        else:  # for all other applications, run them in a multiprocessing pool
-            p = Pool(self.number_of_threads)
-            for run in diff_runs:
-                p.apply_async(self.diff_wrapper, (run,), callback=self.diff_done, error_callback=self.diff_done)
-            p.close()
-            p.join()
-
-    def diff_wrapper(self, run_args):  # pragma: no cover -- this is being skipped by coverage?
-        if self.id_like_to_stop_now:
-            return run_args[0], "Stopped by request"
-        try:
-            return_val = SuiteRunner.process_diffs_for_one_case(*run_args)
-            return return_val
-        except Exception as e:  # pragma: no cover -- I'm not trying to catch every possible case here
-            msg = f"Unexpected error processing diffs for {run_args[0].basename},"
-            msg += "could indicate an E+ crash caused corrupted files, "
-            msg += f"Message: {e}"
-            return run_args[0], msg
+    # diff_logs_for_build creates diff logs between simulations in two build directories
+    def diff_logs_for_build(self, original_start_time: datetime):
+        self.create_completed_structure(original_start_time)
+        scheduler = self.make_scheduler()
+        for this_entry in self.entries:
+            scheduler.add(self.diff_job(this_entry))
+        scheduler.run()
+        scheduler.close()
 
     def diff_done(self, results):
         this_entry, message = results
@@ -1245,16 +1627,27 @@ class SuiteRunner:
         else:  # pragma: no cover
             self.my_print("Completed runtests")
 
-    def my_cancelled(self):  # pragma: no cover
+    def my_cancelled(self, results: Optional[CompletedStructure] = None):
+        # results holds the cases diffed before the cancel, if it got that far
         if self.mute:
             return
+        if results:
+            results.extra.set_end_time()
         if self.cancel_callback:
-            self.cancel_callback()
-        else:
+            self.cancel_callback(results)
+        else:  # pragma: no cover
             self.my_print("Cancelling runtests...")
 
-    def interrupt_please(self):  # pragma: no cover
+    def interrupt_please(self):
+        """Stops the suite as soon as possible, called from any thread.  Nothing new is started, and the tools already
+        running are killed, those started from this process right away and those in worker processes as soon as they
+        see the cancel file."""
         self.id_like_to_stop_now = True
+        try:
+            self.cancel_file.touch()
+        except OSError:  # pragma: no cover -- the test output directory isn't there yet, so nothing is running
+            pass
+        kill_running_tools()
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -1274,6 +1667,61 @@ if __name__ == "__main__":  # pragma: no cover
     parser.add_argument('-f', choices=['DD', 'Annual'], help='Force a specific run type', default=None)
     parser.add_argument('-j', action="store", dest="j", type=int, default=1, help='Number of processors to use')
     parser.add_argument('-t', action='store_true', default=False, help='Use this flag to run in test mode')
+    parser.add_argument(
+        '--math-diff-engine', choices=[e.value for e in MathDiffEngine], default=MathDiffEngine.AUTO.value,
+        help='Engine used to diff the csv outputs, they give identical results but NumPy is much faster on big files '
+             'and Streaming keeps memory use down on files too big to load'
+    )
+    parser.add_argument(
+        '--staging-mode', choices=[e.value for e in StagingMode], default=StagingMode.COPY.value,
+        help='How the IDD, weather and other read-only input files are put into each run directory, Link hardlinks '
+             'them when on the same file system and symlinks them otherwise, only copying when neither works'
+    )
+    parser.add_argument(
+        '--execution-backend', choices=[e.value for e in ExecutionBackend], default=ExecutionBackend.PROCESSES.value,
+        help='How simulations are run, Asyncio runs their tools from this process instead of a worker process each, '
+             'so many more can be kept going at once, with -j workers still doing the diffs.  With Asyncio the '
+             'stage trace leaves out the CPU, I/O and memory use of stages that shared the process with another job'
+    )
+    parser.add_argument(
+        '--max-simulations', action='store', type=int, default=None,
+        help='Number of simulations the Asyncio backend keeps going at once, defaults to the -j number of processors'
+    )
+    parser.add_argument(
+        '--case-timeout', action='store', type=float, default=None,
+        help='Seconds a simulation may run, all of its tools together, before it is killed and reported as a timeout'
+    )
+    parser.add_argument(
+        '--tool-timeout', action='store', type=float, default=None,
+        help='Seconds any one tool of a simulation, EnergyPlus or ReadVarsESO for instance, may run before it is killed'
+    )
+    parser.add_argument(
+        '--timeout-history-factor', action='store', type=float, default=None,
+        help='Also kill a simulation run before once it takes this many times the median of its recent runs, '
+             'but never within %s seconds' % MIN_HISTORY_TIMEOUT_SECONDS
+    )
+    parser.add_argument(
+        '--max-memory-gb', action='store', type=float, default=None,
+        help='Resident memory any one tool of a simulation, along with the processes it starts, may use before it is '
+             'killed and reported as out of memory.  Only checked where Linux /proc reports it'
+    )
+    parser.add_argument(
+        '--resume', action='store', default=None, metavar='TEST_OUTPUT_DIR',
+        help='Carry on with an interrupted run in this test output directory, like Tests_20240101_120000, only running '
+             'the simulations and diffs its run journal does not have'
+    )
+    parser.add_argument(
+        '--dependency-rules', action='store', type=Path, default=None,
+        help='JSON file of extra rules for the datasets and auxiliary files input files need in their run directory'
+    )
+    parser.add_argument(
+        '--cache-dir', action='store', type=Path, default=None,
+        help='Directory of a simulation result cache to reuse outputs of unchanged simulations'
+    )
+    parser.add_argument(
+        '--cache-max-gb', action='store', type=float, default=DEFAULT_SIM_CACHE_SIZE / 1024 ** 3,
+        help='Maximum size of the simulation result cache, least recently used entries are removed past this'
+    )
 
     args = parser.parse_args()
 
@@ -1299,7 +1747,8 @@ if __name__ == "__main__":  # pragma: no cover
 
     # Set the expected path for the files_to_run.txt file
     if not args.idf_list_file.exists():
-        print("ERROR: Did not find files_to_run.txt at %s; run build_files_to_run first!" % args.idf_list_file)
+        print("ERROR: Did not find files_to_run.txt at %s; write it with energyplus_regressions.builds.idf_index first!"
+              % args.idf_list_file)
         sys.exit(1)
 
     # Build the list of files to run here:
@@ -1316,13 +1765,29 @@ if __name__ == "__main__":  # pragma: no cover
             if DoASingleTestRun:
                 break
 
+    max_memory_bytes = None
+    if args.max_memory_gb:
+        max_memory_bytes = int(args.max_memory_gb * 1024 ** 3)
+
     # Build the run configuration
     RunConfig = TestRunConfiguration(force_run_type=run_type,
                                      single_test_run=DoASingleTestRun,
                                      num_threads=args.j,
                                      report_freq=ReportingFreq.HOURLY,
                                      build_a=base,
-                                     build_b=mod)
+                                     build_b=mod,
+                                     sim_cache_dir=args.cache_dir,
+                                     sim_cache_max_size_bytes=int(args.cache_max_gb * 1024 ** 3),
+                                     math_diff_engine=MathDiffEngine(args.math_diff_engine),
+                                     staging_mode=StagingMode(args.staging_mode),
+                                     dependency_rules_file=args.dependency_rules,
+                                     execution_backend=ExecutionBackend(args.execution_backend),
+                                     max_concurrent_simulations=args.max_simulations,
+                                     case_timeout_seconds=args.case_timeout,
+                                     tool_timeout_seconds=args.tool_timeout,
+                                     timeout_history_factor=args.timeout_history_factor,
+                                     max_memory_bytes=max_memory_bytes,
+                                     resume_test_output_dir=args.resume)
 
     # instantiate the test suite
     Runner = SuiteRunner(RunConfig, entries)
@@ -0,0 +1,106 @@
+import heapq
+import json
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Optional
+
+# sized so that a one-off slow run (a loaded machine, a cold disk) washes out in a few runs
+MAX_SAMPLES_PER_CASE = 5
+
+# only used until the history has enough cases in it to fit a rate to the build being run
+DEFAULT_SECONDS_PER_OBJECT = 0.01
+
+# roughly what an input object takes up in an input file, comments and all
+APPROX_BYTES_PER_INPUT_OBJECT = 200
+
+
+def count_input_objects(run_dir: Path) -> int:
+    """Roughly counts the input objects in a prepared test run directory, used to estimate unfamiliar cases.
+
+    Every IDF/IMF object ends with a semicolon and every epJSON object opens a brace, which is close enough to rank
+    cases against each other without parsing anything.
+    """
+    for file_name, terminator in [('in.idf', b';'), ('in.imf', b';'), ('in.epJSON', b'{')]:
+        input_file = run_dir / file_name
+        if input_file.exists():
+            return input_file.read_bytes().count(terminator)
+    return 0
+
+
+def estimate_input_objects(input_file: Path) -> int:
+    """Guesses the input objects in an input file from its size alone, to rank cases before anything is read"""
+    try:
+        return input_file.stat().st_size // APPROX_BYTES_PER_INPUT_OBJECT
+    except OSError:
+        return 0
+
+
+def predict_makespan(estimates: List[float], num_workers: int) -> float:
+    """Simulates greedy longest-first assignment of the estimated job times onto a number of workers"""
+    loads = [0.0] * max(1, num_workers)
+    for estimate in sorted(estimates, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + estimate)
+    return max(loads)
+
+
+class RuntimeHistory:
+    """Recent simulation wall times for each case in a build directory, persisted between suite runs.
+
+    Runs are keyed on run type and case name, since an annual run of a file takes far longer than its design days.
+    """
+
+    FILE_NAME = 'regression_runtime_history.json'
+
+    def __init__(self, build_dir: Path):
+        self.history_file = build_dir / self.FILE_NAME
+        self.cases: Dict[str, dict] = {}
+        self._seconds_per_object = None
+        if self.history_file.exists():
+            try:
+                with self.history_file.open() as f:
+                    self.cases = json.load(f)['cases']
+            except (OSError, ValueError, KeyError):  # a corrupt history just means starting over
+                self.cases = {}
+
+    @staticmethod
+    def case_key(run_type: str, case_name: str) -> str:
+        return f"{run_type}:{case_name}"
+
+    def record(self, key: str, wall_seconds: float, num_objects: int) -> None:
+        case = self.cases.setdefault(key, {'seconds': [], 'objects': num_objects})
+        case['seconds'] = (case['seconds'] + [wall_seconds])[-MAX_SAMPLES_PER_CASE:]
+        case['objects'] = num_objects
+        self._seconds_per_object = None
+
+    def seconds_per_object(self) -> float:
+        if self._seconds_per_object is None:
+            self._seconds_per_object = self.fit_seconds_per_object()
+        return self._seconds_per_object
+
+    def fit_seconds_per_object(self) -> float:
+        total_seconds = 0.0
+        total_objects = 0
+        for case in self.cases.values():
+            if case['seconds'] and case['objects']:
+                total_seconds += sum(case['seconds']) / len(case['seconds'])
+                total_objects += case['objects']
+        if total_objects == 0:
+            return DEFAULT_SECONDS_PER_OBJECT
+        return total_seconds / total_objects
+
+    def estimate(self, key: str, num_objects: int) -> float:
+        case = self.cases.get(key)
+        if case and case['seconds']:
+            return sum(case['seconds']) / len(case['seconds'])
+        return num_objects * self.seconds_per_object()
+
+    def median(self, key: str) -> Optional[float]:
+        """The median of the recent wall times of a case, or None for a case not run before"""
+        case = self.cases.get(key)
+        if case and case['seconds']:
+            return median(case['seconds'])
+        return None
+
+    def save(self) -> None:
+        with self.history_file.open('w') as f:
+            json.dump({'cases': self.cases}, f, indent=1, sort_keys=True)
@@ -0,0 +1,360 @@
+import asyncio
+import atexit
+import concurrent.futures
+from contextvars import ContextVar, copy_context
+import heapq
+import inspect
+from itertools import count
+from multiprocessing import Pool
+import os
+from queue import Empty, Queue
+from threading import Lock, Thread
+import time
+from typing import Callable, List, Optional
+
+# how often a scheduler waiting on jobs checks whether it has been asked to stop
+STOP_POLL_SECONDS = 0.25
+
+# once stopped, how long the jobs already running are given to wrap up before they are abandoned
+STOP_GRACE_SECONDS = 5.0
+
+# the jobs an asyncio executor runs all share this process, so each of its slots is given a made-up thread id of its
+# own for the timeline, counting up from here, above any real pid
+ASYNCIO_SLOT_TID_BASE = 1 << 32
+
+
+class Job:
+    """A single unit of work in the suite job graph, either a simulation or a diff of one case.
+
+    ``on_done`` is called in the scheduling thread with ``(result, error)`` once the job has finished, where exactly one
+    of the two is not None.  Handlers may add new jobs to the scheduler, which is how diffs are chained onto the
+    simulations they depend on.
+
+    The scheduler stamps each job with the (epoch) times it was added, handed to the executor, started and finished in
+    the worker, and handed back to the scheduling thread, along with the pid of the worker that ran it and the thread
+    id it is shown under in the timeline, so the run can be laid out as a timeline afterwards.  The worker times are
+    left as None if the job raised.
+    """
+    __slots__ = (
+        'kind', 'func', 'args', 'on_done', 'priority', 'name',
+        'added_at', 'submitted_at', 'started_at', 'finished_at', 'completed_at', 'worker_pid', 'worker_tid'
+    )
+
+    SIMULATION = 'simulation'
+    DIFF = 'diff'
+
+    def __init__(
+            self, kind: str, func: Callable, args: tuple, on_done: Callable, priority: float = 0.0, name: str = ''
+    ):
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.priority = priority
+        self.name = name
+        self.added_at: Optional[float] = None
+        self.submitted_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.worker_pid: Optional[int] = None
+        self.worker_tid: Optional[int] = None
+
+
+def timed_call(func: Callable, args: tuple) -> tuple:
+    """Runs a job function in the worker, returning its result with the pid of the worker, which is also its thread
+    id in the timeline, and when it ran there"""
+    started_at = time.time()
+    result = func(*args)
+    return result, os.getpid(), os.getpid(), started_at, time.time()
+
+
+class SerialExecutor:
+    """Runs each job inline in the calling thread, used for single-threaded runs and frozen Windows/Mac apps"""
+
+    @staticmethod
+    def submit(job: Job, completed: Callable) -> None:
+        try:
+            result = timed_call(job.func, job.args)
+        except Exception as e:  # the job functions normally catch their own problems
+            completed(job, None, e)
+            return
+        completed(job, result, None)
+
+    def close(self) -> None:
+        pass
+
+    def cancel(self) -> None:
+        pass
+
+
+_shared_pool = None
+_shared_pool_size = 0
+
+
+def get_shared_pool(num_processes: int):
+    """Returns the long-lived worker pool, only starting new worker processes if the requested size has changed.
+
+    Reusing the pool saves spinning up a fresh set of processes for every build and every suite run, which adds up
+    when the GUI is used to run several suites back to back.
+    """
+    global _shared_pool, _shared_pool_size
+    if _shared_pool is None or _shared_pool_size != num_processes:
+        shutdown_shared_pool()
+        _shared_pool = Pool(num_processes)
+        _shared_pool_size = num_processes
+    return _shared_pool
+
+
+def shutdown_shared_pool(terminate: bool = False) -> None:
+    """Lets the workers of the shared pool finish what they are doing and exit, or with terminate, kills them now"""
+    global _shared_pool, _shared_pool_size
+    if _shared_pool is not None:
+        if terminate:
+            _shared_pool.terminate()
+        else:
+            _shared_pool.close()
+        _shared_pool.join()
+    _shared_pool = None
+    _shared_pool_size = 0
+
+
+atexit.register(shutdown_shared_pool)
+
+
+class PoolExecutor:
+    """Runs each job on a multiprocessing pool, reporting completions back through the pool's result thread.
+
+    By default the shared, long-lived pool is used and left running on close, otherwise a private pool is created
+    and torn down when the executor is closed.
+    """
+
+    def __init__(self, num_processes: int, persistent: bool = True):
+        self.persistent = persistent
+        self.pool = get_shared_pool(num_processes) if persistent else Pool(num_processes)
+
+    def submit(self, job: Job, completed: Callable) -> None:
+        self.pool.apply_async(
+            timed_call, (job.func, job.args),
+            callback=lambda result: completed(job, result, None),
+            error_callback=lambda error: completed(job, None, error)
+        )
+
+    def close(self) -> None:
+        if not self.persistent:
+            self.pool.close()
+            self.pool.join()
+
+    def cancel(self) -> None:
+        # the workers may still be busy with abandoned jobs, so rather than wait on them they are killed, and the next
+        # run starts a fresh pool
+        if self.persistent:
+            if _shared_pool is self.pool:
+                shutdown_shared_pool(terminate=True)
+        else:
+            self.pool.terminate()
+            self.pool.join()
+
+
+class AsyncioSlot:
+    """Where a job of an AsyncioExecutor is running, one of its ``max_concurrent`` slots on the loop with the thread id
+    it is shown under in the timeline, or the thread of a job it has handed to an inline fallback, whose tid is None"""
+
+    def __init__(self, executor: 'AsyncioExecutor', tid: Optional[int]):
+        self.executor = executor
+        self.tid = tid
+
+
+# set for the duration of each job an AsyncioExecutor runs in this process, so the stage tracer can tell
+current_asyncio_slot: ContextVar[Optional[AsyncioSlot]] = ContextVar('current_asyncio_slot', default=None)
+
+
+class AsyncioExecutor:
+    """Runs coroutine jobs on an event loop in a thread of this process, with at most ``max_concurrent`` of them going
+    at once, and hands any other job to the ``fallback`` executor.
+
+    A simulation is a chain of external tools, so as a coroutine it just waits on subprocesses, and hundreds of them
+    can be kept going from this one process without a worker process, or any pickling, for each.  Diffs do their work
+    in Python, so they still go to the fallback, a process pool or inline.
+
+    Every job it runs in this process is counted while it runs, so that ``alone_mark`` can tell whether any other job
+    shared the process with one, which would be counted in the process-wide resource use of its stages.
+    """
+
+    def __init__(self, max_concurrent: int, fallback=None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.fallback = fallback if fallback is not None else SerialExecutor()
+        self.loop = asyncio.new_event_loop()
+        self._free_slots: Optional[asyncio.Queue] = None
+        self._lock = Lock()
+        self.jobs_started = 0
+        self.jobs_running = 0
+        self._thread = Thread(target=self.loop.run_forever, name='asyncio-executor', daemon=True)
+        self._thread.start()
+
+    def alone_mark(self) -> Optional[int]:
+        """The number of jobs started so far if only one is running now, or None if others are running alongside it,
+        so a job that gets the same mark at the start and end of a stage had the process to itself through it"""
+        with self._lock:
+            return self.jobs_started if self.jobs_running == 1 else None
+
+    def _job_started(self, slot: AsyncioSlot) -> None:
+        current_asyncio_slot.set(slot)
+        with self._lock:
+            self.jobs_started += 1
+            self.jobs_running += 1
+
+    def _job_finished(self) -> None:
+        with self._lock:
+            self.jobs_running -= 1
+
+    def _run_inline(self, job: Job, completed: Callable) -> None:
+        self._job_started(AsyncioSlot(self, None))
+        try:
+            self.fallback.submit(job, completed)
+        finally:
+            self._job_finished()
+
+    async def _timed_call(self, func: Callable, args: tuple) -> tuple:
+        if self._free_slots is None:  # made here so it belongs to the executor's loop
+            self._free_slots = asyncio.Queue()
+            for number in range(self.max_concurrent):
+                self._free_slots.put_nowait(AsyncioSlot(self, ASYNCIO_SLOT_TID_BASE + number))
+        slot = await self._free_slots.get()
+        # set in the context of this job's own task, so only the job itself sees its slot
+        self._job_started(slot)
+        try:
+            started_at = time.time()
+            result = await func(*args)
+            return result, os.getpid(), slot.tid, started_at, time.time()
+        finally:
+            self._job_finished()
+            self._free_slots.put_nowait(slot)
+
+    def submit(self, job: Job, completed: Callable) -> None:
+        if not inspect.iscoroutinefunction(job.func):
+            if isinstance(self.fallback, SerialExecutor):
+                # run inline, it shares this process with the jobs on the loop
+                copy_context().run(self._run_inline, job, completed)
+            else:
+                self.fallback.submit(job, completed)
+            return
+
+        def done(future):
+            error = future.exception()
+            completed(job, None if error else future.result(), error)
+        asyncio.run_coroutine_threadsafe(self._timed_call(job.func, job.args), self.loop).add_done_callback(done)
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.fallback.close()
+
+    def cancel(self) -> None:
+        async def cancel_jobs():
+            jobs = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in jobs:
+                task.cancel()
+            await asyncio.gather(*jobs, return_exceptions=True)
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_jobs(), self.loop).result(timeout=STOP_GRACE_SECONDS)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):  # pragma: no cover
+            pass
+        self.fallback.cancel()
+        self.close()
+
+
+class JobGraphScheduler:
+    """Dispatches jobs to an executor, keeping at most ``max_in_flight`` of them running at once.
+
+    Jobs are only handed to the executor when a slot frees up, so the ready list stays under our control: completion
+    handlers can add dependent jobs at any time, ready jobs are dispatched in priority order (lowest first, then first
+    come, first served), and nothing new starts once ``should_stop`` returns True.  All completion handlers run in
+    the thread that called ``run``, one at a time, in the order the jobs actually finished.
+
+    Other threads that will be adding jobs while the scheduler runs, like the threads preparing run directories, take
+    a ``hold`` on it first and ``post`` their additions back, so that ``run`` keeps going until every hold is released.
+
+    Once stopped, the ready jobs are dropped, and the jobs already running get ``stop_grace_seconds`` to finish before
+    ``run`` returns without them.  Those are left in ``abandoned_jobs``, and closing the scheduler then cancels the
+    executor rather than waiting on them.
+    """
+
+    def __init__(
+            self, executor, max_in_flight: int, should_stop: Optional[Callable[[], bool]] = None,
+            stop_grace_seconds: float = STOP_GRACE_SECONDS
+    ):
+        self.executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+        self.should_stop = should_stop if should_stop else lambda: False
+        self.stop_grace_seconds = stop_grace_seconds
+        self._ready: list = []
+        self._sequence = count()
+        self._completions: Queue = Queue()
+        self._in_flight = 0
+        self._held = 0
+        self.finished_jobs: List[Job] = []
+        self._running: set = set()
+        self.dropped_jobs: List[Job] = []
+        self.abandoned_jobs: List[Job] = []
+
+    def add(self, job: Job) -> None:
+        job.added_at = time.time()
+        heapq.heappush(self._ready, (job.priority, next(self._sequence), job))
+
+    def hold(self, count: int = 1) -> None:
+        """Keeps run going until post has been called this many more times, called from the scheduling thread"""
+        self._held += count
+
+    def post(self, func: Callable[[], None]) -> None:
+        """Runs func in the scheduling thread and releases one hold, safe to call from any thread"""
+        self._completions.put((None, func, None))
+
+    def _completed(self, job: Job, result, error) -> None:
+        # may be called from the pool's result handler thread, so just hand it over to the scheduling thread
+        self._completions.put((job, result, error))
+
+    def _dispatch(self) -> None:
+        while self._ready and self._in_flight < self.max_in_flight and not self.should_stop():
+            _, _, job = heapq.heappop(self._ready)
+            self._in_flight += 1
+            self._running.add(job)
+            job.submitted_at = time.time()
+            self.executor.submit(job, self._completed)
+
+    def run(self) -> None:
+        self._dispatch()
+        stopped_at = None
+        while self._in_flight > 0 or self._held > 0:
+            if stopped_at is None and self.should_stop():
+                stopped_at = time.monotonic()
+            if stopped_at is not None:
+                self.dropped_jobs.extend(job for _, _, job in self._ready)
+                self._ready.clear()
+                if not self._held and time.monotonic() - stopped_at > self.stop_grace_seconds:
+                    self.abandoned_jobs = list(self._running)
+                    return
+            try:
+                job, result, error = self._completions.get(timeout=STOP_POLL_SECONDS)
+            except Empty:
+                continue
+            if job is None:
+                self._held -= 1
+                result()
+                self._dispatch()
+                continue
+            self._in_flight -= 1
+            self._running.discard(job)
+            job.completed_at = time.time()
+            if error is None:
+                result, job.worker_pid, job.worker_tid, job.started_at, job.finished_at = result
+            self.finished_jobs.append(job)
+            job.on_done(result, error)
+            self._dispatch()
+
+    def close(self) -> None:
+        if self.abandoned_jobs:
+            self.executor.cancel()
+        else:
+            self.executor.close()
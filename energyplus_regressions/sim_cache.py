@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+
+from energyplus_regressions.energyplus import ExecutionArguments
+from energyplus_regressions.staging import stage_file
+
+# bump this if the layout of a cache entry or the makeup of the key ever changes
+CACHE_FORMAT_VERSION = 1
+
+# the weather file is copied in from the weather directory on every run, and it is already part of the key,
+# so there is no point in filling the cache with hundreds of copies of the same few weather files
+NOT_CACHED = {'in.epw', 'Energy+.idd'}
+
+MANIFEST_NAME = 'manifest.json'
+
+# digests of files that are shared across many runs (executables, IDD, weather files) are worth remembering,
+# keyed on path, size and modification time so a rebuilt binary is picked up
+_shared_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_digest(file_path: Path) -> str:
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def shared_file_digest(file_path: Path) -> str:
+    stat = os.stat(file_path)
+    memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _shared_file_digests:
+        _shared_file_digests[memo_key] = file_digest(file_path)
+    return _shared_file_digests[memo_key]
+
+
+def snapshot_directory(directory: Path) -> Dict[str, Tuple[int, int]]:
+    """Returns the size and modification time of every top-level file in a directory, keyed by file name"""
+    snapshot = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evicted_entries = 0
+        self.evicted_bytes = 0
+        self.size_bytes = 0
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return (
+            f"Simulation cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate); "
+            f"evicted {self.evicted_entries} entries ({self.evicted_bytes / 1e6:.1f} MB); "
+            f"cache size now {self.size_bytes / 1e6:.1f} MB"
+        )
+
+
+class SimulationCache:
+    """A content-addressed, on-disk cache of simulation outputs.
+
+    Entries are keyed on a hash of the build's tools and IDD, every file prepared in the test run directory, the
+    weather file, and the run settings, so re-running an unchanged baseline build skips the simulation entirely.
+    Lookups and stores happen in the worker processes; eviction happens in the main process once a suite is done.
+    """
+
+    HIT = 'hit'
+    MISS = 'miss'
+
+    def __init__(self, cache_dir: Path, max_size_bytes: int, use_hardlinks: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.use_hardlinks = use_hardlinks
+
+    @staticmethod
+    def build_digests(e_args: ExecutionArguments) -> Dict[str, str]:
+        b = e_args.build_tree
+        tools = {
+            'energyplus': b.energyplus, 'idd': b.idd_path, 'basement': b.basement, 'basement_idd': b.basementidd,
+            'slab': b.slab, 'slab_idd': b.slabidd, 'expandobjects': b.expandobjects, 'epmacro': b.epmacro,
+            'readvars': b.readvars, 'parametric': b.parametric,
+        }
+        digests = {name: shared_file_digest(p) for name, p in tools.items() if p.is_file()}
+        # the energyplus executable is usually a thin wrapper around a shared library, so pick that up as well
+        for sibling in sorted(b.energyplus.parent.iterdir()):
+            if 'energyplus' in sibling.name.lower() and sibling.is_file() and sibling != b.energyplus:
+                digests['lib:' + sibling.name] = shared_file_digest(sibling)
+        return digests
+
+    def key_for(self, e_args: ExecutionArguments) -> str:
+        h = hashlib.sha256()
+        h.update(f"format:{CACHE_FORMAT_VERSION}\n".encode())
+        h.update(f"run_type:{e_args.run_type}\nfreq:{e_args.min_reporting_freq}\n".encode())
+        h.update(f"parametric:{bool(e_args.this_parametric_file)}\n".encode())
+        for name, digest in sorted(self.build_digests(e_args).items()):
+            h.update(f"tool:{name}:{digest}\n".encode())
+        if e_args.weather_file_name:
+            h.update(f"weather:{shared_file_digest(Path(e_args.weather_file_name))}\n".encode())
+        run_dir = e_args.test_run_directory
+        for input_file in sorted(p for p in run_dir.rglob('*') if p.is_file()):
+            relative_path = input_file.relative_to(run_dir).as_posix()
+            h.update(f"input:{relative_path}:{file_digest(input_file)}\n".encode())
+        return h.hexdigest()
+
+    def entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def restore(self, key: str, e_args: ExecutionArguments) -> bool:
+        """Places the cached outputs for this key into the test run directory, returning False on a miss"""
+        entry_dir = self.entry_dir(key)
+        manifest_path = entry_dir / MANIFEST_NAME
+        try:
+            with manifest_path.open() as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        for file_name in manifest['files']:
+            self.place(entry_dir / file_name, e_args.test_run_directory / file_name)
+        if e_args.weather_file_name:
+            stage_file(e_args.weather_file_name, e_args.test_run_directory / 'in.epw', e_args.staging_mode)
+        # the manifest modification time is what the least-recently-used eviction goes by
+        os.utime(manifest_path)
+        return True
+
+    def place(self, source: Path, target: Path) -> None:
+        if target.exists():
+            target.unlink()
+        if self.use_hardlinks:
+            try:
+                os.link(source, target)
+                return
+            except OSError:  # different file systems, or no hardlink support, just copy it
+                pass
+        shutil.copy2(source, target)
+
+    def store(self, key: str, run_dir: Path, before: Dict[str, Tuple[int, int]]) -> None:
+        """Stores every file the simulation created or modified in the test run directory"""
+        entry_dir = self.entry_dir(key)
+        if entry_dir.exists():
+            return
+        after = snapshot_directory(run_dir)
+        outputs = sorted(
+            name for name, stats in after.items() if name not in NOT_CACHED and before.get(name) != stats
+        )
+        # build the entry off to the side and rename it into place so a half-written entry is never visible
+        temp_dir = self.cache_dir / f"tmp-{uuid4().hex}"
+        temp_dir.mkdir(parents=True)
+        try:
+            size = 0
+            for file_name in outputs:
+                shutil.copy2(run_dir / file_name, temp_dir / file_name)
+                size += after[file_name][0]
+            with (temp_dir / MANIFEST_NAME).open('w') as f:
+                json.dump({'files': outputs, 'size': size}, f)
+            entry_dir.parent.mkdir(exist_ok=True)
+            os.rename(temp_dir, entry_dir)
+        except OSError:  # most likely another worker stored the same entry first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def evict(self, stats: Optional[CacheStats] = None) -> CacheStats:
+        """Removes the least recently used entries until the cache fits within the maximum size"""
+        stats = stats if stats else CacheStats()
+        entries = []
+        for manifest_path in self.cache_dir.glob(f'*/*/{MANIFEST_NAME}'):
+            try:
+                with manifest_path.open() as f:
+                    size = json.load(f)['size']
+                entries.append((manifest_path.stat().st_mtime, size, manifest_path.parent))
+            except (OSError, ValueError, KeyError):
+                continue
+        total_size = sum(e[1] for e in entries)
+        for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+            stats.evicted_entries += 1
+            stats.evicted_bytes += size
+        stats.size_bytes = total_size
+        return stats
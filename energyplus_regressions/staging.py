@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+import shutil
+from typing import Dict, Optional
+
+from energyplus_regressions.structures import StagingMode
+
+HARDLINKED = 'hardlinked'
+SYMLINKED = 'symlinked'
+COPIED = 'copied'
+
+
+class StagingStats:
+    """Counts of the files put into run directories and how each one got there.
+
+    Only read-only inputs (the IDD, weather files, datasets and auxiliary input files) are ever linked, anything that
+    is rewritten in the run directory is always copied so that the original can't be changed through the link.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, int] = {HARDLINKED: 0, SYMLINKED: 0, COPIED: 0}
+        self.bytes: Dict[str, int] = {HARDLINKED: 0, SYMLINKED: 0, COPIED: 0}
+
+    def record(self, method: str, size: int) -> None:
+        self.files[method] += 1
+        self.bytes[method] += size
+
+    def merge(self, other: 'StagingStats') -> None:
+        for method in self.files:
+            self.files[method] += other.files[method]
+            self.bytes[method] += other.bytes[method]
+
+    @property
+    def bytes_avoided(self) -> int:
+        return self.bytes[HARDLINKED] + self.bytes[SYMLINKED]
+
+    def report(self) -> str:
+        return (
+            f"Staged input files: {self.files[HARDLINKED]} hardlinked, {self.files[SYMLINKED]} symlinked, "
+            f"{self.files[COPIED]} copied ({self.bytes[COPIED] / 1e6:.1f} MB); "
+            f"avoided copying {self.bytes_avoided / 1e6:.1f} MB"
+        )
+
+
+def stage_file(
+        source: Path, destination: Path, mode: StagingMode = StagingMode.COPY, stats: Optional[StagingStats] = None
+) -> str:
+    """Puts a read-only input file in place in a run directory, returning how it got there.
+
+    Like shutil.copy, the destination can be an existing directory to stage the file into under its own name.  With
+    the link mode a hardlink is used when the source is on the same file system, a symlink otherwise, and a copy if
+    neither is possible, like on Windows without the symlink privilege.
+    """
+    source = Path(source)
+    destination = Path(destination)
+    if destination.is_dir():
+        destination = destination / source.name
+    method = COPIED
+    if mode != StagingMode.COPY:
+        if destination.exists() or destination.is_symlink():
+            destination.unlink()
+        if mode in (StagingMode.LINK, StagingMode.HARDLINK):
+            try:
+                os.link(source, destination)
+                method = HARDLINKED
+            except OSError:  # across file systems, or no hardlink support
+                pass
+        if method == COPIED and mode in (StagingMode.LINK, StagingMode.SYMLINK):
+            try:
+                os.symlink(source.resolve(), destination)
+                method = SYMLINKED
+            except OSError:  # no symlink support or permission
+                pass
+    if method == COPIED:
+        shutil.copy(source, destination)
+    if stats is not None:
+        stats.record(method, source.stat().st_size)
+    return method
+
+
+def stage_directory_files(
+        source_dir: Path, destination_dir: Path, mode: StagingMode = StagingMode.COPY,
+        stats: Optional[StagingStats] = None
+) -> None:
+    """Stages each file directly inside source_dir into destination_dir, which must already exist"""
+    for full_file_name in source_dir.iterdir():
+        if full_file_name.is_file():
+            stage_file(full_file_name, destination_dir, mode, stats)
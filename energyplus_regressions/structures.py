@@ -52,6 +52,25 @@ class ForceOutputSQLUnitConversion(Enum):
     InchPound = 'InchPound'
 
 
+class MathDiffEngine(Enum):
+    AUTO = "Auto"  # NumPy if it is installed, otherwise Python
+    PYTHON = "Python"
+    NUMPY = "NumPy"
+    STREAMING = "Streaming"  # reads the files a block of rows at a time, for outputs too big to hold in memory
+
+
+class StagingMode(Enum):
+    COPY = "Copy"
+    LINK = "Link"  # hardlink if on the same file system, otherwise symlink, otherwise copy
+    HARDLINK = "Hardlink"  # hardlink, otherwise copy
+    SYMLINK = "Symlink"  # symlink, otherwise copy
+
+
+class ExecutionBackend(Enum):
+    PROCESSES = "Processes"  # each simulation occupies a worker process while its tools run
+    ASYNCIO = "Asyncio"  # simulations wait on their tools from an event loop in the suite process, diffs use workers
+
+
 class ConfigType(Enum):
     RELEASE = "Release"
     DEBUG = "Debug"
@@ -171,6 +190,9 @@ class EndErrSummary:
     STATUS_SUCCESS = 2
     STATUS_FATAL = 3
     STATUS_MISSING = 4
+    # stopped at the time or memory limit of the suite, before it could finish
+    STATUS_TIMEOUT = 5
+    STATUS_OUT_OF_MEMORY = 6
 
     def __init__(self, status_case1, runtime_seconds_case1, status_case2, runtime_seconds_case2):
         self.simulation_status_case1 = status_case1
@@ -188,6 +210,10 @@ class EndErrSummary:
             return 'fatal'
         elif status == EndErrSummary.STATUS_MISSING:
             return 'missing'
+        elif status == EndErrSummary.STATUS_TIMEOUT:
+            return 'timeout'
+        elif status == EndErrSummary.STATUS_OUT_OF_MEMORY:
+            return 'out of memory'
         else:
             raise Exception('Invalid argument passed in')
 
@@ -202,6 +228,16 @@ class EndErrSummary:
         return response
 
 
+# the attributes of a TestEntry holding each kind of differences
+MATH_DIFF_ATTRIBUTES = ['eso_diffs', 'mtr_diffs', 'zsz_diffs', 'ssz_diffs', 'json_diffs']
+TEXT_DIFF_ATTRIBUTES = [
+    'aud_diffs', 'bnd_diffs', 'dxf_diffs', 'eio_diffs', 'err_diffs', 'mdd_diffs', 'mtd_diffs', 'rdd_diffs', 'shd_diffs',
+    'dl_in_diffs', 'dl_out_diffs', 'readvars_audit_diffs', 'edd_diffs', 'wrl_diffs', 'sln_diffs', 'sci_diffs',
+    'map_diffs', 'dfs_diffs', 'screen_diffs', 'glhe_diffs', 'idf_diffs', 'stdout_diffs', 'stderr_diffs',
+    'perf_log_diffs'
+]
+
+
 class TestEntry:
     __test__ = False  # so that PyTest doesn't try to run this as a class fixture
 
@@ -312,6 +348,48 @@ class TestEntry:
     def add_table_differences(self, diffs):
         self.table_diffs = diffs
 
+    def to_record(self):
+        """Everything known about the entry as plain JSON data, unlike to_dict nothing is left out, so that
+        from_record gives back the same entry"""
+        record = {'file': self.name_relative_to_testfiles_dir, 'epw': self.epw}
+        if self.summary_result:
+            record['summary'] = [
+                self.summary_result.simulation_status_case1, self.summary_result.run_time_seconds_case1,
+                self.summary_result.simulation_status_case2, self.summary_result.run_time_seconds_case2
+            ]
+        if self.table_diffs:
+            t = self.table_diffs
+            record['table_diffs'] = [
+                t.msg, t.table_count, t.big_diff_count, t.small_diff_count, t.equal_count, t.string_diff_count,
+                t.size_err_count, t.not_in_1_count, t.not_in_2_count
+            ]
+        for attribute in MATH_DIFF_ATTRIBUTES:
+            diffs = getattr(self, attribute)
+            if diffs:
+                record[attribute] = [
+                    diffs.diff_type, diffs.num_records, diffs.count_of_big_diff, diffs.count_of_small_diff
+                ]
+        for attribute in TEXT_DIFF_ATTRIBUTES:
+            diffs = getattr(self, attribute)
+            if diffs:
+                record[attribute] = diffs.diff_type
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        this_entry = cls(record['file'], record['epw'])
+        if 'summary' in record:
+            this_entry.add_summary_result(EndErrSummary(*record['summary']))
+        if 'table_diffs' in record:
+            this_entry.add_table_differences(TableDifferences(record['table_diffs']))
+        for attribute in MATH_DIFF_ATTRIBUTES:
+            if attribute in record:
+                setattr(this_entry, attribute, MathDifferences(record[attribute]))
+        for attribute in TEXT_DIFF_ATTRIBUTES:
+            if attribute in record:
+                setattr(this_entry, attribute, TextDifferences(record[attribute]))
+        return this_entry
+
     def to_dict(self):
         response = dict()
         response['basename'] = self.basename
@@ -416,6 +494,8 @@ class CompletedStructure:
         self.failure_case_a = Results()
         self.success_case_b = Results()
         self.failure_case_b = Results()
+        self.limit_exceeded_case_a = Results()
+        self.limit_exceeded_case_b = Results()
         self.total_files_compared = Results()
         self.big_math_diffs = Results()
         self.small_math_diffs = Results()
@@ -439,6 +519,13 @@ class CompletedStructure:
             self.success_case_b.add_to_data(this_entry.basename)
         else:
             self.failure_case_b.add_to_data(this_entry.basename)
+        # the cases stopped at a limit are failures too, but also listed separately with the limit they hit
+        for status, limit_exceeded in [
+            (this_entry.summary_result.simulation_status_case1, self.limit_exceeded_case_a),
+            (this_entry.summary_result.simulation_status_case2, self.limit_exceeded_case_b),
+        ]:
+            if status in (EndErrSummary.STATUS_TIMEOUT, EndErrSummary.STATUS_OUT_OF_MEMORY):
+                limit_exceeded.add_to_data(this_entry.basename, EndErrSummary.status_to_string(status))
 
         # check the math diffs for this entry
         math_diff_hash = {
@@ -532,6 +619,12 @@ class CompletedStructure:
                 'failure_case_a': [x for x in self.failure_case_a.descriptions.keys()],
                 'success_case_b': [x for x in self.success_case_b.descriptions.keys()],
                 'failure_case_b': [x for x in self.failure_case_b.descriptions.keys()],
+                'limit_exceeded_case_a': [
+                    y for x in self.limit_exceeded_case_a.descriptions.values() for y in x
+                ],
+                'limit_exceeded_case_b': [
+                    y for x in self.limit_exceeded_case_b.descriptions.values() for y in x
+                ],
                 'all_files_compared': [
                     [y for y in self.total_files_compared.descriptions[x]] for x in
                     self.total_files_compared.descriptions.keys()
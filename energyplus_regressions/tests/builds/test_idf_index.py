@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.builds.idf_index import IdfIndex
+
+
+class TestIdfIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.idf_dir = Path(tempfile.mkdtemp())
+        (self.idf_dir / 'file1.idf').write_text('hi')
+        (self.idf_dir / 'file2.iQQ').write_text('he')
+        (self.idf_dir / 'HVAC3ZoneGeometry.imf').write_text('ha')
+        (self.idf_dir / 'API').mkdir()
+        (self.idf_dir / 'API' / 'API_TestFile.idf').write_text('ha')
+        (self.idf_dir / 'sub' / 'deeper').mkdir(parents=True)
+        (self.idf_dir / 'sub' / 'file3.epJSON').write_text('{}')
+        (self.idf_dir / 'sub' / 'deeper' / 'file4.imf').write_text('ha')
+        self.age_directories()
+
+    def age_directories(self):
+        # directories changed in the last moments are always listed again, so make these look older
+        for directory in [self.idf_dir, self.idf_dir / 'sub', self.idf_dir / 'sub' / 'deeper']:
+            os.utime(directory, (1_000_000_000, 1_000_000_000))
+
+    def test_lists_input_files(self):
+        expected = {Path('file1.idf'), Path('sub') / 'file3.epJSON', Path('sub') / 'deeper' / 'file4.imf'}
+        self.assertSetEqual(expected, IdfIndex().idfs_in_dir(self.idf_dir))
+        self.assertSetEqual(set(), IdfIndex().idfs_in_dir(self.idf_dir / 'not_there'))
+
+    def test_only_changed_directories_are_listed_again(self):
+        index = IdfIndex()
+        self.assertEqual(3, len(index.idfs_in_dir(self.idf_dir)))
+        self.assertEqual(3, index.directories_listed)
+        index.idfs_in_dir(self.idf_dir)
+        self.assertEqual(3, index.directories_listed)
+        (self.idf_dir / 'sub' / 'deeper' / 'file5.idf').write_text('new')
+        (self.idf_dir / 'sub' / 'file3.epJSON').unlink()
+        idfs = index.idfs_in_dir(self.idf_dir)
+        self.assertIn(Path('sub') / 'deeper' / 'file5.idf', idfs)
+        self.assertNotIn(Path('sub') / 'file3.epJSON', idfs)
+        self.assertEqual(5, index.directories_listed)
+
+    def test_index_file_is_reused(self):
+        index_file = Path(tempfile.mkdtemp()) / 'index.json'
+        first = IdfIndex(index_file)
+        idfs = first.idfs_in_dir(self.idf_dir)
+        self.assertTrue(index_file.exists())
+        second = IdfIndex(index_file)
+        self.assertSetEqual(idfs, second.idfs_in_dir(self.idf_dir))
+        self.assertEqual(0, second.directories_listed)
+        index_file.write_text('not json')
+        self.assertSetEqual(idfs, IdfIndex(index_file).idfs_in_dir(self.idf_dir))
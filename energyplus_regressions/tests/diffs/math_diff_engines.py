@@ -0,0 +1,88 @@
+"""
+What the tests of the other math_diff engines share, checking each gives the same results and output files as the
+reference engine, math_diff.math_diff.
+"""
+
+import os
+from pathlib import Path
+import tempfile
+
+from energyplus_regressions.diffs import math_diff
+from energyplus_regressions.diffs.thresh_dict import ThreshDict
+
+CSV_RESOURCES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'csv_resources')
+
+# zeros of every spelling, non-numeric cells, blanks, nan, inf, sums that overflow and rows cut short or run long
+EDGE_CASE_CSV_1 = (
+    "Date/Time,A [W](Hourly),B [C](Hourly),C [W](Hourly),D [W](Hourly),E [W](Hourly)\n"
+    " 01/01  01:00:00,0,1.0,,nan,1e308\n"
+    " 01/01  02:00:00,0.0,1,2,1,-1e308\n"
+    " 01/01  03:00:00,-0.0,abc,  ,inf,5\n"
+    " 01/01  04:00:00,3,2.5,4,2,5\n"
+    " 01/01  05:00:00,3,2.5\n"
+)
+EDGE_CASE_CSV_2 = (
+    "Date/Time,A [W](Hourly),B [C](Hourly),C [W](Hourly),D [W](Hourly),E [W](Hourly)\n"
+    " 01/01  01:00:00,0,1,,nan,-1e308\n"
+    " 01/01  02:00:00,2,1,,1,1e308\n"
+    " 01/01  03:00:00,1,abd,3,inf,5\n"
+    " 01/01  04:00:00,3,9999,4,7,6\n"
+    " 01/01  05:00:00,3,2.5,1,2,3,4\n"
+)
+
+
+class MathDiffEngineComparison:
+    """Mixed into a TestCase, whose engines() gives the engines to hold up against the reference engine"""
+
+    def setUp(self):
+        self.thresh_dict = ThreshDict(os.path.join(CSV_RESOURCES_DIR, 'test_math_diff.config'))
+
+    def engines(self):
+        raise NotImplementedError()
+
+    def run_engine(self, engine, file_1, file_2):
+        output_dir = Path(tempfile.mkdtemp())
+        try:
+            response = engine(
+                self.thresh_dict, file_1, file_2,
+                str(output_dir / 'abs_diff.csv'),
+                str(output_dir / 'rel_diff.csv'),
+                str(output_dir / 'math_diff.log'),
+                str(output_dir / 'summary.csv'),
+            )
+        except Exception as e:
+            response = type(e)
+        outputs = {p.name: p.read_bytes() for p in output_dir.iterdir()}
+        return response, outputs
+
+    def assert_engines_match(self, file_1, file_2):
+        expected = self.run_engine(math_diff.math_diff, file_1, file_2)
+        for engine in self.engines():
+            actual = self.run_engine(engine, file_1, file_2)
+            self.assertEqual(expected[0], actual[0])
+            self.assertEqual(expected[1], actual[1])
+
+    def test_matches_reference_for_all_resource_pairs(self):
+        csv_files = sorted(f for f in os.listdir(CSV_RESOURCES_DIR) if f.endswith('.csv'))
+        for name_1 in csv_files:
+            for name_2 in csv_files:
+                with self.subTest(file_1=name_1, file_2=name_2):
+                    self.assert_engines_match(
+                        os.path.join(CSV_RESOURCES_DIR, name_1), os.path.join(CSV_RESOURCES_DIR, name_2)
+                    )
+
+    def test_matches_reference_for_edge_case_cells(self):
+        temp_dir = Path(tempfile.mkdtemp())
+        file_1 = temp_dir / 'eplusout_1.csv'
+        file_2 = temp_dir / 'eplusout_2.csv'
+        file_1.write_text(EDGE_CASE_CSV_1)
+        file_2.write_text(EDGE_CASE_CSV_2)
+        self.assert_engines_match(str(file_1), str(file_2))
+        self.assert_engines_match(str(file_2), str(file_1))
+        # and again without the non-numeric cells, which stop both engines when summarizing
+        for f in [file_1, file_2]:
+            f.write_text(f.read_text().replace('abc', '7').replace('abd', '7.0'))
+        self.assert_engines_match(str(file_1), str(file_2))
+        self.assert_engines_match(str(file_2), str(file_1))
+        for engine in self.engines():
+            self.assertEqual('Big Diffs', self.run_engine(engine, str(file_1), str(file_2))[0][0])
@@ -0,0 +1,19 @@
+import unittest
+from unittest import skipIf
+
+try:
+    import numpy  # noqa: F401
+    from energyplus_regressions.diffs import math_diff_numpy
+    numpy_missing = False
+except ImportError:  # pragma: no cover -- numpy is optional
+    math_diff_numpy = None
+    numpy_missing = True
+
+from energyplus_regressions.tests.diffs.math_diff_engines import MathDiffEngineComparison
+
+
+@skipIf(numpy_missing, "NumPy is not installed")
+class TestMathDiffNumPy(MathDiffEngineComparison, unittest.TestCase):
+
+    def engines(self):
+        return [math_diff_numpy.math_diff]
@@ -0,0 +1,40 @@
+from functools import partial
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.diffs import math_diff_streaming
+from energyplus_regressions.tests.diffs.math_diff_engines import MathDiffEngineComparison
+
+
+class TestMathDiffStreaming(MathDiffEngineComparison, unittest.TestCase):
+
+    def engines(self):
+        # a block of a single row and blocks that don't divide the files evenly as well as the default
+        return [
+            partial(math_diff_streaming.math_diff, block_rows=block_rows)
+            for block_rows in [1, 3, math_diff_streaming.DEFAULT_BLOCK_ROWS]
+        ]
+
+    def test_time_series_that_differ_late_or_in_length(self):
+        temp_dir = Path(tempfile.mkdtemp())
+        file_1 = temp_dir / 'eplusout_1.csv'
+        file_2 = temp_dir / 'eplusout_2.csv'
+        rows = ["Date/Time,A [W](Hourly)"] + [" 01/01  %02d:00:00,%s" % (h, h) for h in range(24)]
+        file_1.write_text('\n'.join(rows) + '\n')
+        file_2.write_text('\n'.join(rows[:-1] + [" 01/02  00:00:00,23"]) + '\n')
+        self.assert_engines_match(str(file_1), str(file_2))
+        file_2.write_text('\n'.join(rows[:-1]) + '\n')
+        self.assert_engines_match(str(file_1), str(file_2))
+        self.assert_engines_match(str(file_2), str(file_1))
+
+    def test_sum_carried_across_blocks(self):
+        # a column whose compensated sum, from Python 3.12, depends on the compensation being kept between blocks
+        temp_dir = Path(tempfile.mkdtemp())
+        file_1 = temp_dir / 'eplusout_1.csv'
+        file_2 = temp_dir / 'eplusout_2.csv'
+        values = ['0.1', '1e16', '0.3', '-1e16', '', '4.3976', '0.7'] * 20
+        rows = ["Date/Time,A [W](Hourly)"] + [" 01/01  %02d:00:00,%s" % (i % 24, v) for i, v in enumerate(values)]
+        file_1.write_text('\n'.join(rows) + '\n')
+        file_2.write_text('\n'.join(rows[:-1] + [rows[-1] + '1']) + '\n')
+        self.assert_engines_match(str(file_1), str(file_2))
@@ -2,7 +2,10 @@ import os
 import tempfile
 import unittest
 
-from energyplus_regressions.diffs.table_diff import table_diff
+from bs4 import BeautifulSoup
+
+from energyplus_regressions.diffs.table_diff import table2hdict_horder, table_diff
+from energyplus_regressions.diffs.table_parser import ParsedTable
 from energyplus_regressions.diffs.thresh_dict import ThreshDict
 
 
@@ -557,6 +560,59 @@ class TestTableDiff(unittest.TestCase):
         self.assertEqual(0, response[7])  # in file 2 but not in file 1
         self.assertEqual(0, response[8])  # in file 1 but not in file 2
 
+    def test_written_output_files(self):
+        abs_diff_file = os.path.join(self.temp_output_dir, 'abs_diff.htm')
+        rel_diff_file = os.path.join(self.temp_output_dir, 'rel_diff.htm')
+        err_file = os.path.join(self.temp_output_dir, 'math_diff.log')
+        table_diff(
+            self.thresh_dict,
+            os.path.join(self.diff_files_dir, 'eplustbl_has_big_numeric_diff_and_string_diff_base.htm'),
+            os.path.join(self.diff_files_dir, 'eplustbl_has_big_numeric_diff_and_string_diff_mod.htm'),
+            abs_diff_file, rel_diff_file, err_file, None
+        )
+        self.assertEqual(['abs_diff.htm', 'math_diff.log', 'rel_diff.htm'], sorted(os.listdir(self.temp_output_dir)))
+        for output_file in [abs_diff_file, rel_diff_file, err_file]:
+            with open(output_file, encoding='utf-8') as f:
+                txt = f.read()
+            # laid out just as the soup would lay it out
+            self.assertEqual(BeautifulSoup(txt, features='html.parser').prettify(), txt)
+        with open(abs_diff_file, encoding='utf-8') as f:
+            abs_soup = BeautifulSoup(f.read(), features='html.parser')
+        self.assertIsNotNone(abs_soup.find('a', attrs={'name': 'tablehead1'}))
+        self.assertTrue(abs_soup('td', class_='big'))
+        self.assertTrue(abs_soup('td', class_='stringdiff'))
+        with open(err_file, encoding='utf-8') as f:
+            err_soup = BeautifulSoup(f.read(), features='html.parser')
+        self.assertIsNotNone(err_soup.find('a', href='abs_diff.htm#tablehead1'))
+        self.assertIsNotNone(err_soup.find('a', href='rel_diff.htm#tablehead1'))
+
+        # with no differences only the summary is written
+        for output_file in [abs_diff_file, rel_diff_file, err_file]:
+            os.remove(output_file)
+        table_diff(
+            self.thresh_dict,
+            os.path.join(self.diff_files_dir, 'eplustbl.htm'),
+            os.path.join(self.diff_files_dir, 'eplustbl.htm'),
+            abs_diff_file, rel_diff_file, err_file, None
+        )
+        self.assertEqual(['math_diff.log'], os.listdir(self.temp_output_dir))
+
+    def test_reordered_rows_with_repeated_keys(self):
+        header = [None, 'A', 'B']
+        rows_a = [['Heating', 'General', '1'], [None, None, None], [None, 'Boiler', '2'], [None, None, None]]
+        rows_b = [[None, 'Boiler', '2'], [None, None, None], [None, None, None], ['Heating', 'General', '1']]
+        table_a = ParsedTable('FullName:A', [header] + rows_a, 15)
+        table_b = ParsedTable('FullName:A', [header] + rows_b, 15)
+        hdict, horder = table2hdict_horder(table_b, table_a)
+        self.assertEqual(['DummyPlaceholder', 'A', 'B'], horder)
+        self.assertEqual(['Heating', '', '', ''], hdict['DummyPlaceholder'])
+        self.assertEqual(['General', '', 'Boiler', ''], hdict['A'])
+        self.assertEqual(['1', '', '2', ''], hdict['B'])
+        # rows that aren't just a reordering are left in place
+        table_b.rows[1] = [None, 'Boiler', '3']
+        hdict, _ = table2hdict_horder(table_b, table_a)
+        self.assertEqual(['3', '', '', '1'], hdict['B'])
+
     # it seems like this is something that table_diff just cannot handle.  The duplicate empty column heading is causing
     # major problems.  I'm going to skip this test for now, but leave the two table diff resource files in place
     # so that we could try to investigate later if we ever wanted.
@@ -0,0 +1,52 @@
+import os
+import unittest
+
+from energyplus_regressions.diffs.table_diff import soup_tables
+from energyplus_regressions.diffs.table_parser import UnsupportedTableMarkup, fast_tables
+
+
+def table_parts(tables):
+    return [(table.uheading, table.rows, table.num_cells) for table in tables]
+
+
+class TestTableParser(unittest.TestCase):
+
+    def setUp(self):
+        self.cur_dir_path = os.path.dirname(os.path.realpath(__file__))
+        self.diff_files_dir = os.path.join(self.cur_dir_path, 'tbl_resources')
+
+    def test_matches_soup_for_all_resource_files(self):
+        html_files = sorted(f for f in os.listdir(self.diff_files_dir) if f.endswith('.htm'))
+        for name in html_files:
+            with self.subTest(file=name):
+                with open(os.path.join(self.diff_files_dir, name), 'rb') as f_1:
+                    txt = f_1.read().decode('utf-8', errors='ignore')
+                try:
+                    tables = fast_tables(txt)
+                except UnsupportedTableMarkup:
+                    continue
+                self.assertEqual(table_parts(soup_tables(txt)), table_parts(tables))
+
+    def test_matches_soup_for_cells_with_markup_after_the_text(self):
+        txt = (
+            "<p>Report:<b>Annual</b></p>\n<!-- FullName:Annual_Entire Facility_Site-->\n"
+            "<table border=\"1\">\n<tr><td></td><td>Value &amp; &#176;C</td></tr>\n"
+            "<tr><td> Row <!-- x --></td><td align=\"right\">Enforce Mass Balance<br><br></td></tr>\n"
+            "<tr><td>   </td><td>A <b>bold</b> cell</td></tr>\n"
+            "</table>\n"
+        )
+        self.assertEqual(table_parts(soup_tables(txt)), table_parts(fast_tables(txt)))
+
+    def test_unsupported_markup(self):
+        for txt in [
+            "<p>Named by a paragraph</p><table><tr><td>1</td></tr></table>",
+            "<!-- A--><table><tr><td><b>1</b></td></tr></table>",
+            "<!-- A--><table><tr><td>1<table></table></td></tr></table>",
+            "<!-- A--><table><tr><th>1</th></tr></table>",
+            "<!-- A--><table><tbody><tr><td>1</td></tr></tbody></table>",
+            "<!-- A--><table><tr><td>1</tr></table>",
+            "<!-- A--><table><tr><td>1</td></tr>",
+        ]:
+            with self.subTest(txt=txt):
+                with self.assertRaises(UnsupportedTableMarkup):
+                    fast_tables(txt)
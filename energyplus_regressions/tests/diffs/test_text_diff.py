@@ -0,0 +1,56 @@
+import difflib
+import random
+import unittest
+
+from energyplus_regressions.diffs.text_diff import SKIPPED_LINE, diff_opcodes, skip_lines, unified_diff
+
+
+def longest_common_subsequence(a, b):
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            lengths[i + 1][j + 1] = lengths[i][j] + 1 if x == y else max(lengths[i][j + 1], lengths[i + 1][j])
+    return lengths[-1][-1]
+
+
+class TestTextDiff(unittest.TestCase):
+
+    def test_skip_lines(self):
+        lines = ['Program Version,EnergyPlus, Version 24.1\n', ' Zone Information, ZONE 1\n', 'Elapsed time: 00:01\n']
+        self.assertEqual([SKIPPED_LINE, ' Zone Information, ZONE 1\n', SKIPPED_LINE], skip_lines(lines))
+
+    def test_opcodes_are_a_shortest_edit_script(self):
+        rand = random.Random(0)
+        for _ in range(500):
+            a = [rand.choice('abc') + '\n' for _ in range(rand.randint(0, 12))]
+            b = [rand.choice('abc') + '\n' for _ in range(rand.randint(0, 12))]
+            with self.subTest(a=a, b=b):
+                opcodes = diff_opcodes(a, b)
+                rebuilt = []
+                i = j = 0
+                for tag, i1, i2, j1, j2 in opcodes:
+                    self.assertEqual((i, j), (i1, j1))
+                    if tag == 'equal':
+                        self.assertEqual(a[i1:i2], b[j1:j2])
+                    rebuilt.extend(b[j1:j2])
+                    i, j = i2, j2
+                self.assertEqual((len(a), len(b)), (i, j))
+                self.assertEqual(b, rebuilt)
+                matched = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == 'equal')
+                self.assertEqual(longest_common_subsequence(a, b), matched)
+
+    def test_unified_diff_format(self):
+        a = ['%s\n' % i for i in range(20)]
+        b = a[:5] + ['x\n'] + a[6:15] + a[16:] + ['new\n']
+        self.assertEqual(list(difflib.unified_diff(a, b)), list(unified_diff(a, b)))
+        self.assertEqual([], list(unified_diff(a, a)))
+
+    def test_summarized_when_over_budget(self):
+        a = ['%s\n' % i for i in range(20)]
+        b = ['%s\n' % (i * 2) for i in range(20)]
+        diff = list(unified_diff(a, b, max_edits=2))
+        self.assertIn('summarized', diff[2])
+        self.assertIn('19 of the first 20 lines differ in place', diff[3])
+        self.assertEqual(['@@ -2 +2 @@\n', '-1\n', '+2\n'], diff[4:7])
+        diff = list(unified_diff(a, b, max_seconds=-1))
+        self.assertIn('time budget', diff[2])
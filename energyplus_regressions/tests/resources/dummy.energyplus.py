@@ -16,12 +16,16 @@ So we are going to replicate just a few of the core functions of E+ in this bina
     "eso_results": "base" / "smalldiffs" / "bigdiffs",
     "txt_results": "base" / "diffs" / "small_numeric_text",
     "extra_data": "<freeform>" -- this is something like a flag for auxiliary tools to pick up
+    "sleep_seconds": 0.5 -- how long the "simulation" takes, for benchmarking the suite runner
+    "output_rows": 8760 -- rows of time series output to write, for benchmarking with bigger outputs
+    "readvars_sleep_seconds": 0.5 -- how long ReadVarsESO takes over the output, once the "simulation" has ended
   }
 }
 """
 
 import json
 import sys
+import time
 
 file_name = 'in.idf'
 if os.path.exists('in.epJSON'):
@@ -34,9 +38,18 @@ with open(file_name) as f_idf:
     except:
         sys.exit(0)
 
+if 'sleep_seconds' in config:
+    time.sleep(config['sleep_seconds'])
+output_rows = config['output_rows'] if 'output_rows' in config else 0
+
 if 'eso_results' in config:
     with open('eplusout.eso', 'w') as f_eso:
-        f_eso.write(json.dumps({'output': config['eso_results']}))
+        eso_object = {'output': config['eso_results']}
+        if output_rows:
+            eso_object['rows'] = output_rows
+        if 'readvars_sleep_seconds' in config:
+            eso_object['sleep_seconds'] = config['readvars_sleep_seconds']
+        f_eso.write(json.dumps(eso_object))
 
 if 'txt_results' in config:
     f_audit = open('eplusout.audit', 'w')
@@ -86,6 +99,8 @@ if 'txt_results' in config:
         f_err.write('Line 1\nLine 3')
         f_delightin.write('Line 1\nLine 3')
         f_delightout.write('Line 1\nLine 3')
+    for i in range(output_rows):
+        f_eio.write('\n Zone Information, ZONE %s,0.00,%s' % (i, i * 0.5))
     f_audit.close()
     f_bnd.close()
     f_dxf.close()
@@ -207,6 +222,10 @@ object_to_write = {
         }
     ]
 }
+for i in range(1, output_rows):
+    object_to_write['Rows'].append({'%02d/%02d %02d:00:00' % (i // 24 // 28 % 12 + 1, i // 24 % 28 + 1, i % 24 + 1): [
+        0.0, float(i)
+    ]})
 with open('eplusout_hourly.json', 'w') as f_json:
     f_json.write(json.dumps(object_to_write))
 
@@ -6,22 +6,33 @@ So we are going to ReadVarsESO in a silly way
 2) We expect this file to be JSON, and have one key: output
    The value of this key should be "base", "smalldiffs", or "bigdiffs"
    Based on this key, the value will write slightly different csv files
+   An optional rows key pads the csv files out to that many rows of (identical) data, and an optional sleep_seconds
+   key is how long it takes before writing them
 {
-  "output": "base" / "smalldiffs" / "bigdiffs"
+  "output": "base" / "smalldiffs" / "bigdiffs",
+  "rows": 8760,
+  "sleep_seconds": 0.5
   }
 }
 """
 
 import json
 import sys
+import time
 
 with open('eplusout.eso') as f_idf:
     idf_body = f_idf.read()
     # noinspection PyBroadException
     try:
-        output_mode = json.loads(idf_body)['output']
+        eso_object = json.loads(idf_body)
+        output_mode = eso_object['output']
     except:
         sys.exit(0)
+time.sleep(eso_object.get('sleep_seconds', 0))
+extra_rows = ''.join(
+    '\n %02d/%02d  %02d:00:00,20.5,40000.0,%s.0' % (i // 24 // 28 % 12 + 1, i // 24 % 28 + 1, i % 24 + 1, i)
+    for i in range(4, eso_object.get('rows', 0))
+)
 
 base_output = """Date/Time,Variable 1 [C](Hourly),Variable 2 [W](Hourly),Variable 3 [W](Hourly)
  01/21  01:00:00,20.5,40000.0,1.0
@@ -45,18 +56,21 @@ f_zsz = open('epluszsz.csv', 'w')
 f_ssz = open('eplusssz.csv', 'w')
 if output_mode == 'base':
     written = True
+    base_output += extra_rows
     f_csv.write(base_output)
     f_mtr.write(base_output)
     f_zsz.write(base_output)
     f_ssz.write(base_output)
 elif output_mode == 'smalldiffs':
     written = True
+    small_output += extra_rows
     f_csv.write(small_output)
     f_mtr.write(small_output)
     f_zsz.write(small_output)
     f_ssz.write(small_output)
 elif output_mode == 'bigdiffs':
     written = True
+    big_output += extra_rows
     f_csv.write(big_output)
     f_mtr.write(big_output)
     f_zsz.write(big_output)
@@ -0,0 +1,90 @@
+import json
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.builds.base import BuildTree
+from energyplus_regressions.dependency_rules import (
+    COMPILED_MATCH_MIN_TRIGGERS, PARAMETRIC, DependencyRuleError, DependencyRules
+)
+
+
+class TestDependencyRules(unittest.TestCase):
+
+    def setUp(self):
+        self.build_tree = BuildTree()
+        source_dir = Path(tempfile.mkdtemp())
+        self.build_tree.data_sets_dir = source_dir / 'datasets'
+        self.build_tree.test_files_dir = source_dir / 'testfiles'
+        (self.build_tree.data_sets_dir / 'TDV').mkdir(parents=True)
+        (self.build_tree.data_sets_dir / 'TDV' / 'TDV_2008_kBtu_CTZ06.csv').write_text('TDV')
+        (self.build_tree.data_sets_dir / 'Window5DataFile.dat').write_text('W5')
+        self.build_tree.test_files_dir.mkdir()
+        (self.build_tree.test_files_dir / 'LookupTable.csv').write_text('LT')
+        self.run_dir = Path(tempfile.mkdtemp())
+
+    def test_default_rules(self):
+        text = (
+            'Construction:WindowDataFile, ..\\datasets\\Window5DataFile.dat;\n'
+            'Schedule:File, ..\\datasets\\TDV\\TDV_2008_kBtu_CTZ06.csv, DataSets\\TDV;\n'
+            'Table:IndependentVariable, LookupTable.csv;\n'
+            'Output:VariableDictionary, report variable dictionary;\n'
+            'Parametric:SetValueForRun;\n'
+        )
+        dependencies = DependencyRules().dependencies(text, 'my_file')
+        self.assertEqual(['Window5', 'TDV', 'LookupTable.csv', 'ReportVariableDictionary', 'Parametric'],
+                         dependencies.names)
+        self.assertEqual({PARAMETRIC}, dependencies.flags)
+        rewritten = dependencies.rewrite(text)
+        self.assertIn('datasets/Window5DataFile.dat;', rewritten)
+        self.assertIn(os.sep.join(['datasets', 'TDV', 'TDV_2008_kBtu_CTZ06.csv']), rewritten)
+        self.assertNotIn('report variable dictionary', rewritten)
+        # both need the datasets directory, which used to fail on the second one
+        dependencies.stage(self.build_tree, self.run_dir)
+        self.assertTrue((self.run_dir / 'datasets' / 'Window5DataFile.dat').exists())
+        self.assertTrue((self.run_dir / 'datasets' / 'TDV' / 'TDV_2008_kBtu_CTZ06.csv').exists())
+        self.assertTrue((self.run_dir / 'LookupTable.csv').exists())
+
+    def test_matches_on_case_name_and_overlapping_triggers(self):
+        rules = DependencyRules([
+            {'name': 'long', 'match': ['Schedule:FileShading']},
+            {'name': 'short', 'match': ['Schedule:File']},
+            {'name': 'overlap', 'match': ['FileShading:Extra']},
+            {'name': 'by name', 'match_name': ['HybridModel']},
+        ])
+        self.assertEqual(['long', 'short', 'overlap'],
+                         rules.dependencies('Schedule:FileShading:Extra,').names)
+        self.assertEqual(['short', 'by name'], rules.dependencies('Schedule:File,', 'HybridModel_1').names)
+        self.assertEqual([], rules.dependencies('nothing here').names)
+
+    def test_compiled_match_of_a_big_table(self):
+        rules = [
+            {'name': 'long', 'match': ['Schedule:FileShading']},
+            {'name': 'short', 'match': ['Schedule:File']},
+            {'name': 'overlap', 'match': ['FileShading:Extra']},
+        ] + [{'name': 'custom %s' % i, 'match': ['Custom%s.csv' % i]} for i in range(COMPILED_MATCH_MIN_TRIGGERS)]
+        compiled = DependencyRules(rules)
+        self.assertIsNotNone(compiled.pattern)
+        text = 'Schedule:FileShading:Extra, Custom7.csv, Custom17.csv'
+        self.assertEqual(['long', 'short', 'overlap', 'custom 7', 'custom 17'], compiled.dependencies(text).names)
+        self.assertEqual(compiled.triggers_in(text), DependencyRules(rules[:23]).triggers_in(text))
+
+    def test_rules_from_file(self):
+        rules_file = Path(tempfile.mkdtemp()) / 'rules.json'
+        rules_file.write_text(json.dumps({'rules': [
+            {
+                'name': 'LookupTable.csv', 'match': ['MyLookup'],
+                'stage': [{'from': 'testfiles', 'path': 'LookupTable.csv'}]
+            },
+            {'name': 'Weather', 'match': ['Site:Location'], 'rewrite': [['Site:Location', 'Site:Location ']]},
+        ]}))
+        rules = DependencyRules.from_file(rules_file)
+        self.assertEqual([], rules.dependencies('LookupTable.csv').names)
+        self.assertEqual(['LookupTable.csv', 'Weather'], rules.dependencies('MyLookup, Site:Location').names)
+        self.assertIn('Window5', [rule['name'] for rule in rules.rules])
+        rules_file.write_text(json.dumps({'rules': [{'name': 'bad', 'stage': [{'from': 'elsewhere', 'path': 'x'}]}]}))
+        with self.assertRaises(DependencyRuleError):
+            DependencyRules.from_file(rules_file)
+        with self.assertRaises(DependencyRuleError):
+            DependencyRules.from_file(rules_file.with_name('missing.json'))
@@ -1,11 +1,24 @@
+import asyncio
+import json
+import os
 from pathlib import Path
+import shutil
+import subprocess
 import sys
 import tempfile
+from threading import Timer, current_thread
+import time
 import unittest
 
+from energyplus_regressions import energyplus
 from energyplus_regressions.builds.base import BuildTree
-from energyplus_regressions.energyplus import ExecutionArguments, execute_energyplus
+from energyplus_regressions.energyplus import (
+    CANCEL_POLL_SECONDS, CANCELLED, LIMIT_FILE_NAME, LIMIT_POLL_SECONDS, OUT_OF_MEMORY, TIMED_OUT, ExecutionArguments,
+    SimulationLimits, ToolWatch, execute_energyplus, execute_energyplus_async, kill_process_group, kill_running_tools,
+    ToolInvocation, process_rss_bytes, run_tool, running_tools, tool_argv
+)
 from energyplus_regressions.structures import ReportingFreq, ForceRunType
+from energyplus_regressions.tracing import StageTracer
 
 
 class TestEnergyPlus(unittest.TestCase):
@@ -190,3 +203,260 @@ class TestEnergyPlus(unittest.TestCase):
         self.assertEqual('entry_name', return_val[1])
         self.assertFalse(return_val[2])  # Fail
         self.assertFalse(return_val[3])
+
+    def test_eplus_passed_async_without_changing_process_state(self):
+        weather_file = self.resource_dir / 'dummy.in.epw'
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base"}}')
+        working_dir = os.getcwd()
+        environment = dict(os.environ)
+        return_val = asyncio.run(execute_energyplus_async(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.ANNUAL,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name=weather_file
+        )))
+        self.assertEqual(Path('/dummy/'), return_val[0])
+        self.assertEqual('entry_name', return_val[1])
+        self.assertTrue(return_val[2])
+        self.assertFalse(return_val[3])
+        self.assertTrue((self.run_dir / 'eplusout.end').exists())
+        self.assertEqual(working_dir, os.getcwd())
+        self.assertEqual(environment, dict(os.environ))
+
+    def test_eplus_passed_with_spaces_in_tool_paths(self):
+        tools_dir = Path(tempfile.mkdtemp()) / 'E+ build' / 'Products'
+        shutil.copytree(self.resource_dir, tools_dir)
+        for attribute in ['energyplus', 'idd_path', 'expandobjects', 'readvars']:
+            setattr(self.build_tree, attribute, tools_dir / getattr(self.build_tree, attribute).name)
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base"}}')
+        tracer = StageTracer('entry_name')
+        return_val = execute_energyplus(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name=''
+        ), tracer)
+        self.assertTrue(return_val[2])
+        self.assertTrue((self.run_dir / 'eplusout.end').exists())
+        self.assertEqual(
+            [('ExpandObjects', 0), ('EnergyPlus', 0), ('ReadVarsESO eso', 0), ('ReadVarsESO mtr', 0)],
+            [(span['stage'], span['return_code']) for span in tracer.spans]
+        )
+
+    def test_script_tools_run_with_the_interpreter_where_needed(self):
+        as_before = energyplus.RUN_SCRIPTS_WITH_INTERPRETER
+        try:
+            # the way the tools are run on Windows, which has to work anywhere
+            energyplus.RUN_SCRIPTS_WITH_INTERPRETER = True
+            self.assertEqual(
+                [sys.executable, str(self.build_tree.readvars), 'in.rvi'], tool_argv(self.build_tree.readvars, 'in.rvi')
+            )
+            self.assertEqual([str(Path('bin') / 'energyplus')], tool_argv(Path('bin') / 'energyplus'))
+            with (self.run_dir / 'in.idf').open('w') as f:
+                f.write('{"config": {"end_state": "success", "eso_results": "base"}}')
+            return_val = execute_energyplus(ExecutionArguments(
+                build_tree=self.build_tree,
+                entry_name='entry_name',
+                test_run_directory=self.run_dir,
+                run_type=ForceRunType.DD,
+                min_reporting_freq=ReportingFreq.HOURLY,
+                this_parametric_file=False,
+                weather_file_name=''
+            ))
+            self.assertTrue(return_val[2])
+            self.assertTrue((self.run_dir / 'eplusout.end').exists())
+            energyplus.RUN_SCRIPTS_WITH_INTERPRETER = False
+            self.assertEqual([str(self.build_tree.readvars)], tool_argv(self.build_tree.readvars))
+        finally:
+            energyplus.RUN_SCRIPTS_WITH_INTERPRETER = as_before
+
+    def test_eplus_killed_at_tool_timeout(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 60}}')
+        tracer = StageTracer('entry_name')
+        start = time.monotonic()
+        return_val = execute_energyplus(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name='',
+            limits=SimulationLimits(tool_timeout_seconds=1)
+        ), tracer)
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertFalse(return_val[2])
+        self.assertEqual(TIMED_OUT, return_val[5])
+        self.assertFalse((self.run_dir / 'eplusout.end').exists())
+        with (self.run_dir / LIMIT_FILE_NAME).open() as f:
+            self.assertEqual({'limit': TIMED_OUT, 'stage': 'EnergyPlus'}, json.load(f))
+        self.assertEqual(TIMED_OUT, tracer.spans[-1]['limit_exceeded'])
+
+    def test_eplus_async_killed_at_case_timeout(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 60}}')
+        start = time.monotonic()
+        return_val = asyncio.run(execute_energyplus_async(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name='',
+            limits=SimulationLimits(case_timeout_seconds=1, tool_timeout_seconds=120)
+        )))
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertFalse(return_val[2])
+        self.assertEqual(TIMED_OUT, return_val[5])
+        self.assertTrue((self.run_dir / LIMIT_FILE_NAME).exists())
+
+    def test_eplus_async_keeps_file_handling_and_memory_polls_off_the_loop(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 1}}')
+        called_on = []
+
+        def recorded(function):
+            def record(*args):
+                called_on.append((function.__name__, current_thread()))
+                return function(*args)
+            return record
+
+        stage_file, process_tree_rss_bytes = energyplus.stage_file, energyplus.process_tree_rss_bytes
+        energyplus.stage_file = recorded(stage_file)
+        energyplus.process_tree_rss_bytes = recorded(process_tree_rss_bytes)
+        try:
+            return_val = asyncio.run(execute_energyplus_async(ExecutionArguments(
+                build_tree=self.build_tree,
+                entry_name='entry_name',
+                test_run_directory=self.run_dir,
+                run_type=ForceRunType.DD,
+                min_reporting_freq=ReportingFreq.HOURLY,
+                this_parametric_file=False,
+                weather_file_name=self.resource_dir / 'dummy.in.epw',
+                limits=SimulationLimits(max_memory_bytes=2 ** 40)
+            )))
+        finally:
+            energyplus.stage_file, energyplus.process_tree_rss_bytes = stage_file, process_tree_rss_bytes
+        self.assertTrue(return_val[2])
+        self.assertEqual({'stage_file', 'process_tree_rss_bytes'}, {name for name, _ in called_on})
+        self.assertNotIn(current_thread(), [thread for _, thread in called_on])
+
+    @unittest.skipUnless(os.path.exists('/proc/self/statm'), "memory is only read from /proc")
+    def test_eplus_killed_at_memory_limit(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 60}}')
+        return_val = execute_energyplus(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name='',
+            limits=SimulationLimits(max_memory_bytes=1024)
+        ))
+        self.assertFalse(return_val[2])
+        self.assertEqual(OUT_OF_MEMORY, return_val[5])
+
+    @unittest.skipUnless(os.path.exists('/proc/self/task'), "memory is only read from /proc")
+    def test_memory_of_processes_a_tool_starts_is_counted(self):
+        # a wrapper that starts the memory hungry program and waits on it, so only the wrapper is the tool's own pid
+        big_child = 'x = bytearray(256 * 2 ** 20); import time; time.sleep(60)'
+        wrapper = subprocess.Popen(
+            [sys.executable, '-c', f'import subprocess, sys; subprocess.run([sys.executable, "-c", "{big_child}"])'],
+            start_new_session=True
+        )
+        try:
+            limit = None
+            watch = ToolWatch(None, 128 * 2 ** 20, None)
+            start = time.monotonic()
+            while limit is None and time.monotonic() - start < 30:
+                time.sleep(0.1)
+                limit = watch.limit_exceeded(wrapper.pid)
+            self.assertEqual(OUT_OF_MEMORY, limit)
+            self.assertLess(process_rss_bytes(wrapper.pid), 128 * 2 ** 20)
+        finally:
+            kill_process_group(wrapper)
+            wrapper.wait()
+
+    @unittest.skipUnless(os.path.exists('/proc/self/statm'), "memory is only read from /proc")
+    def test_peak_memory_is_that_of_each_tool(self):
+        def peak_of(megabytes):
+            program = f'x = bytearray({megabytes} * 2 ** 20); import time; time.sleep(1.5)'
+            tool = ToolInvocation('memory', [sys.executable, '-c', program], dict(os.environ))
+            return run_tool(tool, self.run_dir, sample_memory=True).peak_rss_bytes
+
+        self.assertGreater(peak_of(256), 256 * 2 ** 20)
+        # not the high-water mark of every tool run so far
+        self.assertLess(peak_of(0), 128 * 2 ** 20)
+
+    def test_cancel_file_is_only_looked_for_now_and_then(self):
+        cancel_file = Path(tempfile.mkdtemp()) / 'cancel'
+        cancel_file.touch()
+        watch = ToolWatch(None, None, cancel_file)
+        self.assertGreater(watch.poll_seconds(), LIMIT_POLL_SECONDS)
+        self.assertLessEqual(watch.poll_seconds(), CANCEL_POLL_SECONDS)
+        self.assertIsNone(watch.limit_exceeded(os.getpid()))
+        watch.next_cancel_check = time.monotonic()
+        self.assertEqual(CANCELLED, watch.limit_exceeded(os.getpid()))
+        # a limit is still checked often, just not the cancel file
+        watch = ToolWatch(60, None, cancel_file)
+        self.assertLessEqual(watch.poll_seconds(), LIMIT_POLL_SECONDS)
+        self.assertIsNone(watch.limit_exceeded(os.getpid()))
+        self.assertFalse(ToolWatch(None, None, None).watching())
+
+    def test_eplus_killed_on_cancel(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 60}}')
+        cancel_file = Path(tempfile.mkdtemp()) / 'cancel'
+        # as seen from a worker process, which only has the cancel file to go on
+        Timer(0.5, cancel_file.touch).start()
+        start = time.monotonic()
+        return_val = execute_energyplus(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name='',
+            cancel_file=cancel_file
+        ))
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertFalse(return_val[2])
+        self.assertEqual(CANCELLED, return_val[5])
+        self.assertFalse((self.run_dir / LIMIT_FILE_NAME).exists())
+        self.assertEqual({}, running_tools)
+
+    def test_running_tools_are_killed_from_this_process(self):
+        with (self.run_dir / 'in.idf').open('w') as f:
+            f.write('{"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 60}}')
+        cancel_file = Path(tempfile.mkdtemp()) / 'cancel'
+
+        def cancel():
+            cancel_file.touch()
+            kill_running_tools()
+        Timer(0.5, cancel).start()
+        start = time.monotonic()
+        return_val = asyncio.run(execute_energyplus_async(ExecutionArguments(
+            build_tree=self.build_tree,
+            entry_name='entry_name',
+            test_run_directory=self.run_dir,
+            run_type=ForceRunType.DD,
+            min_reporting_freq=ReportingFreq.HOURLY,
+            this_parametric_file=False,
+            weather_file_name='',
+            cancel_file=cancel_file
+        )))
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual(CANCELLED, return_val[5])
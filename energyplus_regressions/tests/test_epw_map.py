@@ -1,8 +1,9 @@
+import os
 from pathlib import Path
 import tempfile
 import unittest
 
-from energyplus_regressions.epw_map import get_epw_for_idf
+from energyplus_regressions.epw_map import cmake_lists_index, get_epw_for_idf, get_epws_for_idfs
 
 
 class TestGetEPW(unittest.TestCase):
@@ -50,3 +51,33 @@ ADD_SIMULATION_TEST(IDF_FILE BLAH.idf EPW_FILE OK.epw ANNUAL_SIMULATION)
         self.assertIsNone(epw)
         epw = get_epw_for_idf(self.repo_source_dir, "BLAH.idf")
         self.assertEqual(epw, "OK.epw")
+
+    def test_exact_match_only(self):
+        content = """
+ADD_SIMULATION_TEST(IDF_FILE BFOO.idf EPW_FILE WRONG.epw)
+ADD_SIMULATION_TEST(IDF_FILE FOO.idf EPW_FILE BAR.epw)
+ADD_SIMULATION_TEST(IDF_FILE FOO.idf EPW_FILE SECOND.epw)
+ADD_SIMULATION_TEST(IDF_FILE BasicsFiles/Sub.idf EPW_FILE SUB.epw)
+        """
+        self.add_test_files_dir(content_to_add_to_cmake_lists=content)
+        self.assertEqual(get_epw_for_idf(self.repo_source_dir, "FOO.idf"), "BAR.epw")
+        self.assertEqual(get_epw_for_idf(self.repo_source_dir, "BasicsFiles/Sub.idf"), "SUB.epw")
+        self.assertIsNone(get_epw_for_idf(self.repo_source_dir, "OO.idf"))
+
+    def test_bulk_lookup_is_parsed_once_until_changed(self):
+        self.add_test_files_dir(content_to_add_to_cmake_lists="ADD_SIMULATION_TEST(IDF_FILE FOO.idf EPW_FILE BAR.epw)")
+        cmake_lists = self.repo_source_dir / 'testfiles' / 'CMakeLists.txt'
+        epws = get_epws_for_idfs(self.repo_source_dir, ["FOO.idf", "MISSING.idf"])
+        self.assertEqual({"FOO.idf": "BAR.epw", "MISSING.idf": None}, epws)
+        index = cmake_lists_index(cmake_lists.resolve())
+        self.assertIs(index, cmake_lists_index(cmake_lists.resolve()))
+        cmake_lists.write_text("ADD_SIMULATION_TEST(IDF_FILE FOO.idf EPW_FILE CHANGED.epw)")
+        stat = cmake_lists.stat()
+        os.utime(cmake_lists, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertIsNot(index, cmake_lists_index(cmake_lists.resolve()))
+        self.assertEqual(get_epw_for_idf(self.repo_source_dir, "FOO.idf"), "CHANGED.epw")
+
+    def test_bulk_lookup_install_style(self):
+        epws = get_epws_for_idfs(self.repo_source_dir, ["ZoneWSHP_wDOAS.idf", "NOT_ZoneWSHP_wDOAS.idf"])
+        self.assertIsInstance(epws["ZoneWSHP_wDOAS.idf"], str)
+        self.assertIsNone(epws["NOT_ZoneWSHP_wDOAS.idf"])
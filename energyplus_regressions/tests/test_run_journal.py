@@ -0,0 +1,43 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.run_journal import JOURNAL_FILE_NAME, RunJournal
+from energyplus_regressions.structures import (
+    EndErrSummary, MathDifferences, TableDifferences, TestEntry, TextDifferences
+)
+
+
+class TestRunJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.journal_file = Path(tempfile.mkdtemp()) / JOURNAL_FILE_NAME
+
+    def test_round_trip(self):
+        this_entry = TestEntry('sub/my_file.idf', 'my_weather')
+        this_entry.add_summary_result(EndErrSummary(EndErrSummary.STATUS_SUCCESS, 1.5, EndErrSummary.STATUS_TIMEOUT, 2))
+        this_entry.add_table_differences(TableDifferences(['', 10, 1, 2, 7, 1, 0, 0, 0]))
+        this_entry.add_math_differences(MathDifferences(['Big Diffs', 8760, 3, 0]), MathDifferences.ESO)
+        this_entry.add_text_differences(TextDifferences(TextDifferences.DIFFS), TextDifferences.ERR)
+        journal = RunJournal(self.journal_file)
+        journal.record_simulation('A', 'my_file', True, 1712345678)
+        journal.record_simulation('B', 'my_file', False)
+        journal.record_diff(this_entry, 'Processed Diffs : my_file')
+
+        journal = RunJournal(self.journal_file)
+        self.assertEqual({('A', 'my_file'): (True, 1712345678), ('B', 'my_file'): (False, None)}, journal.simulations)
+        loaded, message = journal.diffs['sub__my_file']
+        self.assertEqual('Processed Diffs : my_file', message)
+        self.assertEqual(this_entry.to_record(), loaded.to_record())
+        self.assertEqual(EndErrSummary.STATUS_TIMEOUT, loaded.summary_result.simulation_status_case2)
+        self.assertEqual(8760, loaded.eso_diffs.num_records)
+        self.assertEqual(TextDifferences.DIFFS, loaded.err_diffs.diff_type)
+        self.assertIsNone(loaded.mtr_diffs)
+
+    def test_line_cut_short_is_ignored(self):
+        journal = RunJournal(self.journal_file)
+        journal.record_simulation('A', 'my_file', True)
+        with open(self.journal_file, 'a') as f:
+            f.write('{"event": "simulation", "build": "B", "ca')
+        self.assertEqual({('A', 'my_file'): (True, None)}, RunJournal(self.journal_file).simulations)
+        self.assertEqual({}, RunJournal(self.journal_file.with_name('missing.jsonl')).simulations)
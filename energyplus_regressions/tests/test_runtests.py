@@ -1,15 +1,23 @@
 import json
+import os
 from pathlib import Path
 from platform import system
 import shutil
 import tempfile
+from threading import Thread, Timer, current_thread
+import time
 import unittest
 
 from energyplus_regressions.builds.makefile import CMakeCacheMakeFileBuildDirectory
-from energyplus_regressions.runtests import TestRunConfiguration, SuiteRunner
+from energyplus_regressions import runtests
+from energyplus_regressions.diffs import math_diff, math_diff_streaming
+from energyplus_regressions.energyplus import CANCEL_FILE_NAME, CANCELLED, TIMED_OUT
+from energyplus_regressions.runtests import MIN_HISTORY_TIMEOUT_SECONDS, TestRunConfiguration, SuiteRunner
+from energyplus_regressions.runtime_history import RuntimeHistory
+from energyplus_regressions.staging import COPIED, HARDLINKED, SYMLINKED
 from energyplus_regressions.structures import (
-    EndErrSummary, ForceRunType, ForceOutputSQL, ForceOutputSQLUnitConversion,
-    ReportingFreq, TestEntry, TextDifferences
+    EndErrSummary, ExecutionBackend, ForceRunType, ForceOutputSQL, ForceOutputSQLUnitConversion,
+    MathDiffEngine, ReportingFreq, StagingMode, TestEntry, TextDifferences
 )
 
 
@@ -658,6 +666,303 @@ class TestTestSuiteRunner(unittest.TestCase):
         self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case1)
         self.assertEqual(EndErrSummary.STATUS_MISSING, results_for_file.summary_result.simulation_status_case2)
 
+    def test_case_b_killed_at_case_timeout(self):
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(
+            self.temp_base_build_dir,
+            self.temp_base_source_dir,
+            {
+                "config": {
+                    "run_time_string": "01hr 20min  0.17sec",
+                    "num_warnings": 1,
+                    "num_severe": 0,
+                    "end_state": "success",
+                    "eso_results": "base",
+                    "txt_results": "base"
+                }
+            }
+        )
+        base.set_build_directory(self.temp_base_build_dir)
+
+        mod = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(
+            self.temp_mod_build_dir,
+            self.temp_mod_source_dir,
+            {
+                "config": {
+                    "run_time_string": "00hr 10min  0.17sec",
+                    "num_warnings": 2,
+                    "num_severe": 1,
+                    "end_state": "success",
+                    "eso_results": "base",
+                    "txt_results": "base",
+                    "sleep_seconds": 60
+                }
+            }
+        )
+        mod.set_build_directory(self.temp_mod_build_dir)
+
+        entries = [TestEntry('my_file.idf', 'my_weather')]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod,
+            case_timeout_seconds=2
+        )
+        r = SuiteRunner(config, entries)
+        completed_cases = []
+        r.add_callbacks(
+            print_callback=TestTestSuiteRunner.dummy_callback,
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=completed_cases.append,
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=TestTestSuiteRunner.dummy_callback
+        )
+        diff_results = r.run_test_suite()
+        self.assertEqual(
+            {self.temp_base_build_dir: None, self.temp_mod_build_dir: TIMED_OUT},
+            {Path(case.run_directory): case.limit_exceeded for case in completed_cases}
+        )
+        results_for_file = diff_results.entries_by_file[0]
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case1)
+        self.assertEqual(EndErrSummary.STATUS_TIMEOUT, results_for_file.summary_result.simulation_status_case2)
+        self.assertEqual(['my_file : timeout'], diff_results.to_json_summary()['runs']['limit_exceeded_case_b'])
+
+    def test_interrupt_kills_running_simulations(self):
+        for build_dir, source_dir in [
+            (self.temp_base_build_dir, self.temp_base_source_dir), (self.temp_mod_build_dir, self.temp_mod_source_dir)
+        ]:
+            self.establish_build_folder(
+                build_dir,
+                source_dir,
+                {
+                    "config": {
+                        "run_time_string": "01hr 20min  0.17sec",
+                        "num_warnings": 1,
+                        "num_severe": 0,
+                        "end_state": "success",
+                        "eso_results": "base",
+                        "txt_results": "base",
+                        "sleep_seconds": 60
+                    }
+                }
+            )
+        base = CMakeCacheMakeFileBuildDirectory()
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        mod.set_build_directory(self.temp_mod_build_dir)
+        entries = [TestEntry('my_file.idf', 'my_weather'), TestEntry('my_other_file.idf', 'my_weather')]
+        (self.temp_base_source_dir / 'testfiles' / 'my_other_file.idf').write_text(
+            (self.temp_base_source_dir / 'testfiles' / 'my_file.idf').read_text()
+        )
+        (self.temp_mod_source_dir / 'testfiles' / 'my_other_file.idf').write_text(
+            (self.temp_mod_source_dir / 'testfiles' / 'my_file.idf').read_text()
+        )
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=2,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod
+        )
+        r = SuiteRunner(config, entries)
+        completed_cases = []
+        cancelled = []
+        r.add_callbacks(
+            print_callback=TestTestSuiteRunner.dummy_callback,
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=completed_cases.append,
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=cancelled.append
+        )
+        Timer(1, r.interrupt_please).start()
+        start = time.monotonic()
+        partial_results = r.run_test_suite()
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual([partial_results], cancelled)
+        self.assertEqual([], partial_results.entries_by_file)
+        # the two running simulations were killed, the two queued behind them never started
+        self.assertEqual([CANCELLED, CANCELLED], [case.limit_exceeded for case in completed_cases])
+        self.assertFalse((self.temp_base_build_dir / r.test_output_dir / CANCEL_FILE_NAME).exists())
+
+    def test_simulation_limits_from_history(self):
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_base_build_dir, self.temp_base_source_dir, {"config": {}})
+        base.set_build_directory(self.temp_base_build_dir)
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=base,
+            case_timeout_seconds=3600,
+            timeout_history_factor=5
+        )
+        r = SuiteRunner(config, [], mute=True)
+        history = RuntimeHistory(self.temp_base_build_dir)
+        for seconds in [100, 300, 200]:
+            history.record('DD:slow', seconds, 10)
+        history.record('DD:quick', 1, 10)
+        self.assertEqual(1000, r.simulation_limits(history, 'DD:slow').case_timeout_seconds)
+        self.assertEqual(MIN_HISTORY_TIMEOUT_SECONDS, r.simulation_limits(history, 'DD:quick').case_timeout_seconds)
+        self.assertEqual(3600, r.simulation_limits(history, 'DD:new').case_timeout_seconds)
+        r.case_timeout_seconds = None
+        r.timeout_history_factor = None
+        self.assertIsNone(r.simulation_limits(history, 'DD:slow'))
+
+    def test_resume_only_reruns_what_the_journal_does_not_have(self):
+        for build_dir, source_dir in [
+            (self.temp_base_build_dir, self.temp_base_source_dir), (self.temp_mod_build_dir, self.temp_mod_source_dir)
+        ]:
+            self.establish_build_folder(
+                build_dir,
+                source_dir,
+                {
+                    "config": {
+                        "run_time_string": "00hr 10min  0.17sec",
+                        "num_warnings": 1,
+                        "num_severe": 0,
+                        "end_state": "success",
+                        "eso_results": "base",
+                        "txt_results": "base"
+                    }
+                }
+            )
+        base = CMakeCacheMakeFileBuildDirectory()
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        mod.set_build_directory(self.temp_mod_build_dir)
+
+        def run_suite(resume_test_output_dir=None):
+            config = TestRunConfiguration(
+                force_run_type=ForceRunType.NONE,
+                single_test_run=False,
+                num_threads=1,
+                report_freq=ReportingFreq.HOURLY,
+                build_a=base,
+                build_b=mod,
+                resume_test_output_dir=resume_test_output_dir
+            )
+            r = SuiteRunner(config, [TestEntry('my_file.idf', 'my_weather')])
+            completed_cases = []
+            r.add_callbacks(
+                print_callback=TestTestSuiteRunner.dummy_callback,
+                sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+                case_completed_callback=completed_cases.append,
+                simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+                diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+                all_done_callback=TestTestSuiteRunner.dummy_callback,
+                cancel_callback=TestTestSuiteRunner.dummy_callback
+            )
+            diff_results = r.run_test_suite()
+            reused = {
+                Path(case.run_directory): case.extra_message == 'from the run journal' for case in completed_cases
+            }
+            return r.test_output_dir, diff_results, reused
+
+        test_output_dir, diff_results, reused = run_suite()
+        self.assertEqual({self.temp_base_build_dir: False, self.temp_mod_build_dir: False}, reused)
+        # as if the run had died while build B was simulating the case
+        (diff_results.results_dir_b / 'my_file' / 'eplusout.end').unlink()
+
+        _, diff_results, reused = run_suite(test_output_dir)
+        self.assertEqual({self.temp_base_build_dir: True, self.temp_mod_build_dir: False}, reused)
+        self.assertEqual(1, len(diff_results.entries_by_file))
+        self.assertEqual(
+            EndErrSummary.STATUS_SUCCESS, diff_results.entries_by_file[0].summary_result.simulation_status_case2
+        )
+        self.assertEqual('All Equal', diff_results.entries_by_file[0].eso_diffs.diff_type)
+
+        # with everything already done nothing is simulated or diffed again, but the results are all there
+        (diff_results.results_dir_a / 'my_file' / 'eplusout.eso').unlink()
+        _, diff_results, reused = run_suite(str(diff_results.results_dir_a))
+        self.assertEqual({self.temp_base_build_dir: True, self.temp_mod_build_dir: True}, reused)
+        self.assertEqual(1, len(diff_results.entries_by_file))
+        self.assertEqual('All Equal', diff_results.entries_by_file[0].eso_diffs.diff_type)
+        self.assertEqual(TextDifferences.EQUAL, diff_results.entries_by_file[0].err_diffs.diff_type)
+
+    def test_resume_after_cancel_reruns_the_cancelled_simulation(self):
+        config_body = {
+            "config": {
+                "run_time_string": "00hr 10min  0.17sec",
+                "num_warnings": 1,
+                "num_severe": 0,
+                "end_state": "success",
+                "eso_results": "base",
+                "txt_results": "base"
+            }
+        }
+        self.establish_build_folder(self.temp_base_build_dir, self.temp_base_source_dir, config_body)
+        # build B is cancelled while ReadVarsESO runs, after EnergyPlus has written its end file
+        config_body["config"]["readvars_sleep_seconds"] = 60
+        self.establish_build_folder(self.temp_mod_build_dir, self.temp_mod_source_dir, config_body)
+        base = CMakeCacheMakeFileBuildDirectory()
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        mod.set_build_directory(self.temp_mod_build_dir)
+
+        def make_runner(resume_test_output_dir=None):
+            config = TestRunConfiguration(
+                force_run_type=ForceRunType.NONE,
+                single_test_run=False,
+                num_threads=2,
+                report_freq=ReportingFreq.HOURLY,
+                build_a=base,
+                build_b=mod,
+                resume_test_output_dir=resume_test_output_dir
+            )
+            r = SuiteRunner(config, [TestEntry('my_file.idf', 'my_weather')])
+            completed_cases = []
+            r.add_callbacks(
+                print_callback=TestTestSuiteRunner.dummy_callback,
+                sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+                case_completed_callback=completed_cases.append,
+                simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+                diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+                all_done_callback=TestTestSuiteRunner.dummy_callback,
+                cancel_callback=TestTestSuiteRunner.dummy_callback
+            )
+            return r, completed_cases
+
+        r, completed_cases = make_runner()
+        mod_run_dir = self.temp_mod_build_dir / r.test_output_dir / 'my_file'
+
+        def interrupt_once_readvars_runs():
+            # and once build A's simulation is done and journaled
+            while not (mod_run_dir / 'eplusout.end').exists() or ('A', 'my_file') not in r.journal.simulations:
+                time.sleep(0.05)
+            r.interrupt_please()
+
+        Thread(target=interrupt_once_readvars_runs, daemon=True).start()
+        r.run_test_suite()
+        self.assertEqual(
+            {self.temp_base_build_dir: None, self.temp_mod_build_dir: CANCELLED},
+            {Path(case.run_directory): case.limit_exceeded for case in completed_cases}
+        )
+        self.assertTrue((mod_run_dir / 'eplusout.end').exists())
+        self.assertFalse((mod_run_dir / 'eplusout.csv').exists())
+
+        idf_file = self.temp_mod_source_dir / 'testfiles' / 'my_file.idf'
+        idf_file.write_text(idf_file.read_text().replace('"readvars_sleep_seconds": 60', '"readvars_sleep_seconds": 0'))
+        r, completed_cases = make_runner(r.test_output_dir)
+        diff_results = r.run_test_suite()
+        self.assertEqual(
+            {self.temp_base_build_dir: 'from the run journal', self.temp_mod_build_dir: ''},
+            {Path(case.run_directory): case.extra_message for case in completed_cases}
+        )
+        self.assertTrue((mod_run_dir / 'eplusout.csv').exists())
+        self.assertEqual(1, len(diff_results.entries_by_file))
+        self.assertEqual('All Equal', diff_results.entries_by_file[0].eso_diffs.diff_type)
+
     def test_case_b_unknown(self):
         base = CMakeCacheMakeFileBuildDirectory()
         self.establish_build_folder(
@@ -990,6 +1295,141 @@ class TestTestSuiteRunner(unittest.TestCase):
         # check the diffs
         self.assertEqual(TextDifferences.EQUAL, results_for_file.eio_diffs.diff_type)
 
+    def test_simulations_start_while_other_cases_are_prepared(self):
+        config_body = {"config": {"end_state": "success", "eso_results": "base"}}
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_base_build_dir, self.temp_base_source_dir, config_body)
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_mod_build_dir, self.temp_mod_source_dir, config_body)
+        mod.set_build_directory(self.temp_mod_build_dir)
+        entries = [
+            TestEntry('my_file.idf', 'my_weather'), TestEntry('missing.idf', 'my_weather'),
+            TestEntry('my_macro_file.imf', 'my_weather')
+        ]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod
+        )
+        r = SuiteRunner(config, entries)
+        r.add_callbacks(
+            print_callback=TestTestSuiteRunner.dummy_callback,
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=TestTestSuiteRunner.dummy_callback,
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=TestTestSuiteRunner.dummy_callback
+        )
+        diff_results = r.run_test_suite()
+        self.assertEqual(3, len(diff_results.entries_by_file))
+        sims = [job for job in r.finished_jobs if job.kind == 'simulation']
+        self.assertEqual(4, len(sims))
+        self.assertEqual(3, sum(job.kind == 'diff' for job in r.finished_jobs))
+        # only a few runs are prepared ahead of a single worker, so the last one is queued after the first one ran
+        self.assertLess(min(job.started_at for job in sims), max(job.added_at for job in sims))
+
+    def test_long_case_listed_last_starts_first(self):
+        config_body = {"config": {"end_state": "success", "eso_results": "base"}}
+        builds = []
+        for build_dir, source_dir in [
+            (self.temp_base_build_dir, self.temp_base_source_dir), (self.temp_mod_build_dir, self.temp_mod_source_dir)
+        ]:
+            self.establish_build_folder(build_dir, source_dir, config_body)
+            for name in ['a', 'b', 'c', 'd']:
+                shutil.copy(source_dir / 'testfiles' / 'my_file.idf', source_dir / 'testfiles' / f'{name}.idf')
+            build = CMakeCacheMakeFileBuildDirectory()
+            build.set_build_directory(build_dir)
+            builds.append(build)
+        # the last case has taken far longer in build A than any input file's size would suggest
+        history = RuntimeHistory(self.temp_base_build_dir)
+        history.record(RuntimeHistory.case_key(ForceRunType.NONE, 'EMSTestMathAndKill'), 1000, 10)
+        history.save()
+        # and a missing input file is reported from preparation, which still has to be on the scheduling thread
+        entries = [
+            TestEntry(f'{name}.idf', 'my_weather') for name in ['a', 'b', 'missing', 'c', 'd', 'EMSTestMathAndKill']
+        ]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=builds[0],
+            build_b=builds[1]
+        )
+        r = SuiteRunner(config, entries)
+        callback_threads = set()
+        r.add_callbacks(
+            print_callback=lambda *args: callback_threads.add(current_thread()),
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=lambda *args: callback_threads.add(current_thread()),
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=TestTestSuiteRunner.dummy_callback
+        )
+        preparation_threads = runtests.PREPARATION_THREADS
+        runtests.PREPARATION_THREADS = 1  # so that preparation finishes in the order it was started in
+        try:
+            r.run_test_suite()
+        finally:
+            runtests.PREPARATION_THREADS = preparation_threads
+        sims = sorted((job for job in r.finished_jobs if job.kind == 'simulation'), key=lambda job: job.started_at)
+        self.assertEqual(10, len(sims))
+        self.assertEqual('EMSTestMathAndKill (build A)', sims[0].name)
+        self.assertEqual({current_thread()}, callback_threads)
+
+    def test_asyncio_backend_runs_simulations_from_this_process(self):
+        config_body = {"config": {"end_state": "success", "eso_results": "base", "sleep_seconds": 0.2}}
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_base_build_dir, self.temp_base_source_dir, config_body)
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_mod_build_dir, self.temp_mod_source_dir, config_body)
+        mod.set_build_directory(self.temp_mod_build_dir)
+        entries = [
+            TestEntry('my_file.idf', 'my_weather'), TestEntry('missing.idf', 'my_weather'),
+            TestEntry('my_macro_file.imf', 'my_weather')
+        ]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod,
+            execution_backend=ExecutionBackend.ASYNCIO,
+            max_concurrent_simulations=4
+        )
+        r = SuiteRunner(config, entries)
+        r.add_callbacks(
+            print_callback=TestTestSuiteRunner.dummy_callback,
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=TestTestSuiteRunner.dummy_callback,
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=TestTestSuiteRunner.dummy_callback
+        )
+        diff_results = r.run_test_suite()
+        self.assertEqual(3, len(diff_results.entries_by_file))
+        results_for_file = [e for e in diff_results.entries_by_file if e.basename == 'my_file'][0]
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case1)
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case2)
+        sims = [job for job in r.finished_jobs if job.kind == 'simulation']
+        self.assertEqual(4, len(sims))
+        self.assertEqual({os.getpid()}, {job.worker_pid for job in sims})
+        # but each simulation going at once is shown on a track of its own
+        self.assertLess(1, len({job.worker_tid for job in sims}))
+        # with a single worker process, more than one simulation was still going at once
+        self.assertTrue(any(
+            a.started_at < b.started_at < a.finished_at for a in sims for b in sims if a is not b
+        ))
+
     def test_base_case_but_multi_process(self):
         base = CMakeCacheMakeFileBuildDirectory()
         self.establish_build_folder(
@@ -1059,6 +1499,33 @@ class TestTestSuiteRunner(unittest.TestCase):
         results_dir = diff_results.results_dir_a
         self.assertTrue((results_dir / 'test_results.json').exists())
         self.assertTrue((results_dir / 'run_times.csv').exists())
+        # the stages of the simulations and diffs in the worker processes should all have been traced
+        with (results_dir / 'stage_trace.jsonl').open() as f:
+            spans = [json.loads(line) for line in f]
+        stages = {(span['case'], span['stage']) for span in spans}
+        for case in ['my_file', 'my_macro_file']:
+            for stage in ['ExpandObjects', 'EnergyPlus', 'ReadVarsESO eso', 'ReadVarsESO mtr', 'math diff eplusout.csv',
+                          'text diff in.idf', 'table diff eplustbl.htm']:
+                self.assertIn((case, stage), stages)
+        self.assertIn(('my_macro_file', 'EPMacro'), stages)
+        self.assertEqual(2, sum(span['stage'] == 'EnergyPlus' and span['case'] == 'my_file' for span in spans))
+        for span in spans:
+            self.assertGreaterEqual(span['wall_seconds'], 0)
+            self.assertIn('process_peak_rss_bytes', span)
+            if span['stage'] == 'EnergyPlus':  # the peak of the tool itself, where it was sampled
+                self.assertIn('peak_rss_bytes', span)
+        with (results_dir / 'suite_timeline.json').open() as f:
+            events = json.load(f)['traceEvents']
+        jobs = [event for event in events if event['ph'] == 'X' and event['cat'] in ('simulation', 'diff')]
+        self.assertEqual(
+            ['my_file (build A)', 'my_file (build B)', 'my_file (diff)',
+             'my_macro_file (build A)', 'my_macro_file (build B)', 'my_macro_file (diff)'],
+            sorted(event['name'] for event in jobs)
+        )
+        self.assertEqual(6, sum(event['ph'] == 'b' for event in events))
+        self.assertIn('EnergyPlus', {event['name'] for event in events if event.get('cat') == 'stage'})
+        worker_tracks = {event['tid'] for event in events if event['name'] == 'thread_name'}
+        self.assertEqual(worker_tracks, {event['tid'] for event in jobs})
         # it should have created a run directory for this file, put input files there, and left output files there
         file_results_dir = results_dir / 'my_file'
         self.assertTrue(file_results_dir.exists())
@@ -1068,6 +1535,81 @@ class TestTestSuiteRunner(unittest.TestCase):
         self.assertTrue((file_results_dir / 'eplusout.end').exists())
         self.assertTrue((file_results_dir / 'eplusout.csv').exists())
 
+    def test_sim_cache_reuses_unchanged_simulations(self):
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(
+            self.temp_base_build_dir,
+            self.temp_base_source_dir,
+            {
+                "config": {
+                    "run_time_string": "01hr 20min  0.17sec",
+                    "num_warnings": 1,
+                    "num_severe": 0,
+                    "end_state": "success",
+                    "eso_results": "base",
+                    "txt_results": "base"
+                }
+            }
+        )
+        base.set_build_directory(self.temp_base_build_dir)
+
+        mod = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(
+            self.temp_mod_build_dir,
+            self.temp_mod_source_dir,
+            {
+                "config": {
+                    "run_time_string": "01hr 20min  0.17sec",
+                    "num_warnings": 1,
+                    "num_severe": 0,
+                    "end_state": "success",
+                    "eso_results": "mod",
+                    "txt_results": "base"
+                }
+            }
+        )
+        mod.set_build_directory(self.temp_mod_build_dir)
+
+        cache_dir = Path(tempfile.mkdtemp())
+        entries = [TestEntry('my_file.idf', 'my_weather')]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod,
+            sim_cache_dir=cache_dir
+        )
+        first_results = SuiteRunner(config, entries, mute=True)
+        first_summary = first_results.run_test_suite()
+        self.assertEqual(0, first_results.sim_cache_stats.hits)
+        self.assertEqual(2, first_results.sim_cache_stats.misses)
+        self.assertGreater(first_results.sim_cache_stats.size_bytes, 0)
+
+        second_results = SuiteRunner(config, entries, mute=True)
+        second_results.test_output_dir += '_cached'
+        second_summary = second_results.run_test_suite()
+        self.assertEqual(2, second_results.sim_cache_stats.hits)
+        self.assertEqual(0, second_results.sim_cache_stats.misses)
+        # the restored outputs should diff exactly the same way as the originals
+        first_entry = first_summary.entries_by_file[0]
+        second_entry = second_summary.entries_by_file[0]
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, second_entry.summary_result.simulation_status_case1)
+        self.assertEqual(first_entry.eso_diffs.diff_type, second_entry.eso_diffs.diff_type)
+        file_results_dir = second_summary.results_dir_a / 'my_file'
+        self.assertTrue((file_results_dir / 'in.epw').exists())
+        self.assertTrue((file_results_dir / 'eplusout.end').exists())
+
+        # a cache too small to hold anything gets emptied at the end of the run
+        config.sim_cache_max_size_bytes = 0
+        third_results = SuiteRunner(config, entries, mute=True)
+        third_results.test_output_dir += '_evicted'
+        third_results.run_test_suite()
+        self.assertEqual(2, third_results.sim_cache_stats.hits)
+        self.assertEqual(2, third_results.sim_cache_stats.evicted_entries)
+        self.assertEqual(0, third_results.sim_cache_stats.size_bytes)
+
     def test_window5_file_gets_dependencies(self):
         base = CMakeCacheMakeFileBuildDirectory()
         self.establish_build_folder(
@@ -1139,6 +1681,64 @@ class TestTestSuiteRunner(unittest.TestCase):
         file_results_dir = results_dir / 'my_file'
         self.assertTrue((file_results_dir / 'datasets' / 'Window5DataFile.dat').exists())
 
+    def test_linked_staging_of_read_only_inputs(self):
+        config_body = {
+            "config": {
+                "end_state": "success",
+                "eso_results": "base",
+                "extra_data": "Window5DataFile.dat"
+            }
+        }
+        base = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_base_build_dir, self.temp_base_source_dir, config_body)
+        base.set_build_directory(self.temp_base_build_dir)
+        mod = CMakeCacheMakeFileBuildDirectory()
+        self.establish_build_folder(self.temp_mod_build_dir, self.temp_mod_source_dir, config_body)
+        mod.set_build_directory(self.temp_mod_build_dir)
+        source_idf_text = (self.temp_base_source_dir / 'testfiles' / 'my_file.idf').read_text()
+
+        entries = [TestEntry('my_file.idf', 'my_weather')]
+        config = TestRunConfiguration(
+            force_run_type=ForceRunType.NONE,
+            single_test_run=False,
+            num_threads=1,
+            report_freq=ReportingFreq.HOURLY,
+            build_a=base,
+            build_b=mod,
+            staging_mode=StagingMode.LINK
+        )
+        r = SuiteRunner(config, entries)
+        r.add_callbacks(
+            print_callback=TestTestSuiteRunner.dummy_callback,
+            sim_starting_callback=TestTestSuiteRunner.dummy_callback,
+            case_completed_callback=TestTestSuiteRunner.dummy_callback,
+            simulations_complete_callback=TestTestSuiteRunner.dummy_callback,
+            diff_completed_callback=TestTestSuiteRunner.dummy_callback,
+            all_done_callback=TestTestSuiteRunner.dummy_callback,
+            cancel_callback=TestTestSuiteRunner.dummy_callback
+        )
+        diff_results = r.run_test_suite()
+        results_for_file = diff_results.entries_by_file[0]
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case1)
+        self.assertEqual(EndErrSummary.STATUS_SUCCESS, results_for_file.summary_result.simulation_status_case2)
+        file_results_dir = diff_results.results_dir_a / 'my_file'
+        # the dataset and weather file are the originals, linked in, but the rewritten input file is a copy
+        self.assertTrue(os.path.samefile(
+            self.temp_base_source_dir / 'datasets' / 'Window5DataFile.dat',
+            file_results_dir / 'datasets' / 'Window5DataFile.dat'
+        ))
+        self.assertTrue(os.path.samefile(
+            self.temp_base_source_dir / 'weather' / 'my_weather.epw', file_results_dir / 'in.epw'
+        ))
+        self.assertFalse(os.path.samefile(
+            self.temp_base_source_dir / 'testfiles' / 'my_file.idf', file_results_dir / 'in.idf'
+        ))
+        self.assertEqual(source_idf_text, (self.temp_base_source_dir / 'testfiles' / 'my_file.idf').read_text())
+        # Window5DataFile.dat, my_file.rvi, my_file.mvi, Energy+.idd and in.epw for both builds
+        self.assertEqual(10, r.staging_stats.files[HARDLINKED] + r.staging_stats.files[SYMLINKED])
+        self.assertEqual(0, r.staging_stats.files[COPIED])
+        self.assertGreater(r.staging_stats.bytes_avoided, 0)
+
     def test_tdv_file_gets_dependencies(self):
         base = CMakeCacheMakeFileBuildDirectory()
         self.establish_build_folder(  # noqa: W605
@@ -2271,6 +2871,31 @@ class TestTestSuiteRunner(unittest.TestCase):
         diff_file = self.temp_base_build_dir / 'eio.diff'
         self.assertEqual(TextDifferences.DIFFS, SuiteRunner.diff_text_files(base_eio, mod_eio, diff_file))
 
+    def test_identical_files_skip_parsing(self):
+        base_csv = self.temp_base_build_dir / 'eplusout.csv'
+        mod_csv = self.temp_mod_build_dir / 'eplusout.csv'
+        base_csv.write_text('Date/Time,A [W](Hourly),B [C](Hourly)\n 01/01  01:00:00,1,2\n 01/01  02:00:00,3,4')
+        shutil.copy(base_csv, mod_csv)
+        self.assertTrue(SuiteRunner.files_are_identical(base_csv, mod_csv))
+        self.assertEqual(('All Equal', 2, 0, 0), SuiteRunner.identical_csv_math_diff(base_csv, mod_csv))
+        # files math_diff has something to say about are left to math_diff
+        for contents in ['Date/Time,A [W](Hourly),A [W](Hourly)\n 01/01  01:00:00,1,2\n', 'Date/Time,A\n', '']:
+            base_csv.write_text(contents)
+            shutil.copy(base_csv, mod_csv)
+            self.assertIsNone(SuiteRunner.identical_csv_math_diff(base_csv, mod_csv))
+        # same size, different contents
+        mod_csv.write_text('Date/Time,A\n'.replace('A', 'B'))
+        base_csv.write_text('Date/Time,A\n')
+        self.assertFalse(SuiteRunner.files_are_identical(base_csv, mod_csv))
+        self.assertIsNone(SuiteRunner.identical_csv_math_diff(base_csv, mod_csv))
+        # even a file that couldn't be decoded is equal to an identical copy of itself
+        base_err = self.temp_base_build_dir / 'eplusout.err'
+        base_err.write_bytes(b'\xff\xfe bad bytes\n')
+        mod_err = self.temp_mod_build_dir / 'eplusout.err'
+        shutil.copy(base_err, mod_err)
+        diff_file = self.temp_base_build_dir / 'err.diff'
+        self.assertEqual(TextDifferences.EQUAL, SuiteRunner.diff_text_files(base_err, mod_err, diff_file))
+
     def test_err_diff_equal_with_ignored_differences(self):
         base_err = self.resources / 'eplusout_base.err'
         mod_err = self.resources / 'eplusout_mod.err'
@@ -2518,3 +3143,13 @@ class TestSQLiteForce(unittest.TestCase):
         with self.assertRaises(ValueError):
             # noinspection PyTypeChecker
             SuiteRunner.add_or_modify_output_sqlite("", ForceOutputSQL.NOFORCE, "BLAH")
+
+    def test_math_diff_engine_selection(self):
+        self.assertIs(math_diff.math_diff, SuiteRunner.math_diff_function(MathDiffEngine.PYTHON))
+        self.assertIs(math_diff_streaming.math_diff, SuiteRunner.math_diff_function(MathDiffEngine.STREAMING))
+        try:
+            from energyplus_regressions.diffs import math_diff_numpy
+            self.assertIs(math_diff_numpy.math_diff, SuiteRunner.math_diff_function(MathDiffEngine.AUTO))
+            self.assertIs(math_diff_numpy.math_diff, SuiteRunner.math_diff_function(MathDiffEngine.NUMPY))
+        except ImportError:  # pragma: no cover -- numpy is optional
+            self.assertIs(math_diff.math_diff, SuiteRunner.math_diff_function(MathDiffEngine.AUTO))
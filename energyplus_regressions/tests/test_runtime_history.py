@@ -0,0 +1,68 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.runtime_history import (
+    APPROX_BYTES_PER_INPUT_OBJECT, DEFAULT_SECONDS_PER_OBJECT, MAX_SAMPLES_PER_CASE, RuntimeHistory,
+    count_input_objects, estimate_input_objects, predict_makespan
+)
+
+
+class TestRuntimeHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.build_dir = Path(tempfile.mkdtemp())
+
+    def test_estimate_without_any_history(self):
+        history = RuntimeHistory(self.build_dir)
+        self.assertAlmostEqual(100 * DEFAULT_SECONDS_PER_OBJECT, history.estimate('DD:a', 100))
+
+    def test_estimate_from_history_and_fitted_rate(self):
+        history = RuntimeHistory(self.build_dir)
+        history.record('DD:a', 10.0, 100)
+        history.record('DD:a', 20.0, 100)
+        self.assertAlmostEqual(15.0, history.estimate('DD:a', 100))
+        # an unknown case is scaled by the rate fitted to the known cases
+        self.assertAlmostEqual(30.0, history.estimate('DD:b', 200))
+
+    def test_only_recent_samples_are_kept(self):
+        history = RuntimeHistory(self.build_dir)
+        for i in range(MAX_SAMPLES_PER_CASE + 3):
+            history.record('DD:a', float(i), 10)
+        self.assertEqual(MAX_SAMPLES_PER_CASE, len(history.cases['DD:a']['seconds']))
+        self.assertEqual(float(MAX_SAMPLES_PER_CASE + 2), history.cases['DD:a']['seconds'][-1])
+
+    def test_median(self):
+        history = RuntimeHistory(self.build_dir)
+        self.assertIsNone(history.median('DD:a'))
+        for seconds in [10.0, 100.0, 12.0]:
+            history.record('DD:a', seconds, 10)
+        self.assertEqual(12.0, history.median('DD:a'))
+
+    def test_save_and_reload(self):
+        history = RuntimeHistory(self.build_dir)
+        history.record('Annual:a', 4.0, 10)
+        history.save()
+        reloaded = RuntimeHistory(self.build_dir)
+        self.assertAlmostEqual(4.0, reloaded.estimate('Annual:a', 0))
+
+    def test_corrupt_history_is_ignored(self):
+        (self.build_dir / RuntimeHistory.FILE_NAME).write_text('{not json')
+        self.assertEqual({}, RuntimeHistory(self.build_dir).cases)
+
+    def test_count_input_objects(self):
+        run_dir = Path(tempfile.mkdtemp())
+        self.assertEqual(0, count_input_objects(run_dir))
+        (run_dir / 'in.idf').write_text('Version,9.6;\nTimestep,4;\n')
+        self.assertEqual(2, count_input_objects(run_dir))
+
+    def test_estimate_input_objects(self):
+        input_file = Path(tempfile.mkdtemp()) / 'my_file.idf'
+        self.assertEqual(0, estimate_input_objects(input_file))
+        input_file.write_text('!' * (3 * APPROX_BYTES_PER_INPUT_OBJECT))
+        self.assertEqual(3, estimate_input_objects(input_file))
+
+    def test_predict_makespan(self):
+        self.assertAlmostEqual(10.0, predict_makespan([10.0, 3.0, 3.0, 3.0], 2))
+        self.assertAlmostEqual(19.0, predict_makespan([10.0, 3.0, 3.0, 3.0], 1))
+        self.assertAlmostEqual(0.0, predict_makespan([], 4))
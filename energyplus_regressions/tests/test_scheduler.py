@@ -0,0 +1,167 @@
+import asyncio
+from threading import Thread
+import time
+import unittest
+
+from energyplus_regressions.scheduler import (
+    AsyncioExecutor, Job, JobGraphScheduler, PoolExecutor, SerialExecutor, get_shared_pool, shutdown_shared_pool
+)
+
+
+def square(x):
+    return x * x
+
+
+def sleepy(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+running = []
+most_running = []
+
+
+async def slow_square(x):
+    running.append(x)
+    most_running.append(len(running))
+    await asyncio.sleep(0.02)
+    running.remove(x)
+    return x * x
+
+
+class TestJobGraphScheduler(unittest.TestCase):
+
+    def test_serial_runs_in_priority_order(self):
+        finished = []
+        scheduler = JobGraphScheduler(SerialExecutor(), 1)
+        for i, priority in enumerate([2, 0, 1]):
+            scheduler.add(Job(Job.SIMULATION, square, (i,), lambda r, e: finished.append(r), priority=priority))
+        scheduler.run()
+        scheduler.close()
+        self.assertEqual([1, 4, 0], finished)
+
+    def test_handlers_can_add_dependent_jobs(self):
+        finished = []
+        scheduler = JobGraphScheduler(SerialExecutor(), 1)
+
+        def sim_done(result, error):
+            finished.append(('sim', result))
+            scheduler.add(Job(Job.DIFF, square, (result,), lambda r, e: finished.append(('diff', r)), priority=0))
+
+        scheduler.add(Job(Job.SIMULATION, square, (2,), sim_done, priority=1))
+        scheduler.add(Job(Job.SIMULATION, square, (3,), sim_done, priority=1))
+        scheduler.run()
+        # the diff of the first job jumps ahead of the remaining simulation
+        self.assertEqual([('sim', 4), ('diff', 16), ('sim', 9), ('diff', 81)], finished)
+
+    def test_errors_are_reported_to_handler(self):
+        errors = []
+        scheduler = JobGraphScheduler(SerialExecutor(), 1)
+        scheduler.add(Job(Job.SIMULATION, square, ('x',), lambda r, e: errors.append(e)))
+        scheduler.run()
+        self.assertIsInstance(errors[0], TypeError)
+
+    def test_stop_prevents_dispatch(self):
+        finished = []
+        scheduler = JobGraphScheduler(SerialExecutor(), 1, should_stop=lambda: len(finished) > 0)
+        for i in range(3):
+            scheduler.add(Job(Job.SIMULATION, square, (i,), lambda r, e: finished.append(r)))
+        scheduler.run()
+        self.assertEqual([0], finished)
+
+    def test_stop_abandons_running_jobs_after_grace(self):
+        finished = []
+        stop_at = time.monotonic() + 0.5
+        scheduler = JobGraphScheduler(
+            PoolExecutor(1, persistent=False), 1, should_stop=lambda: time.monotonic() > stop_at,
+            stop_grace_seconds=0.5
+        )
+        for _ in range(2):
+            scheduler.add(Job(Job.SIMULATION, sleepy, (60,), lambda r, e: finished.append(r)))
+        start = time.monotonic()
+        scheduler.run()
+        scheduler.close()
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual([], finished)
+        self.assertEqual(1, len(scheduler.abandoned_jobs))
+        self.assertEqual(1, len(scheduler.dropped_jobs))
+
+    def test_pool_executor(self):
+        finished = []
+        scheduler = JobGraphScheduler(PoolExecutor(2), 2)
+        for i in range(5):
+            scheduler.add(Job(Job.SIMULATION, square, (i,), lambda r, e: finished.append(r)))
+        scheduler.run()
+        scheduler.close()
+        self.assertEqual([0, 1, 4, 9, 16], sorted(finished))
+
+    def test_shared_pool_is_reused(self):
+        executor = PoolExecutor(2)
+        executor.close()
+        self.assertIs(executor.pool, PoolExecutor(2).pool)
+        self.assertIsNot(executor.pool, get_shared_pool(3))
+        shutdown_shared_pool()
+        self.assertIsNot(executor.pool, PoolExecutor(2).pool)
+        shutdown_shared_pool()
+
+    def test_private_pool(self):
+        finished = []
+        scheduler = JobGraphScheduler(PoolExecutor(2, persistent=False), 2)
+        scheduler.add(Job(Job.SIMULATION, square, (3,), lambda r, e: finished.append(r)))
+        scheduler.run()
+        scheduler.close()
+        self.assertEqual([9], finished)
+
+    def test_jobs_are_stamped_with_when_and_where_they_ran(self):
+        for executor in [SerialExecutor(), PoolExecutor(2, persistent=False)]:
+            scheduler = JobGraphScheduler(executor, 2)
+            jobs = [Job(Job.SIMULATION, square, (i,), lambda r, e: None, name=str(i)) for i in range(3)]
+            failed = Job(Job.DIFF, square, ('x',), lambda r, e: None)
+            for job in jobs + [failed]:
+                scheduler.add(job)
+            scheduler.run()
+            scheduler.close()
+            self.assertEqual(4, len(scheduler.finished_jobs))
+            for job in jobs:
+                self.assertLessEqual(job.added_at, job.submitted_at)
+                self.assertLessEqual(job.submitted_at, job.started_at)
+                self.assertLessEqual(job.started_at, job.finished_at)
+                self.assertLessEqual(job.finished_at, job.completed_at)
+                self.assertIsNotNone(job.worker_pid)
+            self.assertIsNone(failed.started_at)
+            self.assertIsNotNone(failed.completed_at)
+
+    def test_posts_from_other_threads_keep_it_running(self):
+        finished = []
+        scheduler = JobGraphScheduler(SerialExecutor(), 1)
+        scheduler.hold(3)
+
+        def feed():
+            for i in range(3):
+                time.sleep(0.01)
+                job = Job(Job.SIMULATION, square, (i,), lambda r, e: finished.append(r))
+                scheduler.post(lambda job=job: scheduler.add(job))
+
+        feeder = Thread(target=feed)
+        feeder.start()
+        scheduler.run()
+        feeder.join()
+        self.assertEqual([0, 1, 4], finished)
+
+    def test_asyncio_executor(self):
+        finished = []
+        most_running.clear()
+        scheduler = JobGraphScheduler(AsyncioExecutor(3, SerialExecutor()), 10)
+        for i in range(8):
+            scheduler.add(Job(Job.SIMULATION, slow_square, (i,), lambda r, e: finished.append(r)))
+        # plain functions are handed to the fallback executor
+        scheduler.add(Job(Job.DIFF, square, (10,), lambda r, e: finished.append(r)))
+        scheduler.add(Job(Job.SIMULATION, slow_square, ('x',), lambda r, e: finished.append(e)))
+        scheduler.run()
+        scheduler.close()
+        self.assertEqual(sorted([i * i for i in range(8)] + [100]), sorted(r for r in finished if isinstance(r, int)))
+        self.assertIsInstance([r for r in finished if not isinstance(r, int)][0], TypeError)
+        self.assertEqual(3, max(most_running))
+        for job in scheduler.finished_jobs[:-1]:
+            if job.started_at is not None:
+                self.assertLessEqual(job.started_at, job.finished_at)
@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.staging import (
+    COPIED, HARDLINKED, SYMLINKED, StagingStats, stage_directory_files, stage_file
+)
+from energyplus_regressions.structures import StagingMode
+
+
+class TestStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.source_dir = Path(tempfile.mkdtemp())
+        self.run_dir = Path(tempfile.mkdtemp())
+        self.source = self.source_dir / 'Energy+.idd'
+        self.source.write_text('IDD' * 100)
+
+    def test_copy_mode_copies(self):
+        stats = StagingStats()
+        self.assertEqual(COPIED, stage_file(self.source, self.run_dir, StagingMode.COPY, stats))
+        staged = self.run_dir / 'Energy+.idd'
+        self.assertFalse(os.path.samefile(self.source, staged))
+        self.assertEqual(self.source.read_text(), staged.read_text())
+        self.assertEqual(300, stats.bytes[COPIED])
+        self.assertEqual(0, stats.bytes_avoided)
+
+    def test_link_modes(self):
+        for mode, expected in [(StagingMode.LINK, HARDLINKED), (StagingMode.HARDLINK, HARDLINKED),
+                               (StagingMode.SYMLINK, SYMLINKED)]:
+            with self.subTest(mode=mode):
+                stats = StagingStats()
+                staged = self.run_dir / 'in.idd'
+                # staging over an existing file replaces it
+                staged.write_text('old')
+                self.assertEqual(expected, stage_file(self.source, staged, mode, stats))
+                self.assertTrue(os.path.samefile(self.source, staged))
+                self.assertEqual(expected == SYMLINKED, staged.is_symlink())
+                self.assertEqual(300, stats.bytes_avoided)
+                staged.unlink()
+                self.assertTrue(self.source.exists())
+
+    def test_directory_files_and_merged_stats(self):
+        tdv_dir = self.source_dir / 'TDV'
+        tdv_dir.mkdir()
+        (tdv_dir / 'a.csv').write_text('a')
+        (tdv_dir / 'b.csv').write_text('bb')
+        (tdv_dir / 'sub').mkdir()
+        stats = StagingStats()
+        stage_directory_files(tdv_dir, self.run_dir, StagingMode.COPY, stats)
+        self.assertEqual(['a.csv', 'b.csv'], sorted(p.name for p in self.run_dir.iterdir()))
+        other = StagingStats()
+        other.record(HARDLINKED, 1000)
+        stats.merge(other)
+        self.assertEqual({HARDLINKED: 1, SYMLINKED: 0, COPIED: 2}, stats.files)
+        self.assertEqual(1000, stats.bytes_avoided)
+        self.assertIn('avoided copying 0.0 MB', stats.report())
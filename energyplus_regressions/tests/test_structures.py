@@ -98,6 +98,8 @@ class TestEndErrSummary(unittest.TestCase):
         self.assertIsInstance(result, str)
         result = EndErrSummary.status_to_string(EndErrSummary.STATUS_FATAL)
         self.assertIsInstance(result, str)
+        self.assertEqual('timeout', EndErrSummary.status_to_string(EndErrSummary.STATUS_TIMEOUT))
+        self.assertEqual('out of memory', EndErrSummary.status_to_string(EndErrSummary.STATUS_OUT_OF_MEMORY))
         with self.assertRaises(Exception):
             EndErrSummary.status_to_string(-1000)
 
@@ -258,3 +260,23 @@ class TestCompletedStructure(unittest.TestCase):
         self.assertIn('runs', obj)
         self.assertIn('diffs', obj)
         self.assertIn('results_by_file', obj)
+
+    def test_runs_stopped_at_a_limit(self):
+        c = CompletedStructure(
+            Path('/a/source/dir'), Path('/a/build/dir'),
+            Path('/b/source/dir'), Path('/b/build/dir'),
+            Path('/r/dir1'), Path('/r/dir2'),
+            datetime.now()
+        )
+        t = TestEntry('hung', 'weather')
+        t.add_summary_result(EndErrSummary(EndErrSummary.STATUS_TIMEOUT, 0, EndErrSummary.STATUS_SUCCESS, 1))
+        c.add_test_entry(t)
+        t = TestEntry('huge', 'weather')
+        t.add_summary_result(EndErrSummary(EndErrSummary.STATUS_OUT_OF_MEMORY, 0, EndErrSummary.STATUS_TIMEOUT, 0))
+        c.add_test_entry(t)
+        obj = c.to_json_summary()
+        self.assertEqual(['hung', 'huge'], obj['runs']['failure_case_a'])
+        self.assertEqual(['huge'], obj['runs']['failure_case_b'])
+        self.assertEqual(['hung : timeout', 'huge : out of memory'], obj['runs']['limit_exceeded_case_a'])
+        self.assertEqual(['huge : timeout'], obj['runs']['limit_exceeded_case_b'])
+        self.assertEqual('timeout', obj['results_by_file'][0]['summary']['simulation_status_case1'])
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from energyplus_regressions.scheduler import (
+    ASYNCIO_SLOT_TID_BASE, AsyncioExecutor, Job, JobGraphScheduler, SerialExecutor
+)
+from energyplus_regressions.tracing import StageTrace, StageTracer, chrome_trace_events, write_chrome_trace
+
+
+async def traced_sleep(seconds):
+    tracer = StageTracer('my_file')
+    with tracer.span('EnergyPlus'):
+        await asyncio.sleep(seconds)
+    return tracer.spans[0]
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_span_records_stage_even_when_it_fails(self):
+        tracer = StageTracer('my_file', '/build')
+        with tracer.span('EnergyPlus'):
+            Path(tempfile.mkdtemp(), 'out.txt').write_bytes(b'x' * 10000)
+        with self.assertRaises(ValueError):
+            with tracer.span('ReadVarsESO eso'):
+                raise ValueError()
+        self.assertEqual(['EnergyPlus', 'ReadVarsESO eso'], [span['stage'] for span in tracer.spans])
+        span = tracer.spans[0]
+        self.assertEqual('my_file', span['case'])
+        self.assertEqual('/build', span['build'])
+        self.assertGreaterEqual(span['wall_seconds'], 0)
+        self.assertGreaterEqual(span['cpu_seconds'], 0)
+        if span['write_bytes'] is not None:
+            self.assertGreaterEqual(span['write_bytes'], 10000)
+
+    def test_trace_file_and_slowest_stages(self):
+        trace_file = Path(tempfile.mkdtemp()) / 'stage_trace.jsonl'
+        trace_file.write_text('from a previous run\n')
+        trace = StageTrace(trace_file)
+        spans = [
+            {'case': 'a', 'stage': 'EnergyPlus', 'wall_seconds': 5.0, 'cpu_seconds': 4.0},
+            {'case': 'b', 'stage': 'EnergyPlus', 'wall_seconds': 7.0, 'cpu_seconds': 6.5},
+            {'case': 'b', 'stage': 'text diff eplusout.eio', 'wall_seconds': 9.0, 'cpu_seconds': 9.0},
+            {'case': 'a', 'stage': 'ExpandObjects', 'wall_seconds': 0.1, 'cpu_seconds': 0.1},
+        ]
+        trace.add(spans[:2])
+        trace.add(spans[2:])
+        with trace_file.open() as f:
+            self.assertEqual(spans, [json.loads(line) for line in f])
+        lines = trace.slowest_stages(count=2)
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[1].startswith('EnergyPlus '))
+        self.assertIn(' 12.00 ', lines[1])
+        self.assertTrue(lines[1].endswith(' b'))
+        self.assertTrue(lines[2].startswith('text diff eplusout.eio '))
+
+    def test_chrome_trace_of_jobs_and_stages(self):
+        job = Job(Job.SIMULATION, print, (), None, name='my_file (build A)')
+        job.added_at, job.submitted_at, job.started_at = 100.0, 101.0, 101.5
+        job.finished_at, job.completed_at = 104.0, 104.1
+        job.worker_pid = 42
+        failed = Job(Job.DIFF, print, (), None, name='my_file (diff)')
+        failed.added_at, failed.submitted_at, failed.completed_at = 104.0, 104.0, 104.2
+        span = {'case': 'my_file', 'build': '/build', 'stage': 'EnergyPlus', 'start': 102.0, 'wall_seconds': 1.5,
+                'cpu_seconds': 1.4, 'pid': 42}
+        trace_file = Path(tempfile.mkdtemp()) / 'suite_timeline.json'
+        write_chrome_trace(trace_file, [job, failed], [span])
+        with trace_file.open() as f:
+            events = json.load(f)['traceEvents']
+        by_phase = {}
+        for event in events:
+            by_phase.setdefault(event['ph'], []).append(event)
+        job_event, stage_event = by_phase['X']
+        self.assertEqual(
+            ('my_file (build A)', 'simulation', 42), (job_event['name'], job_event['cat'], job_event['tid'])
+        )
+        self.assertEqual((1500000, 2500000), (job_event['ts'], job_event['dur']))
+        self.assertEqual(1.0, job_event['args']['ready_list_seconds'])
+        self.assertEqual(0.5, job_event['args']['pool_queue_seconds'])
+        self.assertEqual(('EnergyPlus', 42, 2000000, 1500000),
+                         (stage_event['name'], stage_event['tid'], stage_event['ts'], stage_event['dur']))
+        self.assertEqual('my_file', stage_event['args']['case'])
+        self.assertEqual([0, 1500000], [by_phase['b'][0]['ts'], by_phase['e'][0]['ts']])
+        self.assertEqual(by_phase['b'][0]['id'], by_phase['e'][0]['id'])
+        self.assertIn({'name': 'worker 42'}, [event['args'] for event in by_phase['M']])
+
+    def test_asyncio_jobs_get_a_track_each_and_no_shared_resource_use(self):
+        for max_concurrent, overlapping in [(2, True), (1, False)]:
+            spans = []
+            scheduler = JobGraphScheduler(AsyncioExecutor(max_concurrent, SerialExecutor()), 2)
+            jobs = [
+                Job(Job.SIMULATION, traced_sleep, (0.2,), lambda r, e: spans.append(r), name=str(i)) for i in range(2)
+            ]
+            for job in jobs:
+                scheduler.add(job)
+            scheduler.run()
+            scheduler.close()
+            tids = [job.worker_tid for job in jobs]
+            self.assertEqual({ASYNCIO_SLOT_TID_BASE + i for i in range(max_concurrent)}, set(tids))
+            self.assertEqual(set(tids), {span['tid'] for span in spans})
+            for span in spans:
+                if overlapping:  # each ran alongside the other, so the process-wide counters say nothing about it
+                    self.assertEqual([None] * 4, [span[key] for key in (
+                        'cpu_seconds', 'read_bytes', 'write_bytes', 'process_peak_rss_bytes'
+                    )])
+                else:
+                    self.assertIsNotNone(span['cpu_seconds'])
+            names = {
+                event['tid']: event['args']['name'] for event in chrome_trace_events(jobs, spans)
+                if event['name'] == 'thread_name'
+            }
+            self.assertEqual({tid: 'asyncio slot %d' % (tid - ASYNCIO_SLOT_TID_BASE) for tid in tids}, names)
@@ -20,7 +20,7 @@ from tkinter import (
     END, LEFT, TOP,  # relative directions (RIGHT, TOP)
     filedialog, simpledialog,  # system dialogs
 )
-from typing import List, Union
+from typing import List, Optional, Union
 
 from plan_tools.runtime import fixup_taskbar_icon_on_windows
 from pubsub import pub
@@ -28,11 +28,14 @@ from pubsub import pub
 import energyplus_regressions
 from energyplus_regressions import VERSION
 from energyplus_regressions.builds.base import KnownBuildTypes, autodetect_build_dir_type, BaseBuildDirectoryStructure
+from energyplus_regressions.builds.idf_index import IdfIndex
 from energyplus_regressions.builds.install import EPlusInstallDirectory
 from energyplus_regressions.builds.makefile import CMakeCacheMakeFileBuildDirectory
 from energyplus_regressions.builds.visualstudio import CMakeCacheVisualStudioBuildDirectory
-from energyplus_regressions.epw_map import get_epw_for_idf
+from energyplus_regressions.energyplus import CANCELLED
+from energyplus_regressions.epw_map import get_epws_for_idfs
 from energyplus_regressions.runtests import TestRunConfiguration, SuiteRunner
+from energyplus_regressions.scheduler import shutdown_shared_pool
 from energyplus_regressions.structures import (
     CompletedStructure,
     ConfigType,
@@ -50,6 +53,8 @@ class ResultsTreeRoots:
     NotSuccess1 = "Case 1 Unsuccessful run"
     Success2 = "Case 2 Successful runs"
     NotSuccess2 = "Case 2 Unsuccessful run"
+    LimitExceeded1 = "Case 1 Runs stopped at a time or memory limit"
+    LimitExceeded2 = "Case 2 Runs stopped at a time or memory limit"
     FilesCompared = "Files compared"
     BigMath = "Files with BIG mathdiffs"
     SmallMath = "Files with small mathdiffs"
@@ -66,6 +71,8 @@ class ResultsTreeRoots:
             ResultsTreeRoots.NotSuccess1,
             ResultsTreeRoots.Success2,
             ResultsTreeRoots.NotSuccess2,
+            ResultsTreeRoots.LimitExceeded1,
+            ResultsTreeRoots.LimitExceeded2,
             ResultsTreeRoots.FilesCompared,
             ResultsTreeRoots.BigMath,
             ResultsTreeRoots.SmallMath,
@@ -232,6 +239,8 @@ class MyApp(Frame):
         self.valid_idfs_in_listing = False
         self.build_1: BaseBuildDirectoryStructure | None = None
         self.build_2: BaseBuildDirectoryStructure | None = None
+        # kept between sessions so refreshing the listing only reads the test file directories that changed
+        self.idf_index = IdfIndex(Path(os.path.expanduser("~")) / ".regression-idf-index.json")
         self.last_results = None
         self.auto_saving = False
         self.manually_saving = False
@@ -692,9 +701,9 @@ class MyApp(Frame):
                     self.full_idf_listbox.insert(END, "Select build folders to fill listing")
                     return
             idf_dir_1 = self.build_1.get_idf_directory()
-            idfs_dir_1 = BaseBuildDirectoryStructure.get_idfs_in_dir(idf_dir_1)
+            idfs_dir_1 = self.idf_index.idfs_in_dir(idf_dir_1)
             idf_dir_2 = self.build_2.get_idf_directory()
-            idfs_dir_2 = BaseBuildDirectoryStructure.get_idfs_in_dir(idf_dir_2)
+            idfs_dir_2 = self.idf_index.idfs_in_dir(idf_dir_2)
             common_idfs = idfs_dir_1.intersection(idfs_dir_2)
             if len(common_idfs) == 0:
                 self.full_idf_listbox.insert(END, "No common IDFs found between build folders")
@@ -734,6 +743,8 @@ class MyApp(Frame):
             ResultsTreeRoots.NotSuccess1: results.failure_case_a,
             ResultsTreeRoots.Success2: results.success_case_b,
             ResultsTreeRoots.NotSuccess2: results.failure_case_b,
+            ResultsTreeRoots.LimitExceeded1: results.limit_exceeded_case_a,
+            ResultsTreeRoots.LimitExceeded2: results.limit_exceeded_case_b,
             ResultsTreeRoots.FilesCompared: results.total_files_compared,
             ResultsTreeRoots.BigMath: results.big_math_diffs,
             ResultsTreeRoots.SmallMath: results.small_math_diffs,
@@ -744,7 +755,8 @@ class MyApp(Frame):
         }
         case_roots = [
             ResultsTreeRoots.NumRun, ResultsTreeRoots.Success1, ResultsTreeRoots.NotSuccess1,
-            ResultsTreeRoots.Success2, ResultsTreeRoots.NotSuccess2
+            ResultsTreeRoots.Success2, ResultsTreeRoots.NotSuccess2, ResultsTreeRoots.LimitExceeded1,
+            ResultsTreeRoots.LimitExceeded2
         ]
         for root, these_results in root_and_files.items():
             num_items = sum([len(y) for _, y in these_results.descriptions.items()])
@@ -1093,13 +1105,10 @@ class MyApp(Frame):
             build_a=self.build_1,
             build_b=self.build_2
         )
-        idfs_to_run = list()
-        for this_file in self.active_idf_listbox.get(0, END):
-            # using build 1 as the basis for getting a weather file # TODO: Allow different EPWs for build 1, 2
-            potential_epw = get_epw_for_idf(self.build_1.source_directory, this_file)
-            idfs_to_run.append(
-                TestEntry(this_file, potential_epw)
-            )
+        # using build 1 as the basis for getting a weather file # TODO: Allow different EPWs for build 1, 2
+        active_idfs = self.active_idf_listbox.get(0, END)
+        potential_epws = get_epws_for_idfs(self.build_1.source_directory, active_idfs)
+        idfs_to_run = [TestEntry(this_file, potential_epws[this_file]) for this_file in active_idfs]
         if len(idfs_to_run) == 0:
             messagebox.showwarning("Nothing to run", "No IDFs were activated, so nothing to run")
             return
@@ -1145,6 +1154,15 @@ class MyApp(Frame):
             message = "Completed %s : %s, Success" % (
                 test_case_completed_instance.run_directory, test_case_completed_instance.case_name)
             self.add_to_log(message)
+        elif test_case_completed_instance.limit_exceeded == CANCELLED:
+            message = "Completed %s : %s, Cancelled" % (
+                test_case_completed_instance.run_directory, test_case_completed_instance.case_name)
+            self.add_to_log(message)
+        elif test_case_completed_instance.limit_exceeded:
+            message = "Completed %s : %s, Killed at the %s limit" % (
+                test_case_completed_instance.run_directory, test_case_completed_instance.case_name,
+                test_case_completed_instance.limit_exceeded)
+            self.add_to_log(message)
         else:
             message = "Completed %s : %s, Failed" % (
                 test_case_completed_instance.run_directory, test_case_completed_instance.case_name)
@@ -1196,12 +1214,15 @@ class MyApp(Frame):
         self.client_done()
 
     @staticmethod
-    def cancelled_listener():
-        pub.sendMessage(PubSubMessageTypes.CANCELLED)
+    def cancelled_listener(results=None):
+        pub.sendMessage(PubSubMessageTypes.CANCELLED, results=results)
 
-    def cancelled_handler(self):
+    def cancelled_handler(self, results: Optional[CompletedStructure] = None):
         self.add_to_log("Cancelled!")
         self.label_string.set("Properly cancelled!")
+        if results:
+            # the cases that were diffed before the cancel
+            self.build_results_tree(results)
         self.client_done()
 
     def client_stop(self):
@@ -1214,6 +1235,8 @@ class MyApp(Frame):
             messagebox.showerror("Uh oh!", "Cannot exit program while operations are running; abort them then exit")
             return
         self.client_save(auto_save=True)
+        # the worker processes are kept warm between runs, so shut them down on the way out
+        shutdown_shared_pool()
         sys.exit()
 
     def client_done(self):
@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+from platform import system
+import time
+from typing import Dict, Iterable, List, Optional
+
+from energyplus_regressions.scheduler import ASYNCIO_SLOT_TID_BASE, Job, current_asyncio_slot
+
+try:
+    import resource
+except ImportError:  # pragma: no cover -- there is no resource module on Windows
+    resource = None
+
+TRACE_FILE_NAME = 'stage_trace.jsonl'
+TIMELINE_FILE_NAME = 'suite_timeline.json'
+
+# the number of rows in the summary of the slowest stages printed at the end of a suite
+SLOWEST_STAGES_TO_REPORT = 10
+
+
+def cpu_seconds() -> float:
+    """CPU time used so far by this process and the tools it has run and waited on"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def process_peak_rss_bytes() -> Optional[int]:
+    """The high-water mark of resident memory of this process or any tool it has run and waited on, if known.
+
+    This is a peak over the life of the process so far, not just the last stage, so a stage can only be said to have
+    needed at most this much memory.  The peak of a tool's own processes is sampled as it runs, see ToolWatch.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # reported in bytes on Mac but kilobytes elsewhere
+    return peak if system() == 'Darwin' else peak * 1024
+
+
+def io_bytes() -> tuple[Optional[int], Optional[int]]:
+    """Bytes read and written so far by this process and the tools it has waited on, where the OS reports them"""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(':', 1) for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):  # pragma: no cover -- only Linux has /proc/self/io
+        return None, None
+
+
+def difference(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    if before is None or after is None:  # pragma: no cover
+        return None
+    return after - before
+
+
+class StageTracer:
+    """Collects a span for every stage of a simulation or diff run under it.
+
+    A tracer is created in the worker process for each simulation or diff, and its spans, plain dicts, are handed back
+    to the suite runner along with the results so they can be written to the trace file.  Anything put in the dict
+    ``span`` gives, like the return code of a tool, is added to the span.
+
+    The CPU, I/O and memory figures are read from counters for the whole process, so for a stage of a job run by the
+    asyncio executor they are left as None unless that job had the process to itself for the whole stage.  The memory
+    figure is the peak of the process so far, a stage that runs a tool adds the peak of the tool as ``peak_rss_bytes``.
+    """
+
+    def __init__(self, case: str, build: Optional[str] = None):
+        self.case = case
+        self.build = build
+        self.spans: List[Dict] = []
+
+    @contextmanager
+    def span(self, stage: str):
+        started_at = time.time()
+        start = time.perf_counter()
+        cpu_start = cpu_seconds()
+        read_start, written_start = io_bytes()
+        slot = current_asyncio_slot.get()
+        alone_mark = slot.executor.alone_mark() if slot else None
+        details = {}
+        try:
+            yield details
+        finally:
+            wall = time.perf_counter() - start
+            read_end, written_end = io_bytes()
+            resources = {
+                'cpu_seconds': cpu_seconds() - cpu_start,
+                'process_peak_rss_bytes': process_peak_rss_bytes(),
+                'read_bytes': difference(read_start, read_end),
+                'write_bytes': difference(written_start, written_end),
+            }
+            if slot and (alone_mark is None or slot.executor.alone_mark() != alone_mark):
+                # other jobs ran in this process during the stage, and the counters include whatever they did
+                resources = dict.fromkeys(resources)
+            self.spans.append({
+                'case': self.case,
+                'build': self.build,
+                'stage': stage,
+                'start': started_at,
+                'wall_seconds': wall,
+                **resources,
+                'pid': os.getpid(),
+                'tid': slot.tid if slot and slot.tid is not None else os.getpid(),
+                **details,
+            })
+
+
+class StageTrace:
+    """The trace file of a suite run, with a span appended to it as each simulation or diff finishes"""
+
+    def __init__(self, trace_file: Path, keep_existing: bool = False):
+        self.trace_file = trace_file
+        self.spans: List[Dict] = []
+        if not keep_existing:
+            self.trace_file.write_text('')
+
+    def add(self, spans: List[Dict]):
+        self.spans.extend(spans)
+        with self.trace_file.open('a') as f:
+            for span in spans:
+                f.write(json.dumps(span) + '\n')
+
+    def slowest_stages(self, count: int = SLOWEST_STAGES_TO_REPORT) -> List[str]:
+        """A table of the stages that took the most wall time in total across the suite, one line per row"""
+        totals = {}
+        for span in self.spans:
+            stage = totals.setdefault(span['stage'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'slowest': None})
+            stage['count'] += 1
+            stage['wall'] += span['wall_seconds']
+            stage['cpu'] += span['cpu_seconds'] or 0.0
+            if stage['slowest'] is None or span['wall_seconds'] > stage['slowest']['wall_seconds']:
+                stage['slowest'] = span
+        rows = sorted(totals.items(), key=lambda item: item[1]['wall'], reverse=True)[:count]
+        lines = ['%-36s %6s %10s %10s %10s  %s' % ('Stage', 'Count', 'Wall [s]', 'CPU [s]', 'Max [s]', 'Slowest case')]
+        for name, stage in rows:
+            lines.append('%-36s %6d %10.2f %10.2f %10.2f  %s' % (
+                name, stage['count'], stage['wall'], stage['cpu'], stage['slowest']['wall_seconds'],
+                stage['slowest']['case']
+            ))
+        return lines
+
+
+def microseconds(seconds: float, origin: float) -> int:
+    return int(round((seconds - origin) * 1e6))
+
+
+def chrome_trace_events(jobs: Iterable[Job], spans: Iterable[Dict]) -> List[Dict]:
+    """The jobs of a suite run and the stage spans recorded inside them as Chrome trace events.
+
+    Each worker process, or slot of the asyncio executor, gets its own track, holding a complete event for every job it
+    ran with the stages of the job nested under it, so idle workers show up as gaps.  The time each job spent waiting,
+    from being added to the scheduler until a worker started it, is an async event on a separate queue track, with the
+    part of that spent in the scheduler's ready list and the part spent between ``apply_async`` and the worker picking
+    it up in its args.
+    """
+    jobs = list(jobs)
+    spans = list(spans)
+    times = [job.added_at for job in jobs if job.added_at is not None] + [span['start'] for span in spans]
+    origin = min(times) if times else 0.0
+    suite_pid = os.getpid()
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': suite_pid, 'tid': 0, 'args': {'name': 'Regression suite'}}]
+    worker_tids = set()
+    for job_id, job in enumerate(jobs):
+        if job.started_at is None:  # the job raised, so there is no record of where or when it ran
+            continue
+        tid = job.worker_pid if job.worker_tid is None else job.worker_tid
+        worker_tids.add(tid)
+        queue_args = {
+            'ready_list_seconds': job.submitted_at - job.added_at,
+            'pool_queue_seconds': job.started_at - job.submitted_at,
+        }
+        events.append({
+            'name': job.name, 'cat': 'queue', 'ph': 'b', 'id': job_id, 'pid': suite_pid, 'tid': 0,
+            'ts': microseconds(job.added_at, origin), 'args': queue_args,
+        })
+        events.append({
+            'name': job.name, 'cat': 'queue', 'ph': 'e', 'id': job_id, 'pid': suite_pid, 'tid': 0,
+            'ts': microseconds(job.started_at, origin),
+        })
+        events.append({
+            'name': job.name, 'cat': job.kind, 'ph': 'X', 'pid': suite_pid, 'tid': tid,
+            'ts': microseconds(job.started_at, origin), 'dur': microseconds(job.finished_at, job.started_at),
+            'args': dict(queue_args, handed_back_seconds=job.completed_at - job.finished_at),
+        })
+    for span in spans:
+        tid = span.get('tid', span['pid'])
+        worker_tids.add(tid)
+        events.append({
+            'name': span['stage'], 'cat': 'stage', 'ph': 'X', 'pid': suite_pid, 'tid': tid,
+            'ts': microseconds(span['start'], origin), 'dur': int(round(span['wall_seconds'] * 1e6)),
+            'args': {key: value for key, value in span.items() if key not in ('stage', 'start', 'pid', 'tid')},
+        })
+    for tid in sorted(worker_tids):
+        name = 'worker %s' % tid if tid < ASYNCIO_SLOT_TID_BASE else 'asyncio slot %s' % (tid - ASYNCIO_SLOT_TID_BASE)
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': suite_pid, 'tid': tid, 'args': {'name': name}})
+    return events
+
+
+def write_chrome_trace(trace_file: Path, jobs: Iterable[Job], spans: Iterable[Dict]) -> None:
+    """Writes a suite run out in the Chrome trace event format, which can be opened in Perfetto or chrome://tracing"""
+    with trace_file.open('w') as f:
+        json.dump({'traceEvents': chrome_trace_events(jobs, spans), 'displayTimeUnit': 'ms'}, f)